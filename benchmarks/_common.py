@@ -0,0 +1,13 @@
+"""Shared helpers for the benchmark scripts"""
+import importlib
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_scraper_module():
+    """Import the scraping engine from the repository root"""
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return importlib.import_module('scraper_core')
@@ -0,0 +1,39 @@
+"""Measure detail-page throughput of scrape_books_toscrape at several concurrency levels
+
+Usage: python benchmarks/bench_concurrency.py [--pages N] [--latency SECONDS]
+"""
+import argparse
+import time
+
+from _common import load_scraper_module
+from fixture_server import FixtureServer
+
+
+def run(concurrency, pages, latency):
+    """Scrape the fixture catalogue once and return (requests, seconds)"""
+    scraper_module = load_scraper_module()
+    with FixtureServer(total_pages=pages, latency=latency) as server:
+        scraper = scraper_module.EcommerceScraper(
+            concurrency=concurrency, requests_per_second=10000, burst=10000)
+        start = time.perf_counter()
+        data = scraper.scrape_books_toscrape(max_pages=pages, base_url=server.base_url)
+        elapsed = time.perf_counter() - start
+        assert len(data) == pages * 20, f"expected {pages * 20} records, got {len(data)}"
+        return server.request_count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=3, help='listing pages to crawl')
+    parser.add_argument('--latency', type=float, default=0.05, help='per-request server latency')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>11} {'requests':>9} {'seconds':>8} {'pages/sec':>10}")
+    for level in args.levels:
+        requests_made, elapsed = run(level, args.pages, args.latency)
+        print(f"{level:>11} {requests_made:>9} {elapsed:>8.2f} {requests_made / elapsed:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Measure ProductDeduplicator throughput and accuracy as the index grows
+
+Usage: python benchmarks/bench_dedupe.py [--records N] [--duplicate-every N]
+
+Unique products get random multi-word titles. Every --duplicate-every'th
+product is seen again: once under a tracking-parameter URL (an exact
+duplicate), once on another URL with the title re-cased and truncated with
+"..." (a near-duplicate), and once with a different price (not a duplicate).
+Throughput is reported per block of records, so a cost that grew with the
+index would show as falling rates.
+"""
+import argparse
+import random
+import time
+
+from _common import load_scraper_module
+
+
+def products(count, seed=1):
+    """Unique product records with titles drawn from a shared vocabulary"""
+    rng = random.Random(seed)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9)))
+             for _ in range(5000)]
+    for product_id in range(count):
+        yield {
+            'title': ' '.join(rng.choice(words) for _ in range(rng.randint(3, 8))),
+            'price': f'£{rng.randint(100, 99999) / 100:.2f}',
+            'url': f'https://shop.example/p/{product_id}',
+            'image_url': f'https://shop.example/img/{product_id}.jpg',
+        }
+
+
+def variants(record, product_id):
+    """(record, is duplicate) pairs derived from a product seen earlier"""
+    exact = dict(record, url=record['url'] + '?utm_source=feed')
+    near = dict(record, url=f'https://shop.example/item/{product_id}', image_url='N/A',
+                title=record['title'].upper() + '...')
+    repriced = dict(record, url=f'https://shop.example/sale/{product_id}', price='£0.01')
+    return [(exact, True), (near, True), (repriced, False)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--duplicate-every', type=int, default=50)
+    args = parser.parse_args()
+
+    scraper_module = load_scraper_module()
+    dedupe = scraper_module.ProductDeduplicator()
+    block = max(1, args.records // 5)
+
+    found = missed = false_positives = 0
+    originals = []
+    start = block_start = time.perf_counter()
+    print(f"{'records':>9} {'records/s':>10}")
+    for product_id, record in enumerate(products(args.records), 1):
+        if dedupe.check(record) is not None:
+            false_positives += 1
+        if product_id % args.duplicate_every == 0:
+            originals.append((product_id, record))
+        if product_id % block == 0:
+            now = time.perf_counter()
+            print(f"{product_id:>9} {block / (now - block_start):>10,.0f}")
+            block_start = now
+    elapsed = time.perf_counter() - start
+
+    for product_id, record in originals:
+        for variant, duplicate in variants(record, product_id):
+            matched = dedupe.check(variant) is not None
+            if duplicate:
+                found += matched
+                missed += not matched
+            else:
+                false_positives += matched
+
+    print(f"\n{args.records:,} records in {elapsed:.1f}s ({args.records / elapsed:,.0f} records/s)")
+    print(f"duplicates found: {found} of {found + missed}, false positives: {false_positives}")
+    print(dedupe.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Compare product-container detection strategies on large generic shop pages
+
+Usage: python benchmarks/bench_detection.py [--products N] [--noise N] [--columns N] [--repeat N]
+
+The pages mimic a generic storefront: a product grid surrounded by a mega
+menu, price filters and hundreds of layout divs whose classes contain "item",
+which is what trips the old selector list. With --columns the cards are laid
+out in div.row > div.col grid rows, where each row also looks like a product.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+
+from _common import load_scraper_module
+
+PAGE_URL = 'http://shop.fixture.local/catalog?page=1'
+
+
+def render_shop_page(products, noise, columns=0):
+    """A large generic shop listing page"""
+    menu = ''.join(f'<li class="menu-item"><a href="/c/{i}">Department {i}</a></li>' for i in range(noise))
+    filters = ''.join(f'<li class="filter"><a href="?max={i * 10}">Under ${i * 10}</a></li>' for i in range(1, 20))
+    layout = ''.join(
+        f'<div class="grid-item-wrapper"><div class="item-inner"><span>Promo {i}</span>'
+        f'<a href="/promo/{i}">More</a></div></div>' for i in range(noise))
+    card_list = [f"""
+<div class="card" data-sku="{i}">
+  <div class="card-media"><img src="/img/{i}.jpg" alt=""></div>
+  <div class="card-body">
+    <h3 class="card-title"><a href="/p/{i}">Product {i}</a></h3>
+    <p class="card-text">Short description of product {i}.</p>
+    <span class="amount">${i % 90 + 9}.99</span>
+  </div>
+</div>""" for i in range(products)]
+    if columns:
+        cards = ''.join(
+            '<div class="row">' + ''.join(f'<div class="col">{card}</div>' for card in card_list[start:start + columns])
+            + '</div>' for start in range(0, products, columns))
+    else:
+        cards = ''.join(card_list)
+    return f"""<!DOCTYPE html><html><head><title>Shop</title>
+<script>var cart = {{total: "$0.00"}};</script></head><body>
+<nav><ul class="menu">{menu}</ul></nav>
+<aside><h2>Filter by price</h2><ul class="filters">{filters}</ul></aside>
+<main><h1>Catalog</h1><div class="grid">{cards}</div></main>
+<footer>{layout}</footer>
+</body></html>"""
+
+
+def legacy_find_products(soup):
+    """_find_products as it was written before the detector"""
+    selectors = ['article.product', 'div.product', 'li.product', 'article', 'div[class*="product"]',
+                 'li[class*="product"]', 'div[class*="item"]', 'li[class*="item"]',
+                 'div.product-item', 'li.product-item']
+    for selector in selectors:
+        products = soup.select(selector)
+        if products:
+            return products
+    products = []
+    for elem in soup.find_all(['div', 'article', 'li']):
+        if elem.find(['h1', 'h2', 'h3', 'h4']) and elem.find(text=lambda x: '$' in str(x) or '£' in str(x)):
+            products.append(elem)
+    return products
+
+
+def timed(func, soup, repeat):
+    """Milliseconds per call, and the last result"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(soup)
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=200, help='product cards per page')
+    parser.add_argument('--noise', type=int, default=500, help='menu items and layout divs per page')
+    parser.add_argument('--columns', type=int, default=0, help='lay the cards out in grid rows this wide')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    scraper_module = load_scraper_module()
+    html = render_shop_page(args.products, args.noise, args.columns)
+    soup = BeautifulSoup(html, scraper_module.DEFAULT_PARSER)
+    templates = scraper_module.TemplateStore(os.path.join(tempfile.mkdtemp(), 'templates.json'))
+    scraper = scraper_module.EcommerceScraper(templates=templates)
+    scraper._find_products(soup, PAGE_URL)
+    print(f"page: {len(html) / 1024:.0f} KiB, {args.products} products, "
+          f"learned selector: {templates.get('shop.fixture.local').get('products')}")
+
+    strategies = [
+        ('legacy selectors', legacy_find_products),
+        ('detector', lambda s: scraper_module.PRODUCT_DETECTOR.detect(s)[0]),
+        ('learned selector', lambda s: scraper._find_products(s, PAGE_URL)),
+    ]
+    print(f"{'strategy':>17} {'ms/page':>9} {'found':>6} {'correct':>8}")
+    for name, func in strategies:
+        ms, found = timed(func, soup, args.repeat)
+        correct = len(found) == args.products and all(
+            element.get('class') == ['card'] for element in found)
+        print(f"{name:>17} {ms:>9.2f} {len(found):>6} {str(correct):>8}")
+
+
+if __name__ == '__main__':
+    main()
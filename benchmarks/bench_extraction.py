@@ -0,0 +1,112 @@
+"""Compare compiled extraction rules against the original find() cascades
+
+Usage: python benchmarks/bench_extraction.py [--repeat N]
+
+Both extractors run on already-parsed listing pages, so the numbers isolate
+extraction cost from parsing.
+"""
+import argparse
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from _common import load_scraper_module
+from fixture_server import render_listing_page
+
+BASE_URL = 'http://fixture.local/'
+
+
+def legacy_book(book_element, base_url):
+    """books.toscrape.com extraction as it was written before the rule engine"""
+    data = {'title': 'N/A', 'price': 'N/A', 'rating': 'N/A', 'availability': 'N/A',
+            'url': 'N/A', 'image_url': 'N/A', 'category': 'N/A'}
+    title_elem = book_element.find('h3')
+    if title_elem:
+        link = title_elem.find('a')
+        if link:
+            data['title'] = link.get('title', link.text.strip())
+            if link.get('href'):
+                data['url'] = urljoin(base_url, link['href'])
+    price_elem = book_element.find('p', class_='price_color')
+    if price_elem:
+        data['price'] = price_elem.text.strip()
+    rating_elem = book_element.find('p', class_=lambda x: x and 'star-rating' in x)
+    if rating_elem:
+        for class_name in rating_elem.get('class', []):
+            if class_name != 'star-rating':
+                data['rating'] = class_name
+                break
+    availability_elem = book_element.find('p', class_='instock')
+    if availability_elem:
+        data['availability'] = availability_elem.text.strip()
+    img_elem = book_element.find('img')
+    if img_elem and img_elem.get('src'):
+        data['image_url'] = urljoin(base_url, img_elem['src'])
+        data['image_alt'] = img_elem.get('alt', 'N/A')
+    return data
+
+
+def legacy_general(element, base_url):
+    """Generic product extraction as it was written before the rule engine"""
+    data = {'title': 'N/A', 'price': 'N/A', 'url': 'N/A', 'image_url': 'N/A', 'description': 'N/A'}
+    title_elem = element.find(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', '.title', '.name'])
+    if title_elem:
+        data['title'] = title_elem.text.strip()
+        link = title_elem.find('a')
+        if link and link.get('href'):
+            data['url'] = urljoin(base_url, link['href'])
+    price_text = element.find(text=lambda x: '$' in str(x) or '£' in str(x) or '€' in str(x))
+    if price_text:
+        data['price'] = price_text.strip()
+    else:
+        price_elem = element.find(['.price', '.cost', '.amount', '[class*="price"]'])
+        if price_elem:
+            data['price'] = price_elem.text.strip()
+    img_elem = element.find('img')
+    if img_elem and img_elem.get('src'):
+        data['image_url'] = urljoin(base_url, img_elem['src'])
+    desc_elem = element.find('p')
+    if desc_elem:
+        data['description'] = desc_elem.text.strip()[:100]
+    return data
+
+
+def timed(func, soups, repeat):
+    """Milliseconds per page for running func over every page"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for soup in soups:
+            func(soup)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(soups))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    scraper_module = load_scraper_module()
+    books_rules = scraper_module.BOOKS_LISTING_RULES
+    general_rules = scraper_module.GENERAL_PRODUCT_RULES
+    soups = [BeautifulSoup(render_listing_page(page, 50), scraper_module.DEFAULT_PARSER)
+             for page in range(1, 6)]
+
+    cases = {
+        'books legacy': lambda soup: [legacy_book(el, BASE_URL)
+                                      for el in soup.find_all('article', class_='product_pod')],
+        'books rules': lambda soup: books_rules.extract_page(soup, BASE_URL),
+        'general legacy': lambda soup: [legacy_general(el, BASE_URL)
+                                        for el in soup.find_all('article', class_='product_pod')],
+        'general rules': lambda soup: [general_rules.extract(el, BASE_URL)
+                                       for el in books_rules.select_containers(soup)],
+    }
+
+    print(f"{'extractor':<16} {'ms/page':>8} {'pages/sec':>10}")
+    for name, func in cases.items():
+        ms = timed(func, soups, args.repeat)
+        print(f"{name:<16} {ms:>8.2f} {1000 / ms:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Compare parse time and peak memory of the available HTML parser backends
+
+Usage: python benchmarks/bench_parsers.py [--fixtures DIR] [--repeat N]
+
+Pages come from the fixture server's renderers unless --fixtures points at a
+directory of saved pages named listing*.html and detail*.html.
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from _common import load_scraper_module
+from fixture_server import render_detail_page, render_listing_page
+
+
+def load_pages(fixtures_dir):
+    """Return {'listing': [...], 'detail': [...]} page bodies"""
+    if not fixtures_dir:
+        return {
+            'listing': [render_listing_page(page, 50) for page in range(1, 4)],
+            'detail': [render_detail_page(book_id) for book_id in range(1, 21)],
+        }
+
+    pages = {}
+    for kind in ('listing', 'detail'):
+        pages[kind] = []
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, f'{kind}*.html'))):
+            with open(path, encoding='utf-8') as f:
+                pages[kind].append(f.read())
+    return pages
+
+
+def measure(pages, parser, strainer, repeat):
+    """Return (ms per page, peak KB) for parsing pages with one configuration"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            BeautifulSoup(html, parser, parse_only=strainer)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for html in pages:
+        soup = BeautifulSoup(html, parser, parse_only=strainer)
+        del soup
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return elapsed * 1000 / (repeat * len(pages)), peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help='directory of saved listing*/detail*.html pages')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    scraper_module = load_scraper_module()
+    strainers = {
+        'listing': scraper_module.BOOKS_LISTING_STRAINER,
+        'detail': scraper_module.BOOKS_DETAIL_STRAINER,
+    }
+    pages = load_pages(args.fixtures)
+
+    print(f"{'page':<8} {'backend':<12} {'mode':<9} {'ms/page':>8} {'peak KB':>9}")
+    for kind, bodies in pages.items():
+        if not bodies:
+            continue
+        for backend in scraper_module.PARSERS:
+            for mode, strainer in (('full', None), ('strained', strainers[kind])):
+                ms, peak = measure(bodies, backend, strainer, args.repeat)
+                print(f"{kind:<8} {backend:<12} {mode:<9} {ms:>8.2f} {peak:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compare the page-by-page crawl loop with the staged CrawlPipeline and its category crawl
+
+Usage: python benchmarks/bench_pipeline.py [--pages N] [--latency SECONDS] [--parse-workers N]
+"""
+import argparse
+import time
+
+from _common import load_scraper_module
+from fixture_server import FixtureServer
+
+
+class CountingSink:
+    """Sink that only counts records"""
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, record):
+        self.count += 1
+
+
+def run(mode, pages, latency, concurrency, parse_workers):
+    """Crawl the fixture catalogue once and return (seconds, stage metrics or None)"""
+    scraper_module = load_scraper_module()
+    with FixtureServer(total_pages=pages, latency=latency) as server:
+        scraper = scraper_module.EcommerceScraper(
+            concurrency=concurrency, requests_per_second=10000, burst=10000)
+        sink = CountingSink()
+        metrics = None
+        start = time.perf_counter()
+        if mode in ('pipeline', 'categories'):
+            pipeline = scraper_module.CrawlPipeline(scraper, parse_workers=parse_workers)
+            pipeline.run(sink, max_pages=pages, base_url=server.base_url, categories=mode == 'categories')
+            metrics = pipeline.format_metrics()
+        else:
+            for record in scraper.iter_books_toscrape(max_pages=pages, base_url=server.base_url):
+                sink.write(record)
+        elapsed = time.perf_counter() - start
+        assert sink.count == pages * 20, f"expected {pages * 20} records, got {sink.count}"
+        return elapsed, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=10, help='listing pages to crawl')
+    parser.add_argument('--latency', type=float, default=0.02, help='per-request server latency')
+    parser.add_argument('--concurrency', type=int, default=8, help='fetch workers')
+    parser.add_argument('--parse-workers', type=int, default=2, help='pipeline parser threads')
+    args = parser.parse_args()
+
+    print(f"{'mode':>10} {'seconds':>8} {'records/sec':>12}")
+    for mode in ('loop', 'pipeline', 'categories'):
+        elapsed, metrics = run(mode, args.pages, args.latency, args.concurrency, args.parse_workers)
+        print(f"{mode:>10} {elapsed:>8.2f} {args.pages * 20 / elapsed:>12.1f}")
+        if metrics:
+            print(f"           {metrics}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare the memory of records kept as dicts with compact Product records
+
+Usage: python benchmarks/bench_records.py [--records N]
+
+Records are decoded from NDJSON, so like records from a crawl none of their
+strings are shared until Product interns the categorical ones.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from _common import load_scraper_module
+from fixture_server import BOOKS_PER_PAGE, CATEGORIES, RATINGS, book_price, book_slug
+
+
+def ndjson_lines(count):
+    """Book-shaped records as NDJSON lines, including the product information fields"""
+    for book_id in range(1, count + 1):
+        price = f'£{book_price(book_id):.2f}'
+        yield json.dumps({
+            'title': f'Book {book_id}', 'price': price, 'rating': RATINGS[book_id % len(RATINGS)],
+            'availability': f'In stock ({book_id % 23} available)',
+            'url': f'https://books.toscrape.com/catalogue/{book_slug(book_id)}/index.html',
+            'image_url': f'https://books.toscrape.com/media/cache/{book_id:04d}.jpg',
+            'image_alt': f'Book {book_id}', 'category': CATEGORIES[book_id % len(CATEGORIES)],
+            'scraped_date': f'2024-01-01 00:{book_id // BOOKS_PER_PAGE % 60:02d}:00',
+            'source': 'books.toscrape.com',
+            'description': 'A fixture description. ' * 8,
+            'upc': f'{book_id:016x}', 'product_type': 'Books', 'price_(excl._tax)': price,
+            'price_(incl._tax)': price, 'tax': '£0.00', 'number_of_reviews': '0',
+        })
+
+
+def measure(build, lines):
+    """(bytes per record, seconds) to build records from NDJSON lines"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = [build(json.loads(line)) for line in lines]
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(records), elapsed, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    scraper_module = load_scraper_module()
+    lines = list(ndjson_lines(args.records))
+
+    def typed(record):
+        return scraper_module.add_typed_fields(record)
+
+    def compact(record):
+        return scraper_module.Product.from_dict(typed(record))
+
+    dict_size, dict_time, _ = measure(typed, lines)
+    product_size, product_time, products = measure(compact, lines)
+
+    start = time.perf_counter()
+    for product in products:
+        product.to_dict()
+    to_dict_time = time.perf_counter() - start
+
+    print(f"{'representation':>15} {'bytes/record':>13} {'build s':>8}")
+    print(f"{'dict':>15} {dict_size:>13.0f} {dict_time:>8.2f}")
+    print(f"{'Product':>15} {product_size:>13.0f} {product_time:>8.2f}")
+    print(f"\nProduct.to_dict(): {args.records / to_dict_time:,.0f} records/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Measure sharded-crawl throughput at several worker-process counts
+
+Usage: python benchmarks/bench_sharding.py [--pages N] [--processes 1 2 4 8]
+
+With zero server latency the crawl is bound by parsing, so pages/sec should
+grow with the process count up to the number of cores.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from _common import load_scraper_module
+from fixture_server import FixtureServer
+
+
+class CountingSink:
+    """Sink that only counts records"""
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, record):
+        self.count += 1
+
+
+def run(processes, pages, latency):
+    """Run one sharded crawl and return (requests, seconds)"""
+    scraper_module = load_scraper_module()
+    with FixtureServer(total_pages=pages, latency=latency) as server, \
+            tempfile.TemporaryDirectory() as queue_dir:
+        crawl = scraper_module.ShardedCrawl(queue_dir, processes=processes, scraper_options=dict(
+            requests_per_second=10000 * processes, burst=10000))
+        start = time.perf_counter()
+        crawl.enqueue(crawl.plan_books(server.base_url, pages))
+        crawl.run()
+        sink = CountingSink()
+        crawl.merge(sink)
+        elapsed = time.perf_counter() - start
+        assert sink.count == pages * 20, f"expected {pages * 20} records, got {sink.count}"
+        return server.request_count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20, help='listing pages to crawl')
+    parser.add_argument('--latency', type=float, default=0.0, help='per-request server latency')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'processes':>9} {'requests':>9} {'seconds':>8} {'pages/sec':>10}")
+    for processes in args.processes:
+        requests_made, elapsed = run(processes, args.pages, args.latency)
+        print(f"{processes:>9} {requests_made:>9} {elapsed:>8.2f} {requests_made / elapsed:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""Reproducible benchmark suite: crawls, parsing and export against the local fixture server
+
+Usage: python benchmarks/bench_suite.py [--scenarios books custom parse export] [--pages N]
+           [--latency SECONDS] [--jitter SECONDS] [--error-rate P] [--page-size BYTES]
+           [--records N] [--fixtures DIR] [--results DIR] [--compare FILE] [--threshold PERCENT]
+
+Each scenario runs in a fresh interpreter, so its peak RSS is its own, and
+the fixture server's latency jitter and errors come from a fixed seed. The
+results are saved as JSON under benchmarks/results/ and compared with the
+previous result file (or --compare), marking metrics that got worse by more
+than the threshold.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from _common import REPO_ROOT, load_scraper_module
+from fixture_server import FixtureServer, pad_page, render_detail_page, render_listing_page
+
+SCENARIOS = ['books', 'custom', 'parse', 'export']
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# Options that change the workload, so runs differing in them are not comparable
+WORKLOAD_OPTIONS = ['pages', 'concurrency', 'latency', 'jitter', 'error_rate', 'page_size', 'records', 'fixtures', 'seed']
+# For each metric, whether a larger value is better
+METRICS = {'throughput': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False, 'peak_rss_kib': False}
+
+
+def percentiles(durations):
+    """p50/p95/p99 in milliseconds, nearest rank"""
+    ordered = sorted(durations)
+    if not ordered:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    return {
+        f'p{q}_ms': round(ordered[min(len(ordered) - 1, max(0, -(-q * len(ordered) // 100) - 1))] * 1000, 3)
+        for q in (50, 95, 99)
+    }
+
+
+def peak_rss_kib():
+    """Peak resident set size of this process, or None where resource is unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def crawl_result(name, scraper, records):
+    """Result row for a crawl, with fetch latency from the run's profile"""
+    report = scraper.profiler.report()
+    fetch = report['stages'].get('fetch', {})
+    return {
+        'scenario': name,
+        'unit': 'pages/s',
+        'items': report['pages'],
+        'records': records,
+        'seconds': report['elapsed_seconds'],
+        'throughput': report['pages_per_second'],
+        'p50_ms': fetch.get('p50_ms'),
+        'p95_ms': fetch.get('p95_ms'),
+        'p99_ms': fetch.get('p99_ms'),
+        'bytes_downloaded': report['bytes_downloaded'],
+    }
+
+
+def make_server(args):
+    return FixtureServer(total_pages=args.pages, latency=args.latency, jitter=args.jitter,
+                         error_rate=args.error_rate, page_size=args.page_size,
+                         fixture_dir=args.fixtures, seed=args.seed)
+
+
+def make_scraper(scraper_module, args, state_dir):
+    """Unthrottled scraper whose templates stay out of ~/.web-scraper"""
+    return scraper_module.EcommerceScraper(
+        concurrency=args.concurrency, requests_per_second=10000, burst=10000,
+        templates=scraper_module.TemplateStore(os.path.join(state_dir, 'templates.json')))
+
+
+def bench_books(scraper_module, args, state_dir):
+    with make_server(args) as server:
+        scraper = make_scraper(scraper_module, args, state_dir)
+        data = scraper.scrape_books_toscrape(max_pages=args.pages, base_url=server.base_url)
+        return [crawl_result('books', scraper, len(data))]
+
+
+def bench_custom(scraper_module, args, state_dir):
+    with make_server(args) as server:
+        scraper = make_scraper(scraper_module, args, state_dir)
+        data = scraper.scrape_custom_site(server.shop_url, max_pages=args.pages)
+        return [crawl_result('custom', scraper, len(data))]
+
+
+def bench_parse(scraper_module, args, state_dir):
+    """Parse listing and detail pages the way the crawl does, once per backend"""
+    pages = (
+        [(render_listing_page(page, args.pages), scraper_module.BOOKS_LISTING_STRAINER)
+         for page in range(1, args.pages + 1)] +
+        [(render_detail_page(book_id), scraper_module.BOOKS_DETAIL_STRAINER)
+         for book_id in range(1, args.pages * 20 + 1)]
+    )
+    pages = [(pad_page(html, args.page_size), strainer) for html, strainer in pages]
+
+    results = []
+    for parser in scraper_module.PARSERS:
+        scraper = scraper_module.EcommerceScraper(parser=parser)
+        durations = []
+        start = time.perf_counter()
+        for html, strainer in pages:
+            began = time.perf_counter()
+            scraper._make_soup(html, strainer)
+            durations.append(time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        results.append(dict({
+            'scenario': f'parse-{parser}', 'unit': 'pages/s', 'items': len(pages),
+            'seconds': round(elapsed, 3), 'throughput': round(len(pages) / elapsed, 2),
+        }, **percentiles(durations)))
+    return results
+
+
+def bench_export(scraper_module, args, state_dir):
+    """Stream book-shaped records through every sink format"""
+    records = [{
+        'title': f'Book {i}', 'price': f'£{10 + i % 40}.99', 'rating': 'Three', 'availability': 'In stock',
+        'url': f'http://fixture.local/catalogue/book-{i}_{i}/index.html', 'image_url': f'http://fixture.local/{i}.jpg',
+        'category': 'Poetry', 'description': 'A fixture description. ' * 8, 'upc': f'{i:016x}',
+        'scraped_date': '2024-01-01 00:00:00', 'source': 'books.toscrape.com',
+    } for i in range(args.records)]
+
+    extensions = ['.ndjson', '.json', '.csv', '.txt']
+    try:
+        import pyarrow  # noqa: F401
+        extensions.append('.parquet')
+    except ImportError:
+        pass
+
+    results = []
+    for extension in extensions:
+        durations = []
+        filename = os.path.join(state_dir, 'export' + extension)
+        start = time.perf_counter()
+        with scraper_module.open_sink(filename) as sink:
+            for record in records:
+                began = time.perf_counter()
+                sink.write(record)
+                durations.append(time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        results.append(dict({
+            'scenario': f'export-{extension[1:]}', 'unit': 'records/s', 'items': len(records),
+            'seconds': round(elapsed, 3), 'throughput': round(len(records) / elapsed, 2),
+            'file_bytes': os.path.getsize(filename),
+        }, **percentiles(durations)))
+    return results
+
+
+BENCHES = {'books': bench_books, 'custom': bench_custom, 'parse': bench_parse, 'export': bench_export}
+
+
+def run_child(args):
+    """Run one scenario in this process and print its result rows as JSON"""
+    scraper_module = load_scraper_module()
+    with tempfile.TemporaryDirectory() as state_dir:
+        results = BENCHES[args.child](scraper_module, args, state_dir)
+    peak = peak_rss_kib()
+    for result in results:
+        result['peak_rss_kib'] = peak
+    print(json.dumps(results))
+
+
+def run_scenario(name, argv):
+    """Run a scenario in a fresh interpreter and return its result rows"""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', name] + argv,
+        stdout=subprocess.PIPE, check=True, text=True)
+    # Engine log lines may precede the JSON, which is always the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_results(results_dir, exclude):
+    """The newest stored result file other than exclude, or None"""
+    files = sorted(path for path in glob.glob(os.path.join(results_dir, '*.json')) if path != exclude)
+    return files[-1] if files else None
+
+
+def compare(current, options, baseline_path, threshold):
+    """Print each metric's change against a stored run; returns the number of regressions"""
+    with open(baseline_path, encoding='utf-8') as f:
+        stored = json.load(f)
+    baseline = {row['scenario']: row for row in stored['results']}
+
+    print(f"\nCompared with {os.path.basename(baseline_path)} ({stored['revision']}):")
+    differing = [key for key in WORKLOAD_OPTIONS if stored['options'].get(key) != options.get(key)]
+    if differing:
+        print(f"  note: the runs used different {', '.join(differing)}")
+    regressions = 0
+    for row in current:
+        before = baseline.get(row['scenario'])
+        if not before:
+            continue
+        changes = []
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            marker = ' REGRESSION' if worse > threshold else ''
+            regressions += bool(marker)
+            changes.append(f"{metric} {change:+.1f}%{marker}")
+        print(f"  {row['scenario']:<16} " + ', '.join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--pages', type=int, default=5, help='listing pages per crawl')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.01, help='per-request server latency')
+    parser.add_argument('--jitter', type=float, default=0.01, help='extra uniform random latency, up to this')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--page-size', type=int, default=0, help='pad pages to at least this many bytes')
+    parser.add_argument('--records', type=int, default=5000, help='records written per export format')
+    parser.add_argument('--fixtures', default=None, help='serve recorded pages from this directory first')
+    parser.add_argument('--seed', type=int, default=0, help='seed for latency jitter and errors')
+    parser.add_argument('--results', default=RESULTS_DIR, help='directory to store result files in')
+    parser.add_argument('--compare', default=None, help='result file to compare with (default: the previous one)')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change reported as a regression')
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    argv = ['--pages', str(args.pages), '--concurrency', str(args.concurrency), '--latency', str(args.latency),
+            '--jitter', str(args.jitter), '--error-rate', str(args.error_rate),
+            '--page-size', str(args.page_size), '--records', str(args.records), '--seed', str(args.seed)]
+    if args.fixtures:
+        argv += ['--fixtures', os.path.abspath(args.fixtures)]
+
+    results = []
+    print(f"{'scenario':<16} {'items':>7} {'seconds':>8} {'throughput':>18} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'peak RSS MiB':>13}")
+    for name in args.scenarios:
+        for row in run_scenario(name, argv):
+            results.append(row)
+            rss = f"{row['peak_rss_kib'] / 1024:.1f}" if row['peak_rss_kib'] else 'n/a'
+            latencies = ' '.join(f"{row[key]:>8.2f}" if row[key] is not None else f"{'n/a':>8}"
+                                 for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+            print(f"{row['scenario']:<16} {row['items']:>7} {row['seconds']:>8.2f} "
+                  f"{row['throughput']:>10.1f} {row['unit']:<7} {latencies} {rss:>13}")
+
+    revision = git_revision()
+    os.makedirs(args.results, exist_ok=True)
+    path = os.path.join(args.results, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{revision}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'revision': revision,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'options': vars(args),
+            'results': results,
+        }, f, indent=2)
+    print(f"\nSaved {path}")
+
+    baseline = args.compare or previous_results(args.results, path)
+    if baseline:
+        compare(results, vars(args), baseline, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
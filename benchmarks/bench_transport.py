@@ -0,0 +1,52 @@
+"""Measure connection reuse and bytes on the wire for HttpTransport settings
+
+Usage: python benchmarks/bench_transport.py [--pages N] [--concurrency N] [--latency SECONDS]
+
+An undersized pool makes urllib3 discard connections beyond its size, so
+every burst of concurrent requests opens fresh ones; gzip cuts the bytes
+that cross the wire.
+"""
+import argparse
+import time
+
+from _common import load_scraper_module
+from fixture_server import FixtureServer
+
+
+def run(pages, concurrency, latency, pool_maxsize, compress):
+    """Crawl the fixture catalogue once and return (seconds, transport stats)"""
+    scraper_module = load_scraper_module()
+    with FixtureServer(total_pages=pages, latency=latency, compress=compress) as server:
+        transport = scraper_module.HttpTransport(pool_maxsize=pool_maxsize)
+        scraper = scraper_module.EcommerceScraper(
+            concurrency=concurrency, requests_per_second=10000, burst=10000, transport=transport)
+        # set_concurrency grows the pool; shrink it back to model an undersized pool
+        transport.resize(pool_maxsize)
+        start = time.perf_counter()
+        data = scraper.scrape_books_toscrape(max_pages=pages, base_url=server.base_url)
+        elapsed = time.perf_counter() - start
+        assert len(data) == pages * 20, f"expected {pages * 20} records, got {len(data)}"
+        return elapsed, transport.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=5, help='listing pages to crawl')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.01, help='per-request server latency')
+    args = parser.parse_args()
+
+    configs = [
+        ('pool 10, identity', 10, False),
+        (f'pool {args.concurrency}, identity', args.concurrency, False),
+        (f'pool {args.concurrency}, gzip', args.concurrency, True),
+    ]
+    print(f"{'transport':>20} {'seconds':>8} {'requests':>9} {'conns':>6} {'reuse':>6} {'wire KiB':>9} {'decoded KiB':>12}")
+    for name, pool_maxsize, compress in configs:
+        elapsed, stats = run(args.pages, args.concurrency, args.latency, pool_maxsize, compress)
+        print(f"{name:>20} {elapsed:>8.2f} {stats['requests']:>9} {stats['connections']:>6} "
+              f"{stats['reuse_ratio']:>6.0%} {stats['wire_bytes'] / 1024:>9.0f} {stats['decoded_bytes'] / 1024:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""Local stand-in for books.toscrape.com used by the benchmarks
+
+Besides the synthetic catalogue it serves a generic shop under /shop/ for
+custom-site crawls, the same shop laid out in grid rows under /grid/, small PNG product images, and recorded pages from a
+directory when given one.
+Latency, jitter and errors are drawn from a seeded generator so runs are
+reproducible.
+"""
+import gzip
+import hashlib
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BOOKS_PER_PAGE = 20
+RATINGS = ['One', 'Two', 'Three', 'Four', 'Five']
+CATEGORIES = ['Travel', 'Mystery', 'Historical Fiction', 'Poetry', 'Science']
+IMAGE_VARIANTS = 16
+GRID_COLUMNS = 4
+
+
+def book_slug(book_id):
+    """URL slug for a fixture book"""
+    return f"book-{book_id}_{book_id}"
+
+
+def book_price(book_id, revision=0):
+    """Fixture price; every 25th book is repriced on each catalogue revision"""
+    price = 10 + (book_id * 37) % 4000 / 100
+    if book_id % 25 == 0:
+        price += revision
+    return price
+
+
+def category_slug(index):
+    """URL directory of a fixture category, relative to catalogue/"""
+    name = CATEGORIES[index]
+    return f"category/books/{name.lower().replace(' ', '-')}_{index + 2}"
+
+
+def category_books(index, total_pages):
+    """Ids of the books in a category; each book belongs to one"""
+    return [book_id for book_id in range(1, total_pages * BOOKS_PER_PAGE + 1)
+            if book_id % len(CATEGORIES) == index]
+
+
+def render_listing_page(page, total_pages, revision=0):
+    """Render a catalogue listing page shaped like books.toscrape.com"""
+    # Page 1 lives at the site root, later pages under catalogue/
+    prefix = 'catalogue/' if page == 1 else ''
+    first_id = (page - 1) * BOOKS_PER_PAGE + 1
+    book_ids = range(first_id, first_id + BOOKS_PER_PAGE)
+    return _render_listing(book_ids, page, total_pages, prefix, prefix, prefix, revision)
+
+
+def render_category_page(index, page, total_pages, revision=0):
+    """Render one page of a category listing, or None past its last page"""
+    book_ids = category_books(index, total_pages)
+    category_pages = max(1, -(-len(book_ids) // BOOKS_PER_PAGE))
+    if not 1 <= page <= category_pages:
+        return None
+    start = (page - 1) * BOOKS_PER_PAGE
+    return _render_listing(book_ids[start:start + BOOKS_PER_PAGE], page, category_pages,
+                           '../../../', '../../../', '', revision)
+
+
+def _render_listing(book_ids, page, total_pages, book_prefix, category_prefix, next_prefix, revision):
+    """Listing HTML; each prefix makes its links relative to the page's own directory"""
+    articles = []
+    for book_id in book_ids:
+        slug = book_slug(book_id)
+        rating = RATINGS[book_id % len(RATINGS)]
+        price = book_price(book_id, revision)
+        articles.append(f"""
+<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+<article class="product_pod">
+  <div class="image_container">
+    <a href="{book_prefix}{slug}/index.html"><img src="media/cache/{book_id:04d}.jpg" alt="Book {book_id}" class="thumbnail"></a>
+  </div>
+  <p class="star-rating {rating}"><i class="icon-star"></i></p>
+  <h3><a href="{book_prefix}{slug}/index.html" title="Book {book_id}">Book {book_id}</a></h3>
+  <div class="product_price">
+    <p class="price_color">£{price:.2f}</p>
+    <p class="instock availability"><i class="icon-ok"></i> In stock</p>
+  </div>
+</article>
+</li>""")
+
+    sidebar = ''.join(
+        f'<li><a href="{category_prefix}{category_slug(i)}/index.html">{name}</a></li>'
+        for i, name in enumerate(CATEGORIES)
+    )
+    pager = f'<li class="current">Page {page} of {total_pages}</li>'
+    if page < total_pages:
+        pager += f'<li class="next"><a href="{next_prefix}page-{page + 1}.html">next</a></li>'
+
+    return f"""<!DOCTYPE html>
+<html><head><title>All products | Books to Scrape</title></head>
+<body>
+<div class="container-fluid page">
+<ul class="breadcrumb"><li><a href="index.html">Home</a></li><li class="active">All products</li></ul>
+<div class="row">
+<aside class="sidebar col-sm-4 col-md-3">
+  <div class="side_categories"><ul class="nav nav-list">
+    <li><a href="{category_prefix}category/books_1/index.html">Books</a><ul>{sidebar}</ul></li>
+  </ul></div>
+</aside>
+<div class="col-sm-8 col-md-9">
+<section><ol class="row">{''.join(articles)}</ol>
+<div><ul class="pager">{pager}</ul></div>
+</section>
+</div></div></div>
+</body></html>"""
+
+
+def render_shop_page(page, total_pages, products_per_page=BOOKS_PER_PAGE, columns=None):
+    """Render a generic storefront listing page for custom-site crawls
+
+    With columns the cards sit in div.row > div.col grid rows of that width.
+    """
+    first_id = (page - 1) * products_per_page + 1
+    card_list = [f"""
+<div class="card" data-sku="{i}">
+  <div class="card-media"><img src="/img/{i}.jpg" alt=""></div>
+  <div class="card-body">
+    <h3 class="card-title"><a href="/shop/item-{i}.html">Product {i}</a></h3>
+    <p class="card-text">Short description of product {i}.</p>
+    <span class="amount">${book_price(i):.2f}</span>
+  </div>
+</div>""" for i in range(first_id, first_id + products_per_page)]
+    if columns:
+        cards = ''.join(
+            '<div class="row">' + ''.join(f'<div class="col">{card}</div>' for card in card_list[start:start + columns])
+            + '</div>' for start in range(0, len(card_list), columns))
+    else:
+        cards = ''.join(card_list)
+    pager = f'<a rel="next" href="page-{page + 1}.html">Next</a>' if page < total_pages else ''
+    return f"""<!DOCTYPE html><html><head><title>Shop - page {page}</title></head><body>
+<nav><ul class="menu">{''.join(f'<li><a href="/c/{i}">Department {i}</a></li>' for i in range(12))}</ul></nav>
+<main><h1>Catalog</h1><div class="grid">{cards}</div>
+<div class="pagination">{pager}</div></main>
+</body></html>"""
+
+
+def render_image(image_id):
+    """8x8 PNG product image; ids with the same remainder share bytes, like placeholder images"""
+    variant = image_id % IMAGE_VARIANTS
+    pixel = bytes((variant * 16, 255 - variant * 16, 128))
+    rows = b''.join(b'\x00' + pixel * 8 for _ in range(8))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', 8, 8, 8, 2, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+def pad_page(body, page_size):
+    """Pad an HTML page with a comment to at least page_size bytes"""
+    missing = page_size - len(body.encode('utf-8'))
+    if missing <= 0:
+        return body
+    filler = ('fixture padding ' * (missing // 16 + 1))[:missing]
+    return body.replace('</body>', f'<!-- {filler} --></body>', 1)
+
+
+def render_detail_page(book_id, revision=0):
+    """Render a product page shaped like books.toscrape.com"""
+    category = CATEGORIES[book_id % len(CATEGORIES)]
+    price = book_price(book_id, revision)
+    rating = RATINGS[book_id % len(RATINGS)]
+    stock = book_id % 23
+    return f"""<!DOCTYPE html>
+<html><head><title>Book {book_id} | Books to Scrape</title></head>
+<body>
+<div class="container-fluid page">
+<ul class="breadcrumb">
+  <li><a href="../../index.html">Home</a></li>
+  <li><a href="../category/books_1/index.html">Books</a></li>
+  <li><a href="../category/books/{category.lower()}_2/index.html">{category}</a></li>
+  <li class="active">Book {book_id}</li>
+</ul>
+<article class="product_page">
+  <div class="row"><div class="col-sm-6 product_main">
+    <h1>Book {book_id}</h1>
+    <p class="price_color">£{price:.2f}</p>
+    <p class="instock availability"><i class="icon-ok"></i> In stock ({stock} available)</p>
+    <p class="star-rating {rating}"><i class="icon-star"></i></p>
+  </div></div>
+  <div id="product_description" class="sub-header"><h2>Product Description</h2></div>
+  <p>{'A fixture description for book %d. ' % book_id * 12}</p>
+  <div class="sub-header"><h2>Product Information</h2></div>
+  <table class="table table-striped">
+    <tr><th>UPC</th><td>{book_id:016x}</td></tr>
+    <tr><th>Product Type</th><td>Books</td></tr>
+    <tr><th>Price (excl. tax)</th><td>£{price:.2f}</td></tr>
+    <tr><th>Price (incl. tax)</th><td>£{price:.2f}</td></tr>
+    <tr><th>Tax</th><td>£0.00</td></tr>
+    <tr><th>Availability</th><td>In stock ({stock} available)</td></tr>
+    <tr><th>Number of reviews</th><td>0</td></tr>
+  </table>
+</article>
+</div>
+</body></html>"""
+
+
+class FixtureServer:
+    """Threaded HTTP server serving a synthetic catalogue on localhost
+
+    Each response waits latency plus a uniform 0..jitter seconds, fails with
+    a 500 at error_rate, and is padded to at least page_size bytes. Paths
+    found under fixture_dir are served from there instead of being rendered.
+    """
+
+    def __init__(self, total_pages=50, latency=0.0, revision=0, compress=False, jitter=0.0,
+                 error_rate=0.0, page_size=0, fixture_dir=None, seed=0):
+        self.total_pages = total_pages
+        self.latency = latency
+        self.revision = revision
+        self.compress = compress
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.fixture_dir = fixture_dir
+        self.request_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle on, every keep-alive
+            # response would wait ~40 ms for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                    delay = server.latency + server.jitter * server._random.random()
+                    failed = server._random.random() < server.error_rate
+                    if failed:
+                        server.error_count += 1
+                if delay:
+                    time.sleep(delay)
+
+                if failed:
+                    self.send_response(500)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                body = server.render(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                if isinstance(body, bytes):
+                    payload, content_type = body, 'image/png'
+                else:
+                    payload, content_type = pad_page(body, server.page_size).encode('utf-8'), 'text/html; charset=utf-8'
+                etag = '"%s"' % hashlib.md5(payload).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('ETag', etag)
+                if server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    payload = gzip.compress(payload)
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def render(self, path):
+        """Return the page body (bytes for an image) for a request path, or None for 404"""
+        path = path.split('?', 1)[0].lstrip('/')
+        if self.fixture_dir:
+            recorded = self._recorded(path)
+            if recorded is not None:
+                return recorded
+        if path in ('', 'index.html'):
+            return render_listing_page(1, self.total_pages, self.revision)
+        if path.startswith('catalogue/page-') and path.endswith('.html'):
+            page = int(path[len('catalogue/page-'):-len('.html')])
+            if 1 <= page <= self.total_pages:
+                return render_listing_page(page, self.total_pages, self.revision)
+            return None
+        if path.startswith('catalogue/category/books/'):
+            for index in range(len(CATEGORIES)):
+                category_dir = f'catalogue/{category_slug(index)}/'
+                if path.startswith(category_dir):
+                    name = path[len(category_dir):]
+                    if name == 'index.html':
+                        return render_category_page(index, 1, self.total_pages, self.revision)
+                    if name.startswith('page-') and name.endswith('.html'):
+                        page = int(name[len('page-'):-len('.html')])
+                        return render_category_page(index, page, self.total_pages, self.revision)
+            return None
+        if path.startswith('catalogue/book-') and path.endswith('/index.html'):
+            book_id = int(path.split('_')[-1].split('/')[0])
+            return render_detail_page(book_id, self.revision)
+        name = path.rsplit('/', 1)[-1]
+        if (path.startswith('img/') or '/media/cache/' in '/' + path) and name[:-len('.jpg')].isdigit():
+            return render_image(int(name[:-len('.jpg')]))
+        if path.startswith(('shop/', 'grid/')):
+            prefix, name = path.split('/', 1)
+            columns = GRID_COLUMNS if prefix == 'grid' else None
+            if name in ('', 'index.html'):
+                return render_shop_page(1, self.total_pages, columns=columns)
+            if name.startswith('page-') and name.endswith('.html'):
+                page = int(name[len('page-'):-len('.html')])
+                if 1 <= page <= self.total_pages:
+                    return render_shop_page(page, self.total_pages, columns=columns)
+        return None
+
+    def _recorded(self, path):
+        """A recorded page from fixture_dir, e.g. a wget mirror; directories map to index.html"""
+        root = os.path.abspath(self.fixture_dir)
+        filename = os.path.normpath(os.path.join(root, path))
+        if os.path.isdir(filename):
+            filename = os.path.join(filename, 'index.html')
+        if not filename.startswith(root) or not os.path.isfile(filename):
+            return None
+        with open(filename, encoding='utf-8', errors='replace') as f:
+            return f.read()
+
+    @property
+    def shop_url(self):
+        return self.base_url + 'shop/'
+
+    @property
+    def grid_url(self):
+        return self.base_url + 'grid/'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
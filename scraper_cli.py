@@ -0,0 +1,374 @@
+"""Headless command-line entry point for batch scraping
+
+Example:
+    python scraper_cli.py run --site books --pages 50 --concurrency 16 --out data.ndjson
+    python scraper_cli.py run --site books --pages 50 --processes 4 --queue /shared/q --out data.ndjson
+    python scraper_cli.py worker --queue /shared/q      # on another machine
+    python scraper_cli.py run --site books --pages 50 --store && python scraper_cli.py drops
+    python scraper_cli.py run --site books --pages 5 --images --thumbnails 200 --out data.csv
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+from scraper_core import (EcommerceScraper, AsyncEcommerceScraper, ResponseCache, CrawlCheckpoint,
+                          CrawlPipeline, HttpTransport, ImageStage, ProductDeduplicator, ProductStore, ShardedCrawl,
+                          PARSERS, open_sink, run_shard_worker)
+
+BOOKS_URL = "https://books.toscrape.com/"
+
+
+def build_parser():
+    """Argument parser for the `scrape` command"""
+    parser = argparse.ArgumentParser(prog='scrape', description="Headless e-commerce scraper")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run = commands.add_parser('run', help="Crawl a site and stream records to a file or stdout")
+    run.add_argument('--site', default='books',
+                     help="'books' for books.toscrape.com, or a custom site URL")
+    run.add_argument('--books-url', default=BOOKS_URL,
+                     help="base URL used by --site books (e.g. a mirror or local copy)")
+    run.add_argument('--pages', type=int, default=1, help="maximum listing pages (default: 1)")
+    run.add_argument('--products', type=int, default=None, help="maximum products")
+    run.add_argument('--concurrency', type=int, default=8, help="parallel detail fetches (default: 8)")
+    run.add_argument('--rps', type=float, default=4.0, help="requests per second per host (default: 4)")
+    run.add_argument('--burst', type=int, default=4, help="rate limiter burst size (default: 4)")
+    run.add_argument('--out', default='-',
+                     help="output file, format chosen by extension (default: NDJSON on stdout)")
+    run.add_argument('--parser', choices=PARSERS, default=None, help="HTML parser backend")
+    run.add_argument('--pool-size', type=int, default=None,
+                     help="pooled connections per host, at least --concurrency (default: max(concurrency, 10))")
+    run.add_argument('--retries', type=int, default=2,
+                     help="transport retries with jittered backoff for connection errors and 5xx (default: 2)")
+    run.add_argument('--http2', action='store_true', help="multiplex requests over HTTP/2 (needs httpx[http2])")
+    run.add_argument('--dns-cache', type=float, default=None, metavar='TTL',
+                     help="cache DNS lookups for TTL seconds")
+    run.add_argument('--cache', action='store_true', help="use the on-disk HTTP response cache")
+    run.add_argument('--incremental', action='store_true', help="output only new, changed and removed products")
+    run.add_argument('--checkpoint', action='store_true', help="checkpoint progress so the crawl can be resumed")
+    run.add_argument('--fresh', action='store_true',
+                     help="ignore an existing checkpoint, or clear a used --queue, and start over")
+    run.add_argument('--async', dest='use_async', action='store_true', help="use the asyncio crawl engine")
+    run.add_argument('--quiet', action='store_true', help="do not log progress to stderr")
+    run.add_argument('--pipeline', action='store_true',
+                     help="run fetching and parsing as separate stages with bounded queues")
+    run.add_argument('--categories', action='store_true',
+                     help="with --site books, crawl the sidebar categories in parallel (implies --pipeline)")
+    run.add_argument('--parse-workers', type=int, default=2, help="parser threads for --pipeline (default: 2)")
+    run.add_argument('--processes', type=int, default=1,
+                     help="crawl shards in this many worker processes (default: 1, no sharding)")
+    run.add_argument('--queue', default=None,
+                     help="shard queue directory; other machines can join with 'worker --queue'")
+    run.add_argument('--wait', type=float, default=None, metavar='SECONDS',
+                     help="stop waiting for shards claimed by other workers after SECONDS (default: wait)")
+    run.add_argument('--seed', action='append', default=[],
+                     help="extra start URL (e.g. a category) to shard a custom site by; repeatable")
+    run.add_argument('--report', default=None, metavar='FILE',
+                     help="write the per-stage timing report, with per-URL spans, to FILE as JSON")
+    run.add_argument('--prometheus', default=None, metavar='FILE',
+                     help="write the run's metrics to FILE in the Prometheus text format")
+    run.add_argument('--metrics-port', type=int, default=None, metavar='PORT',
+                     help="serve live Prometheus metrics on http://127.0.0.1:PORT/metrics during the run")
+    run.add_argument('--store', nargs='?', const='', default=None, metavar='PATH',
+                     help="also save products and their price history to an SQLite store "
+                          "(default: ~/.web-scraper/products.sqlite)")
+    run.add_argument('--dedupe', action='store_true',
+                     help="drop products already seen under the same canonical URL or with a near-identical "
+                          "title, price and image")
+    run.add_argument('--images', nargs='?', const='', default=None, metavar='DIR',
+                     help="download product images into a content-addressed store and add image_hash and "
+                          "image_path to each record (default: ~/.web-scraper/images)")
+    run.add_argument('--thumbnails', type=int, default=None, metavar='SIZE',
+                     help="with --images, also make thumbnails of at most SIZE pixels (needs Pillow)")
+    
+    worker = commands.add_parser('worker', help="Crawl shards from a shared queue directory")
+    worker.add_argument('--queue', required=True, help="shard queue directory")
+    worker.add_argument('--concurrency', type=int, default=8, help="parallel detail fetches (default: 8)")
+    worker.add_argument('--rps', type=float, default=4.0, help="requests per second per host (default: 4)")
+    worker.add_argument('--burst', type=int, default=4, help="rate limiter burst size (default: 4)")
+    worker.add_argument('--parser', choices=PARSERS, default=None, help="HTML parser backend")
+    worker.add_argument('--quiet', action='store_true', help="do not log progress to stderr")
+    
+    drops = commands.add_parser('drops', help="Print products whose price dropped in the last stored run")
+    drops.add_argument('--store', default=None, metavar='PATH',
+                       help="product store (default: ~/.web-scraper/products.sqlite)")
+    drops.add_argument('--run', type=int, default=None, help="run id to compare (default: the last run)")
+    drops.add_argument('--limit', type=int, default=None, help="print at most this many products")
+    drops.add_argument('--history', default=None, metavar='URL',
+                       help="print the price and availability history of one product instead")
+    return parser
+
+
+class StdoutSink:
+    """NDJSON on stdout, with the sink interface the scrape loop expects"""
+    
+    filename = '<stdout>'
+    
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.count = 0
+    
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self.count += 1
+    
+    def close(self):
+        self.stream.flush()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run(args):
+    """Run one crawl; returns the process exit status"""
+    books = args.site == 'books'
+    start_url = args.books_url if books else args.site
+    if not books and not start_url.startswith(('http://', 'https://')):
+        print(f"Error: --site must be 'books' or an http(s) URL, got {args.site!r}", file=sys.stderr)
+        return 2
+    
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+    
+    if args.processes > 1 or args.queue:
+        if (args.incremental or args.checkpoint or args.use_async or args.cache or args.store is not None
+                or args.images is not None):
+            print("Error: sharded crawls do not support --incremental, --checkpoint, --async, --cache, --store "
+                  "or --images", file=sys.stderr)
+            return 2
+        if args.report or args.prometheus or args.metrics_port:
+            print("Error: sharded crawls do not support --report, --prometheus or --metrics-port",
+                  file=sys.stderr)
+            return 2
+        return run_sharded(args, start_url, books, log)
+    
+    if args.categories:
+        if not books:
+            print("Error: --categories needs --site books", file=sys.stderr)
+            return 2
+        args.pipeline = True
+    if args.pipeline and (args.incremental or args.checkpoint or args.use_async):
+        print("Error: --pipeline does not support --incremental, --checkpoint or --async", file=sys.stderr)
+        return 2
+    
+    kwargs = dict(
+        max_pages=args.pages,
+        max_products=args.products,
+        callback=log,
+        incremental=args.incremental
+    )
+    if books:
+        kwargs['base_url'] = start_url
+    if args.checkpoint:
+        kwargs.update(checkpoint=CrawlCheckpoint.for_url(start_url), resume=not args.fresh)
+    
+    images = None
+    if args.images is not None:
+        try:
+            images = ImageStage(args.images or None, concurrency=args.concurrency, thumbnail_size=args.thumbnails)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+    
+    # Everything from here on holds connections or files, so it is closed on every exit
+    scraper = None
+    try:
+        try:
+            transport = HttpTransport(
+                pool_maxsize=args.pool_size or max(args.concurrency, 10),
+                retries=args.retries,
+                http2=args.http2,
+                dns_cache_ttl=args.dns_cache
+            )
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        
+        scraper_class = AsyncEcommerceScraper if args.use_async else EcommerceScraper
+        scraper = scraper_class(
+            concurrency=args.concurrency,
+            requests_per_second=args.rps,
+            burst=args.burst,
+            cache=ResponseCache() if args.cache else None,
+            parser=args.parser,
+            transport=transport,
+            store=ProductStore(args.store or None) if args.store is not None else None,
+            dedupe=ProductDeduplicator() if args.dedupe else None
+        )
+        return _crawl(args, scraper, kwargs, images, books, start_url, log)
+    finally:
+        if scraper is not None:
+            scraper.close()
+        if images:
+            images.close()
+
+
+def _crawl(args, scraper, kwargs, images, books, start_url, log):
+    """Stream the crawl's records to the output; the caller closes scraper and images"""
+    try:
+        sink = StdoutSink() if args.out == '-' else open_sink(args.out)
+    except Exception as e:
+        print(f"Error opening output {args.out}: {e}", file=sys.stderr)
+        return 1
+    
+    metrics_server = None
+    if args.metrics_port:
+        try:
+            metrics_server = scraper.profiler.serve_prometheus(args.metrics_port)
+        except OSError as e:
+            print(f"Error serving metrics on port {args.metrics_port}: {e}", file=sys.stderr)
+            sink.close()
+            return 1
+        log(f"📡 Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+    
+    # The engine prints fetch errors; keep them out of NDJSON written to stdout
+    records = None
+    try:
+        with redirect_stdout(sys.stderr):
+            if args.use_async:
+                asyncio.run(_drain_async(scraper, "books.toscrape.com" if books else start_url, kwargs, sink,
+                                         images, log))
+            else:
+                if args.pipeline:
+                    del kwargs['incremental']
+                    if args.categories:
+                        kwargs['categories'] = True
+                    pipeline = CrawlPipeline(scraper, parse_workers=args.parse_workers)
+                    records = pipeline.iter_products("books.toscrape.com" if books else start_url, **kwargs)
+                else:
+                    records = scraper.iter_products("books.toscrape.com" if books else start_url, **kwargs)
+                if images:
+                    records = images.process(records, log)
+                for record in records:
+                    with scraper.profiler.span('export'):
+                        sink.write(record)
+    except KeyboardInterrupt:
+        scraper.running = False
+        log("⏹️ Interrupted")
+        return 130
+    finally:
+        # Wind the record stream down before the caller closes the stages it still writes to
+        if records is not None:
+            records.close()
+        sink.close()
+        if metrics_server:
+            metrics_server.shutdown()
+        write_reports(args, scraper.profiler, log)
+    
+    log(f"💾 Wrote {sink.count} records to: {sink.filename}")
+    return 0
+
+def write_reports(args, profiler, log):
+    """Write the --report and --prometheus files for a finished or interrupted run"""
+    try:
+        if args.report:
+            profiler.save_json(args.report)
+            log(f"⏱️ Performance report written to: {args.report}")
+        if args.prometheus:
+            with open(args.prometheus, 'w', encoding='utf-8') as f:
+                f.write(profiler.prometheus())
+    except OSError as e:
+        print(f"Error writing report: {e}", file=sys.stderr)
+
+
+def run_sharded(args, start_url, books, log):
+    """Shard the crawl across worker processes and merge their output"""
+    queue_dir = args.queue or tempfile.mkdtemp(prefix='scrape-shards-')
+    crawl = ShardedCrawl(queue_dir, processes=args.processes, scraper_options=dict(
+        concurrency=args.concurrency,
+        requests_per_second=args.rps,
+        burst=args.burst,
+        parser=args.parser
+    ))
+    if books:
+        shards = crawl.plan_books(start_url, args.pages)
+    else:
+        shards = crawl.plan_seeds([start_url] + args.seed, args.pages)
+    if args.fresh:
+        crawl.queue.clear()
+    try:
+        crawl.enqueue(shards)
+    except ValueError as e:
+        print(f"Error: {e} (add --fresh to clear it)", file=sys.stderr)
+        return 2
+    log(f"🧩 {len(shards)} shards queued in {queue_dir}, {crawl.processes} worker processes")
+    
+    with redirect_stdout(sys.stderr):
+        counts = crawl.run(callback=log, timeout=args.wait)
+    
+    try:
+        sink = StdoutSink() if args.out == '-' else open_sink(args.out)
+    except Exception as e:
+        print(f"Error opening output {args.out}: {e}", file=sys.stderr)
+        return 1
+    with sink:
+        written, duplicates = crawl.merge(sink, args.products, ProductDeduplicator() if args.dedupe else None)
+    log(f"💾 Wrote {written} records to: {sink.filename} ({duplicates} duplicates dropped)")
+    if counts['failed']:
+        print(f"Error: {counts['failed']} shards failed; see {crawl.queue.failed_dir}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_worker(args):
+    """Drain a shared shard queue"""
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+    
+    options = dict(concurrency=args.concurrency, requests_per_second=args.rps, burst=args.burst,
+                   parser=args.parser)
+    with redirect_stdout(sys.stderr):
+        written = run_shard_worker(args.queue, options, log)
+    log(f"💾 Wrote {written} records to the shard queue")
+    return 0
+
+
+def run_drops(args):
+    """Print the last run's price drops, or one product's history, as NDJSON"""
+    store = ProductStore(args.store)
+    try:
+        if args.history:
+            rows = store.history(args.history)
+        else:
+            rows = store.price_drops(args.run, args.limit)
+    finally:
+        store.close()
+    sink = StdoutSink()
+    for row in rows:
+        sink.write(row)
+    sink.close()
+    return 0
+
+
+async def _drain_async(scraper, url, kwargs, sink, images=None, log=None):
+    """Write every record from the async engine to sink"""
+    records = scraper.aiter_products(url, **kwargs)
+    if images:
+        records = images.aprocess(records, log)
+    async for record in records:
+        with scraper.profiler.span('export'):
+            sink.write(record)
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    args = build_parser().parse_args(argv)
+    if args.command == 'run':
+        return run(args)
+    if args.command == 'worker':
+        return run_worker(args)
+    if args.command == 'drops':
+        return run_drops(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
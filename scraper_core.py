@@ -0,0 +1,4290 @@
+"""Scraping engine: fetching, parsing, caching and export, with no GUI dependencies"""
+import threading
+import queue
+import asyncio
+import heapq
+import itertools
+import math
+import mimetypes
+import posixpath
+import random
+import sys
+from array import array
+from collections import Counter, deque
+from collections.abc import Mapping
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+import json
+import csv
+import os
+import sqlite3
+import hashlib
+import re
+import socket
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import time
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from email.utils import parsedate_to_datetime
+
+# Local state (HTTP cache, indexes) lives outside the working directory
+DATA_DIR = os.path.join(os.path.expanduser('~'), '.web-scraper')
+
+# Titles are cut to this many characters in progress messages
+LOG_TITLE_LENGTH = 40
+
+
+def _scraped_message(record):
+    """Progress message logged for each scraped record"""
+    return f"✅ Scraped: {record.get('title', 'Unknown')[:LOG_TITLE_LENGTH]}..."
+
+
+def _available_parsers():
+    """BeautifulSoup tree builders installed here, fastest first"""
+    parsers = []
+    try:
+        import lxml  # noqa: F401
+        parsers.append('lxml')
+    except ImportError:
+        pass
+    parsers.append('html.parser')
+    return parsers
+
+
+PARSERS = _available_parsers()
+DEFAULT_PARSER = PARSERS[0]
+
+# Partial-parse strainers for known page schemas: only these subtrees are built
+BOOKS_LISTING_STRAINER = SoupStrainer(class_=['product_pod', 'next'])
+BOOKS_DETAIL_STRAINER = SoupStrainer(['article', 'ul'], class_=['product_page', 'breadcrumb'])
+BOOKS_CATEGORY_STRAINER = SoupStrainer('div', class_='side_categories')
+
+def _now_string(base_url):
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _rating_word(value, base_url):
+    """Pick the rating word out of a star-rating class list"""
+    classes = value if isinstance(value, list) else str(value).split()
+    for class_name in classes:
+        if class_name != 'star-rating':
+            return class_name
+    return None
+
+
+# Typed fields parsed from the scraped text: price_value, currency, rating_value, stock
+CURRENCY_CODES = {'£': 'GBP', '$': 'USD', '€': 'EUR', '¥': 'JPY', '₹': 'INR'}
+RATING_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5}
+_CURRENCY_SYMBOL = re.compile(r'[£$€¥₹]')
+_CURRENCY_CODE = re.compile(r'\b[A-Z]{3}\b')
+_AMOUNT_PATTERN = re.compile(r'\d[\d.,]*')
+_STOCK_PATTERN = re.compile(r'(\d+)\s+available')
+
+
+def parse_price(text):
+    """(Decimal amount, ISO currency code) from a price string; None for a part not found
+    
+    The last '.' or ',' followed by one or two digits is the decimal point and
+    other separators group thousands, so '£1,234.50' and '1.234,50 EUR' agree.
+    """
+    if not text or not isinstance(text, str):
+        return None, None
+    currency = _CURRENCY_SYMBOL.search(text) or _CURRENCY_CODE.search(text)
+    if currency:
+        currency = CURRENCY_CODES.get(currency.group(), currency.group())
+    
+    amount = _AMOUNT_PATTERN.search(text)
+    if not amount:
+        return None, currency
+    digits = amount.group().rstrip('.,')
+    point = max(digits.rfind('.'), digits.rfind(','))
+    if point >= 0 and len(digits) - point - 1 in (1, 2):
+        digits = digits[:point].replace('.', '').replace(',', '') + '.' + digits[point + 1:]
+    else:
+        digits = digits.replace('.', '').replace(',', '')
+    try:
+        return Decimal(digits), currency
+    except InvalidOperation:
+        return None, currency
+
+
+def parse_rating(value):
+    """Star rating 1-5 from a word ('Three') or a number ('4', '4 out of 5'), else None"""
+    if not value or not isinstance(value, str):
+        return None
+    word = value.strip().lower()
+    if word in RATING_WORDS:
+        return RATING_WORDS[word]
+    if word[:1].isdigit() and 1 <= int(word[0]) <= 5:
+        return int(word[0])
+    return None
+
+
+def parse_stock(text):
+    """Units in stock from availability text: 'In stock (22 available)' is 22, out of stock is 0"""
+    if not text or not isinstance(text, str):
+        return None
+    match = _STOCK_PATTERN.search(text)
+    if match:
+        return int(match.group(1))
+    lowered = text.lower()
+    if 'out of stock' in lowered or 'sold out' in lowered or 'unavailable' in lowered:
+        return 0
+    return None
+
+
+def add_typed_fields(record):
+    """Set the typed fields from the record's text fields; safe to repeat"""
+    record['price_value'], record['currency'] = parse_price(record.get('price'))
+    record['rating_value'] = parse_rating(record.get('rating'))
+    record['stock'] = parse_stock(record.get('availability'))
+    return record
+
+
+def _json_default(value):
+    """JSON encoding for typed record fields; Decimal keeps its exact digits as a string"""
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _nearest_rank(ordered, q):
+    """Nearest-rank percentile q (0-1) of a sorted sequence"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+# Named post-processors so rules stay plain data
+POST_PROCESSORS = {
+    'absolute_url': lambda value, base_url: urljoin(base_url, value),
+    'rating_word': _rating_word,
+    'field_name': lambda value, base_url: value.lower().replace(' ', '_'),
+}
+
+
+# tag.class#id[attr] compounds joined by descendant combinators, comma-separated
+_SIMPLE_SELECTOR = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*)?(?P<id>#[\w-]+)?(?P<classes>(?:\.[\w-]+)*)(?P<attr>\[[\w-]+\])?$')
+
+
+def _compile_simple_selector(css):
+    """Compile a simple selector list to alternatives of match tuples (innermost first), or None"""
+    alternatives = []
+    for alternative in css.split(','):
+        parts = []
+        for part in alternative.split():
+            match = _SIMPLE_SELECTOR.match(part)
+            if not match:
+                return None
+            parts.append((
+                match.group('tag'),
+                match.group('id')[1:] if match.group('id') else None,
+                frozenset(filter(None, match.group('classes').split('.'))),
+                match.group('attr')[1:-1] if match.group('attr') else None,
+            ))
+        if not parts:
+            return None
+        alternatives.append(tuple(reversed(parts)))
+    return tuple(alternatives)
+
+
+def _matches_compound(tag, compound):
+    name, id_, classes, attr = compound
+    if name and tag.name != name:
+        return False
+    if id_ and tag.get('id') != id_:
+        return False
+    if classes and not classes.issubset(tag.get('class') or ()):
+        return False
+    if attr and not tag.has_attr(attr):
+        return False
+    return True
+
+
+def _matches_simple(tag, alternatives, scope):
+    """Match tag against compiled alternatives, looking for ancestors inside scope"""
+    for compounds in alternatives:
+        if not _matches_compound(tag, compounds[0]):
+            continue
+        ancestor = tag.parent
+        for compound in compounds[1:]:
+            while ancestor is not None and ancestor is not scope and not _matches_compound(ancestor, compound):
+                ancestor = ancestor.parent
+            if ancestor is None or ancestor is scope:
+                break
+            ancestor = ancestor.parent
+        else:
+            return True
+    return False
+
+
+class ExtractionRules:
+    """Declarative per-site extraction rules, compiled once and applied per page
+    
+    rules = {
+        'container': CSS selector matching one product on a listing page,
+        'fields': {field: spec, or a list of specs tried in order},
+        'const': {field: value, or callable(base_url)},
+    }
+    A spec has 'css' (selector within the container) or 'text' (regex over
+    text nodes), plus optional 'attr' (attribute to read, element text when
+    omitted), 'index' (which match to use), 'post' (POST_PROCESSORS name),
+    'max_length' and 'default' ('N/A' unless given; None omits the field).
+    A spec with 'pairs': [key css, value css] spreads each match into the
+    record as key/value fields, e.g. a product information table.
+    
+    Simple selectors (tag.class#id[attr] with descendant combinators) are all
+    resolved in a single walk over the element; anything else goes through
+    soupsieve.
+    """
+    
+    def __init__(self, rules):
+        self.rules = rules
+        container = rules.get('container')
+        self.container = soupsieve.compile(container) if container else None
+        self.const = rules.get('const', {})
+        self.fields = []
+        self._simple_specs = []
+        self._slot_count = 0
+        for name, specs in rules.get('fields', {}).items():
+            if isinstance(specs, dict):
+                specs = [specs]
+            compiled = [self._compile_spec(spec) for spec in specs]
+            self.fields.append((name, compiled))
+            self._simple_specs.extend(spec for spec in compiled if spec.get('simple'))
+    
+    def _compile_spec(self, spec):
+        compiled = dict(spec)
+        if 'css' in spec:
+            compiled['css'] = soupsieve.compile(spec['css'])
+            simple = _compile_simple_selector(spec['css']) if 'pairs' not in spec else None
+            if simple:
+                compiled['simple'] = simple
+                compiled['slot'] = self._slot_count
+                self._slot_count += 1
+        if 'text' in spec:
+            compiled['text'] = re.compile(spec['text'])
+        if 'pairs' in spec:
+            compiled['pairs'] = [soupsieve.compile(css) for css in spec['pairs']]
+        compiled['post'] = POST_PROCESSORS[spec['post']] if spec.get('post') else None
+        return compiled
+    
+    def select_containers(self, soup):
+        """All product elements on a page"""
+        return self.container.select(soup) if self.container else []
+    
+    def extract_page(self, soup, base_url, limit=None):
+        """Extract every product on a page"""
+        records = []
+        for element in self.select_containers(soup):
+            if limit is not None and len(records) >= limit:
+                break
+            records.append(self.extract(element, base_url))
+        return records
+    
+    def _scan(self, element):
+        """Resolve every simple selector with one walk over element's descendants"""
+        found = {}
+        wanted = {spec['slot']: spec for spec in self._simple_specs}
+        for tag in element.descendants:
+            if tag.name is None:
+                continue
+            for slot, spec in list(wanted.items()):
+                if _matches_simple(tag, spec['simple'], element):
+                    matches = found.setdefault(slot, [])
+                    matches.append(tag)
+                    if len(matches) > spec.get('index', 0):
+                        del wanted[slot]
+            if not wanted:
+                break
+        return found
+    
+    def extract(self, element, base_url, record=None, choices=None, used=None):
+        """Apply the field rules to one element, filling record (a new dict by default)
+        
+        choices maps field names to the fallback index to try first; used, if
+        given, is filled with the index that matched for each field.
+        """
+        if record is None:
+            record = {}
+        found = self._scan(element) if self._simple_specs else {}
+        
+        for name, specs in self.fields:
+            value = None
+            order = range(len(specs))
+            first = choices.get(name) if choices else None
+            if first is not None and first < len(specs):
+                order = [first] + [index for index in order if index != first]
+            for index in order:
+                spec = specs[index]
+                if 'pairs' in spec:
+                    self._extract_pairs(element, spec, base_url, record)
+                    break
+                value = self._apply_spec(element, spec, base_url, found)
+                if value is not None:
+                    if used is not None:
+                        used[name] = index
+                    break
+            
+            if 'pairs' in specs[0]:
+                continue
+            if value is not None:
+                record[name] = value
+            else:
+                default = specs[-1].get('default', 'N/A')
+                if default is not None:
+                    record.setdefault(name, default)
+        
+        for name, value in self.const.items():
+            record[name] = value(base_url) if callable(value) else value
+        return record
+    
+    def _apply_spec(self, element, spec, base_url, found):
+        """Value of one spec within element, or None"""
+        index = spec.get('index', 0)
+        if 'text' in spec:
+            match = element.find(string=spec['text'])
+            value = match.strip() if match else None
+        else:
+            if spec.get('simple'):
+                matches = found.get(spec['slot'], ())
+            else:
+                matches = spec['css'].select(element, limit=index + 1)
+            if len(matches) <= index:
+                return None
+            attr = spec.get('attr')
+            value = matches[index].get(attr) if attr else matches[index].text.strip()
+        
+        if value and spec['post']:
+            value = spec['post'](value, base_url)
+        if value and spec.get('max_length'):
+            value = value[:spec['max_length']]
+        return value
+    
+    def _extract_pairs(self, element, spec, base_url, record):
+        """Spread key/value pairs from repeated rows into record"""
+        key_css, value_css = spec['pairs']
+        for row in spec['css'].select(element):
+            key = key_css.select_one(row)
+            value = value_css.select_one(row)
+            if key and value:
+                key = key.text.strip()
+                if spec['post']:
+                    key = spec['post'](key, base_url)
+                record[key] = value.text.strip()
+
+
+BOOKS_LISTING_RULES = ExtractionRules({
+    'container': 'article.product_pod',
+    'fields': {
+        'title': [{'css': 'h3 a', 'attr': 'title'}, {'css': 'h3 a'}],
+        'price': {'css': 'p.price_color'},
+        'rating': {'css': 'p.star-rating', 'attr': 'class', 'post': 'rating_word'},
+        'availability': {'css': 'p.instock'},
+        'url': {'css': 'h3 a[href]', 'attr': 'href', 'post': 'absolute_url'},
+        'image_url': {'css': 'img[src]', 'attr': 'src', 'post': 'absolute_url'},
+        'image_alt': {'css': 'img[src]', 'attr': 'alt', 'default': None},
+    },
+    'const': {
+        'category': 'N/A',
+        'scraped_date': _now_string,
+        'source': 'books.toscrape.com',
+    },
+})
+
+BOOKS_DETAIL_RULES = ExtractionRules({
+    'fields': {
+        'description': {'css': '#product_description ~ p', 'max_length': 200, 'default': None},
+        'product_information': {'css': 'table.table-striped tr', 'pairs': ['th', 'td'], 'post': 'field_name'},
+        'category': {'css': 'ul.breadcrumb a', 'index': 1, 'default': None},
+    },
+})
+
+GENERAL_PRODUCT_RULES = ExtractionRules({
+    'fields': {
+        'title': {'css': 'h1, h2, h3, h4, h5, h6, .title, .name'},
+        'price': [
+            {'text': '[$£€]'},
+            {'css': '.price, .cost, .amount, [class*="price"]'},
+        ],
+        'url': {'css': ':is(h1, h2, h3, h4, h5, h6, .title, .name) a[href]', 'attr': 'href', 'post': 'absolute_url'},
+        'image_url': {'css': 'img[src]', 'attr': 'src', 'post': 'absolute_url'},
+        'description': {'css': 'p', 'max_length': 100},
+    },
+    'const': {
+        'scraped_date': _now_string,
+        'source': lambda base_url: base_url,
+    },
+})
+
+
+class ProductDetector:
+    """Find a listing page's repeated product cards in one pass over the document
+    
+    Walking the descendants in reverse visits every child before its parent,
+    so each element's subtree is summarised as flags (contains a heading, a
+    price, a link, and whether it holds more than one of each) in a single
+    sweep. Elements are grouped by tag and class together with their parent's
+    tag and class, so cards split across grid rows form one group. The group
+    with the most members carrying all three flags is taken as the product
+    list. Ties go to the group whose members hold exactly one of each, so a
+    row of cards never beats the cards themselves, and then to the outermost
+    such group that is not a bare wrapper around a single child.
+    A CSS selector reproducing the group is returned so it can be reused on
+    the site's other pages without detecting again.
+    """
+    
+    HEADING = 1
+    PRICE = 2
+    LINK = 4
+    COMPLETE = HEADING | PRICE | LINK
+    # Set when a subtree holds two or more headings, prices or distinct links
+    REPEATED = COMPLETE << 3
+    HEADINGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    IGNORED = frozenset(['script', 'style', 'noscript', 'template'])
+    PRICE_PATTERN = re.compile(r'[$£€]')
+    
+    def detect(self, soup):
+        """Return (product elements, selector or None); ([], None) when nothing repeats"""
+        flags = {}
+        hrefs = {}
+        groups = {}
+        for node in reversed(list(soup.descendants)):
+            parent = node.parent
+            if parent is None or parent.name in self.IGNORED:
+                continue
+            
+            if node.name is None:
+                if self.PRICE_PATTERN.search(node):
+                    self._add(flags, hrefs, parent, self.PRICE)
+                continue
+            
+            node_flags = flags.get(id(node), 0)
+            href = hrefs.get(id(node))
+            if node.name in self.HEADINGS:
+                node_flags |= self.HEADING << 3 if node_flags & self.HEADING else self.HEADING
+            elif node.name == 'a' and node.get('href'):
+                node_flags |= self.LINK
+                href = node['href']
+            if node_flags:
+                self._add(flags, hrefs, parent, node_flags, href)
+            
+            key = (self._signature(parent), node.name, tuple(node.get('class') or ()))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [[], 0, 0, 0]
+            group[0].append(node)
+            if node_flags & self.COMPLETE == self.COMPLETE:
+                group[1] += 1
+                if not node_flags & self.REPEATED:
+                    group[3] += 1
+            if node_flags & (self.PRICE | self.LINK) == self.PRICE | self.LINK:
+                group[2] += 1
+        
+        # Most complete members wins; then members holding exactly one product,
+        # real cards over wrappers, the outer group and a higher share of
+        # complete members break ties.
+        best = None
+        best_score = (0,)
+        for members, complete, priced, single in groups.values():
+            # Cards missing a heading only count when no group has all three flags
+            if complete >= 2:
+                score = (2, complete, single) + self._shape(members[0]) + (complete / len(members),)
+            elif priced >= 2:
+                score = (1, priced, 0) + self._shape(members[0]) + (priced / len(members),)
+            else:
+                continue
+            if score > best_score:
+                best, best_score = members, score
+        if best is None:
+            return [], None
+        
+        # Collected in reverse, so restore document order
+        best.reverse()
+        return best, self._selector_for(soup, best)
+    
+    def _add(self, flags, hrefs, parent, node_flags, href=None):
+        """Fold a child's flags into its parent's, noting what now appears twice"""
+        key = id(parent)
+        current = flags.get(key, 0)
+        repeated = current & node_flags & self.COMPLETE
+        # An image link and a title link to the same product are still one link
+        if repeated & self.LINK and hrefs.get(key) == href:
+            repeated &= ~self.LINK
+        elif node_flags & self.LINK and not current & self.LINK:
+            hrefs[key] = href
+        flags[key] = current | node_flags | repeated << 3
+    
+    @staticmethod
+    def _signature(element):
+        return (element.name, tuple(element.get('class') or ()))
+    
+    @staticmethod
+    def _shape(element):
+        """Rank a candidate: not a lone-child wrapper first, then shallower first"""
+        wrapper = len(element.find_all(True, recursive=False)) == 1
+        return (not wrapper, -sum(1 for _ in element.parents))
+    
+    @staticmethod
+    def _simple_selector(element):
+        if element.get('id'):
+            return f"{element.name}#{soupsieve.escape(element['id'])}"
+        return element.name + ''.join('.' + soupsieve.escape(c) for c in element.get('class') or ())
+    
+    def _selector_for(self, soup, elements):
+        """Shortest selector matching exactly elements, or None"""
+        own = self._simple_selector(elements[0])
+        candidates = [own]
+        parent = elements[0].parent
+        if parent is not None and parent.parent is not None:
+            candidates.append(f'{self._simple_selector(parent)} > {own}')
+        
+        for selector in candidates:
+            matched = soup.select(selector)
+            if len(matched) == len(elements) and all(a is b for a, b in zip(matched, elements)):
+                return selector
+        return None
+
+
+PRODUCT_DETECTOR = ProductDetector()
+
+# Next-page link selectors for custom sites, most specific first
+NEXT_PAGE_SELECTORS = {
+    selector: soupsieve.compile(selector)
+    for selector in [
+        'a[rel="next"][href]',
+        '.next a[href]',
+        '.pagination a[href]:last-child',
+        '[class*="next"] a[href]',
+        'a[href]:-soup-contains("Next")',
+        'a[href]:-soup-contains("next")',
+    ]
+}
+
+class HostRateLimiter:
+    """Per-host token buckets with an in-flight cap and adaptive rates
+    
+    Each host starts at requests_per_second with room for a burst of requests.
+    A 429/503 halves the host's rate and honours Retry-After, while fast 200
+    responses ramp the rate back up towards max_rate.
+    """
+    
+    RETRY_STATUSES = (429, 503)
+    
+    def __init__(self, requests_per_second=4.0, burst=4, max_in_flight=8,
+                 max_rate=None, min_rate=0.2, fast_response=0.5):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_rate = max_rate or requests_per_second * 4
+        self.min_rate = min_rate
+        self.fast_response = fast_response
+        self._hosts = {}
+        self._lock = threading.Lock()
+    
+    def _host_state(self, url):
+        host = urlparse(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'rate': self.requests_per_second,
+                'tokens': float(self.burst),
+                'updated': time.monotonic(),
+                'in_flight': 0,
+                'blocked_until': 0.0
+            }
+        return state
+    
+    def _reserve(self, url):
+        """Take a token and an in-flight slot, or return seconds to wait"""
+        with self._lock:
+            state = self._host_state(url)
+            now = time.monotonic()
+            state['tokens'] = min(self.burst, state['tokens'] + (now - state['updated']) * state['rate'])
+            state['updated'] = now
+            
+            if now < state['blocked_until']:
+                return state['blocked_until'] - now
+            if state['in_flight'] >= self.max_in_flight:
+                return 0.01
+            if state['tokens'] < 1:
+                return (1 - state['tokens']) / state['rate']
+            
+            state['tokens'] -= 1
+            state['in_flight'] += 1
+            return 0
+    
+    def acquire(self, url, cancelled=None):
+        """Block until a request to url may start; False if cancelled first"""
+        while True:
+            wait = self._reserve(url)
+            if not wait:
+                return True
+            if cancelled and cancelled():
+                return False
+            time.sleep(min(wait, 0.25))
+    
+    async def acquire_async(self, url, cancelled=None):
+        """Awaitable variant of acquire for the asyncio engine"""
+        while True:
+            wait = self._reserve(url)
+            if not wait:
+                return True
+            if cancelled and cancelled():
+                return False
+            await asyncio.sleep(min(wait, 0.25))
+    
+    def release(self, url, status=None, elapsed=None, retry_after=None):
+        """Return the in-flight slot and adapt the host's rate to the response"""
+        with self._lock:
+            state = self._host_state(url)
+            state['in_flight'] = max(0, state['in_flight'] - 1)
+            
+            if status in self.RETRY_STATUSES:
+                state['rate'] = max(self.min_rate, state['rate'] / 2)
+                state['tokens'] = 0.0
+                delay = self._parse_retry_after(retry_after)
+                if delay:
+                    state['blocked_until'] = max(state['blocked_until'], time.monotonic() + delay)
+            elif status == 200 and elapsed is not None and elapsed < self.fast_response:
+                state['rate'] = min(self.max_rate, state['rate'] + self.requests_per_second / 10)
+    
+    def current_rate(self, url):
+        """Current requests/sec allowed for url's host"""
+        with self._lock:
+            return self._host_state(url)['rate']
+    
+    @staticmethod
+    def _parse_retry_after(value):
+        """Retry-After header (seconds or HTTP date) as seconds to wait"""
+        if not value:
+            return 0
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0
+
+class ResponseCache:
+    """Persistent SQLite cache of page bodies keyed by URL
+    
+    Entries younger than ttl seconds are served without a request. Older
+    entries are revalidated with If-None-Match/If-Modified-Since so an
+    unchanged page costs a 304 instead of a full download. The least recently
+    used entries are evicted once the stored bodies exceed max_bytes.
+    """
+    
+    def __init__(self, path=None, ttl=3600, max_bytes=200 * 1024 * 1024):
+        self.path = path or os.path.join(DATA_DIR, 'http_cache.sqlite')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.reset_stats()
+    
+    def reset_stats(self):
+        """Zero the per-run counters"""
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0}
+    
+    def lookup(self, url):
+        """Return the cached entry for url, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at, size FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        # An empty body is never a page; one cached before store() refused them is a miss
+        if not row or not row[0]:
+            return None
+        body, etag, last_modified, stored_at, size = row
+        return {
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': size,
+            'fresh': time.time() - stored_at < self.ttl
+        }
+    
+    def conditional_headers(self, entry):
+        """Request headers that let the server answer 304 Not Modified"""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def hit(self, url, entry, revalidated=False):
+        """Record that entry was served instead of downloading url"""
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._conn.execute(
+                    "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url)
+                )
+            else:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+            self.stats['revalidated' if revalidated else 'hits'] += 1
+            self.stats['bytes_saved'] += entry['size']
+        return entry['body']
+    
+    def store(self, url, body, etag=None, last_modified=None):
+        """Cache a freshly downloaded body; an empty one is not cached"""
+        if not body:
+            return
+        size = len(body.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, now, now, size)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self.stats['misses'] += 1
+            self._evict()
+            self._conn.commit()
+    
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT url, size FROM responses ORDER BY accessed_at LIMIT 50"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            for url, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+    
+    def summary(self):
+        """One-line description of this run's cache counters"""
+        stats = self.stats
+        return (f"{stats['hits']} hits, {stats['revalidated']} revalidated (304), "
+                f"{stats['misses']} misses, {stats['bytes_saved'] / 1024:.1f} KB saved")
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class ProductIndex:
+    """Local index of product key -> listing snippet hash and last record
+    
+    Incremental scrapes compare each listing snippet against the previous run
+    and only fetch details for products that are new or changed. Entries are
+    grouped by the crawl's start URL so removals are only reported for the
+    catalogue that was actually re-crawled.
+    """
+    
+    SNIPPET_FIELDS = ('title', 'price', 'availability', 'rating')
+    
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DATA_DIR, 'product_index.json')
+        self._entries = {}
+        self._pending = {}  # listing hashes of records awaiting their detail page
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading product index {self.path}: {e}")
+    
+    @staticmethod
+    def product_key(record):
+        """Stable key for a record: its URL, or source and title when it has none"""
+        if record.get('url', 'N/A') != 'N/A':
+            return record['url']
+        return f"{record.get('source', '')}#{record.get('title', '')}"
+    
+    @classmethod
+    def snippet_hash(cls, record):
+        """Hash of the listing fields that signal a product changed"""
+        snippet = json.dumps([record.get(field, 'N/A') for field in cls.SNIPPET_FIELDS], ensure_ascii=False)
+        return hashlib.sha1(snippet.encode('utf-8')).hexdigest()
+    
+    def classify(self, record, scope):
+        """Return 'new', 'changed' or None (unchanged) for a listing record"""
+        key = self.product_key(record)
+        snippet_hash = self.snippet_hash(record)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['hash'] != snippet_hash:
+                # Detail pages can overwrite snippet fields, so keep the listing hash
+                self._pending[key] = snippet_hash
+                return 'new' if entry is None else 'changed'
+            entry['scope'] = scope
+            entry['last_seen'] = time.time()
+            return None
+    
+    def remember(self, record, scope):
+        """Store a freshly scraped record as the product's latest state"""
+        stored = {k: v for k, v in record.items() if k != 'change'}
+        key = self.product_key(record)
+        with self._lock:
+            self._entries[key] = {
+                'hash': self._pending.pop(key, None) or self.snippet_hash(record),
+                'scope': scope,
+                'last_seen': time.time(),
+                'record': stored
+            }
+    
+    def pop_missing(self, scope, since):
+        """Remove and return records in scope that were not seen since a timestamp"""
+        with self._lock:
+            missing = [key for key, entry in self._entries.items()
+                       if entry.get('scope') == scope and entry['last_seen'] < since]
+            return [self._entries.pop(key)['record'] for key in missing]
+    
+    def save(self):
+        """Write the index atomically so a crash never leaves a torn file"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, default=_json_default)
+        os.replace(tmp_path, self.path)
+
+class ProductStore:
+    """SQLite product catalogue with an append-only price and availability history
+    
+    Each crawl is a run. add() buffers records and every batch_size of them
+    is upserted in one transaction, keyed by UPC when the record has one and
+    by canonical URL otherwise. A history row is appended whenever a
+    product's price or availability differs from its stored state, and the
+    products table keeps the previous price and the run it changed in, so
+    price_drops() is a single indexed query.
+    """
+    
+    def __init__(self, path=None, batch_size=500):
+        self.path = path or os.path.join(DATA_DIR, 'products.sqlite')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.batch_size = batch_size
+        self.run_id = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                products INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS products (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                upc TEXT,
+                title TEXT,
+                category TEXT,
+                source TEXT,
+                price REAL,
+                price_text TEXT,
+                currency TEXT,
+                rating INTEGER,
+                availability TEXT,
+                stock INTEGER,
+                previous_price REAL,
+                price_changed_run INTEGER,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                last_run INTEGER,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS products_category ON products (category);
+            CREATE INDEX IF NOT EXISTS products_price ON products (price);
+            CREATE INDEX IF NOT EXISTS products_url ON products (url);
+            CREATE INDEX IF NOT EXISTS products_price_changed ON products (price_changed_run);
+            CREATE TABLE IF NOT EXISTS price_history (
+                key TEXT NOT NULL,
+                run INTEGER,
+                seen_at REAL NOT NULL,
+                price REAL,
+                price_text TEXT,
+                currency TEXT,
+                availability TEXT,
+                stock INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS price_history_key ON price_history (key, seen_at);
+        """)
+        self._conn.commit()
+    
+    @staticmethod
+    def product_key(record):
+        """UPC when known, else the canonical product URL, else source and title"""
+        upc = record.get('upc')
+        if upc and upc != 'N/A':
+            return f'upc:{upc}'
+        url = record.get('url')
+        if url and url != 'N/A':
+            return canonicalize_url(url)
+        return f"{record.get('source', '')}#{record.get('title', '')}"
+    
+    def begin_run(self, scope=None):
+        """Start a run; records added until end_run() belong to it"""
+        self.end_run()
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO runs (scope, started_at) VALUES (?, ?)", (scope, time.time()))
+            self._conn.commit()
+            self.run_id = cursor.lastrowid
+        return self.run_id
+    
+    def end_run(self):
+        """Write the buffered records and close the current run"""
+        self.flush()
+        if self.run_id is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ?, "
+                "products = (SELECT COUNT(*) FROM products WHERE last_run = ?) WHERE id = ?",
+                (time.time(), self.run_id, self.run_id))
+            self._conn.commit()
+            self.run_id = None
+    
+    def add(self, record):
+        """Buffer a record; a full batch is written in one transaction"""
+        with self._lock:
+            self._pending.append(record)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+    
+    def flush(self):
+        """Upsert the buffered records and append history rows for changed products"""
+        with self._lock:
+            records, self._pending = self._pending, []
+            if not records:
+                return
+            now = time.time()
+            rows = {}
+            for record in records:
+                typed = record if 'price_value' in record else add_typed_fields(dict(record))
+                price = typed.get('price_value')
+                rows[self.product_key(record)] = (
+                    record.get('url'), record.get('upc'), record.get('title'), record.get('category'),
+                    record.get('source'), float(price) if price is not None else None, record.get('price'),
+                    typed.get('currency'), typed.get('rating_value'), record.get('availability'), typed.get('stock'),
+                    json.dumps(dict(record), ensure_ascii=False, default=_json_default)
+                )
+            
+            current = {}
+            keys = list(rows)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                current.update((key, (price, availability)) for key, price, availability in self._conn.execute(
+                    f"SELECT key, price, availability FROM products WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk))
+            
+            history = []
+            upserts = []
+            for key, row in rows.items():
+                price, availability = row[5], row[9]
+                old = current.get(key)
+                changed_price = old is not None and old[0] != price
+                if old is None or changed_price or old[1] != availability:
+                    history.append((key, self.run_id, now, price, row[6], row[7], availability, row[10]))
+                upserts.append((key,) + row[:11] + (
+                    old[0] if changed_price else None, self.run_id if changed_price else None,
+                    now, now, self.run_id, row[11]))
+            
+            with self._conn:
+                self._conn.executemany("""
+                    INSERT INTO products (key, url, upc, title, category, source, price, price_text, currency,
+                                          rating, availability, stock, previous_price, price_changed_run,
+                                          first_seen, last_seen, last_run, record)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        url = excluded.url, upc = excluded.upc, title = excluded.title,
+                        category = excluded.category, source = excluded.source, price = excluded.price,
+                        price_text = excluded.price_text, currency = excluded.currency, rating = excluded.rating,
+                        availability = excluded.availability, stock = excluded.stock,
+                        previous_price = COALESCE(excluded.previous_price, products.previous_price),
+                        price_changed_run = COALESCE(excluded.price_changed_run, products.price_changed_run),
+                        last_seen = excluded.last_seen, last_run = excluded.last_run, record = excluded.record
+                """, upserts)
+                self._conn.executemany("INSERT INTO price_history VALUES (?, ?, ?, ?, ?, ?, ?, ?)", history)
+    
+    def last_run(self):
+        """Id of the most recent finished run, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) FROM runs WHERE finished_at IS NOT NULL").fetchone()
+        return row[0]
+    
+    def summary(self, run=None):
+        """One-line description of a run (default: the last finished one)"""
+        run = run or self.last_run()
+        with self._lock:
+            products, = self._conn.execute("SELECT products FROM runs WHERE id = ?", (run,)).fetchone() or (0,)
+            drops, rises = self._conn.execute(
+                "SELECT COALESCE(SUM(price < previous_price), 0), COALESCE(SUM(price > previous_price), 0) "
+                "FROM products WHERE price_changed_run = ?", (run,)).fetchone()
+        return f"{products} products in run {run}, {drops} price drops, {rises} price rises"
+    
+    def price_drops(self, run=None, limit=None):
+        """Products whose price fell in a run (default: the last finished one), biggest drop first"""
+        run = run or self.last_run()
+        return self._query(
+            "SELECT key, title, url, category, previous_price, price, currency, previous_price - price AS drop_amount "
+            "FROM products WHERE price_changed_run = ? AND price < previous_price ORDER BY drop_amount DESC"
+            + (" LIMIT ?" if limit else ""), (run, limit) if limit else (run,))
+    
+    def history(self, key):
+        """Price and availability changes of one product, oldest first; key may be a product URL"""
+        if '://' in key:
+            key = self._key_for_url(key) or key
+        return self._query(
+            "SELECT run, seen_at, price, price_text, currency, availability, stock FROM price_history "
+            "WHERE key = ? ORDER BY seen_at", (key,))
+    
+    def products(self, category=None, min_price=None, max_price=None, limit=None):
+        """Stored records filtered by category and price range, cheapest first"""
+        clauses, params = [], []
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if min_price is not None:
+            clauses.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price <= ?")
+            params.append(max_price)
+        sql = "SELECT record FROM products"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY price"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [add_typed_fields(json.loads(record)) for record, in rows]
+    
+    def _key_for_url(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT key FROM products WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+    
+    def _query(self, sql, params):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def close(self):
+        self.end_run()
+        with self._lock:
+            self._conn.close()
+
+class CrawlCheckpoint:
+    """Crawl-state journal so a stopped or crashed crawl resumes where it left off
+    
+    After every completed listing page the page's records are appended to an
+    NDJSON journal and the state (frontier of pending listing URLs, completed
+    URLs, page and product counts, records written) is saved atomically. A
+    resumed crawl replays the journal and continues from the frontier without
+    re-fetching completed pages.
+    """
+    
+    def __init__(self, path=None, save_every=1):
+        self.path = path or os.path.join(DATA_DIR, 'checkpoints', 'crawl.json')
+        self.journal_path = os.path.splitext(self.path)[0] + '.records.ndjson'
+        self.save_every = save_every
+        self.state = None
+        self._journal = None
+        self._pages_since_save = 0
+    
+    @classmethod
+    def for_url(cls, url, **kwargs):
+        """Checkpoint stored under a name derived from the crawl's start URL"""
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        return cls(os.path.join(DATA_DIR, 'checkpoints', f'{name}.json'), **kwargs)
+    
+    def load(self):
+        """Saved state, or None when there is nothing to resume"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading checkpoint {self.path}: {e}")
+            return None
+    
+    def begin(self, start_url, resume=True):
+        """Start journaling a crawl; returns the state to resume from, if any"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        state = self.load() if resume else None
+        if state and state['start_url'] == start_url and not state['finished']:
+            self.state = state
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            return state
+        
+        self.state = {
+            'start_url': start_url,
+            'frontier': [start_url],
+            'completed': [],
+            'page_count': 0,
+            'product_count': 0,
+            'records_written': 0,
+            'finished': False,
+            'updated': time.time()
+        }
+        self._journal = open(self.journal_path, 'w', encoding='utf-8')
+        self.save()
+        return None
+    
+    def replay(self):
+        """Yield the records journaled by the interrupted run"""
+        written = self.state['records_written'] if self.state else 0
+        if not written or not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for count, line in enumerate(f):
+                # Ignore a torn tail written after the last saved state
+                if count >= written:
+                    break
+                yield add_typed_fields(json.loads(line))
+    
+    def page_done(self, page_url, next_url, page_count, product_count, records):
+        """Record a fully processed listing page and its records"""
+        for record in records:
+            self._journal.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+        self._journal.flush()
+        
+        state = self.state
+        state['completed'].append(page_url)
+        state['frontier'] = [next_url] if next_url else []
+        state['page_count'] = page_count
+        state['product_count'] = product_count
+        state['records_written'] += len(records)
+        
+        self._pages_since_save += 1
+        if self._pages_since_save >= self.save_every:
+            self.save()
+    
+    def finish(self, finished):
+        """Save the final state; a finished crawl will not be resumed"""
+        if self.state is None:
+            return
+        self.state['finished'] = finished
+        self.save()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+    
+    def save(self):
+        """Write the state atomically, after the journal it refers to"""
+        if self._journal:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        self.state['updated'] = time.time()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+        self._pages_since_save = 0
+
+class TemplateStore:
+    """Per-domain extraction templates for custom sites, persisted between runs
+    
+    A template records what worked on a domain's first page: the product
+    container selector, the next-page selector and which fallback matched
+    for each field. Later pages and runs use them directly; a part that stops
+    matching is re-learned and saved again.
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DATA_DIR, 'templates.json')
+        self._templates = None
+        self._lock = threading.Lock()
+    
+    def _load(self):
+        if self._templates is None:
+            self._templates = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._templates = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Error loading templates {self.path}: {e}")
+        return self._templates
+    
+    def get(self, domain):
+        """The domain's template, or an empty dict"""
+        with self._lock:
+            return dict(self._load().get(domain, {}))
+    
+    def learn(self, domain, part, value):
+        """Record a working selector (or field choices) for a domain"""
+        with self._lock:
+            template = self._load().setdefault(domain, {})
+            if template.get(part) == value:
+                return
+            template[part] = value
+            template['updated'] = time.time()
+            self._save()
+    
+    def forget(self, domain):
+        """Drop a domain's template so it is learned from scratch"""
+        with self._lock:
+            if self._load().pop(domain, None) is not None:
+                self._save()
+    
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._templates, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving templates {self.path}: {e}")
+
+
+_SCRAPED_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+@lru_cache(maxsize=4096)
+def _epoch_from_date(value):
+    """Epoch seconds for a scraped_date string, or None if it would not format back identically"""
+    try:
+        epoch = int(time.mktime(time.strptime(value, _SCRAPED_DATE_FORMAT)))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return epoch if _date_from_epoch(epoch) == value else None
+
+
+@lru_cache(maxsize=4096)
+def _date_from_epoch(epoch):
+    return datetime.fromtimestamp(epoch).strftime(_SCRAPED_DATE_FORMAT)
+
+
+class Product(Mapping):
+    """Compact read-only record for keeping large crawls in memory
+    
+    The usual fields live in slots instead of a per-record dict; categorical
+    strings are interned, scraped_date is held as epoch seconds, and any other
+    fields (e.g. the product information table) are a tuple of values. The
+    record's key order is a tuple shared by every record of the same shape,
+    so to_dict() gives back exactly the dict it was built from. Products are
+    read-only mappings, so exporters and record.get() work on them unchanged.
+    """
+    
+    FIELDS = ('title', 'price', 'rating', 'availability', 'url', 'image_url', 'image_alt', 'category',
+              'description', 'source', 'change', 'price_value', 'currency', 'rating_value', 'stock')
+    CATEGORICAL = frozenset(['rating', 'availability', 'category', 'source', 'change', 'currency'])
+    __slots__ = FIELDS + ('scraped_at', '_shape', '_extra')
+    
+    _SLOTTED = frozenset(FIELDS + ('scraped_date',))
+    # key tuple -> (shared key tuple, {extra key: position in _extra})
+    _shapes = {}
+    
+    @classmethod
+    def from_dict(cls, record):
+        """Compact a record dict"""
+        product = cls.__new__(cls)
+        keys = tuple(record)
+        shape = cls._shapes.get(keys)
+        if shape is None:
+            extras = [key for key in keys if key not in cls._SLOTTED]
+            shape = cls._shapes.setdefault(keys, (keys, {key: i for i, key in enumerate(extras)}))
+        product._shape = shape[0]
+        
+        extra = []
+        for key, value in record.items():
+            if key not in cls._SLOTTED:
+                extra.append(value)
+            elif key == 'scraped_date':
+                # Unusual dates are kept as given so the record still round-trips
+                epoch = _epoch_from_date(value) if isinstance(value, str) else None
+                product.scraped_at = value if epoch is None else epoch
+            else:
+                if key in cls.CATEGORICAL and type(value) is str:
+                    value = sys.intern(value)
+                setattr(product, key, value)
+        product._extra = tuple(extra) if extra else None
+        return product
+    
+    def __getitem__(self, key):
+        if key in self._SLOTTED:
+            if key not in self._shape:
+                raise KeyError(key)
+            if key == 'scraped_date':
+                return _date_from_epoch(self.scraped_at) if type(self.scraped_at) is int else self.scraped_at
+            return getattr(self, key)
+        position = self._shapes[self._shape][1].get(key)
+        if position is None:
+            raise KeyError(key)
+        return self._extra[position]
+    
+    def __iter__(self):
+        return iter(self._shape)
+    
+    def __len__(self):
+        return len(self._shape)
+    
+    def to_dict(self):
+        """The record as the dict it was built from"""
+        return {key: self[key] for key in self._shape}
+    
+    def __repr__(self):
+        return f"Product({self.to_dict()!r})"
+    
+    def __reduce__(self):
+        return (Product.from_dict, (self.to_dict(),))
+
+
+class ProductStats:
+    """Incremental statistics over records, kept in compact columns
+    
+    add() folds one record's typed fields into an array('d') price column and
+    running per-category, rating, currency and stock aggregates in O(1), so a
+    summary can be refreshed while a crawl runs. snapshot() sorts the price
+    column once for its percentiles and histogram.
+    
+    Prices in different currencies cannot be compared, so price figures only
+    cover the first currency seen (and prices with no currency); records
+    priced in any other currency are counted as other_currency instead.
+    """
+    
+    PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+    
+    def __init__(self, bins=10):
+        self.bins = bins
+        self.count = 0
+        self.prices = array('d')
+        self.ratings = array('q', [0] * 6)  # index 0 counts unrated records
+        self.categories = {}  # name -> [records, priced, price sum, min, max]
+        self.currencies = Counter()
+        self.currency = None
+        self.other_currency = 0
+        self.stock_total = 0
+        self.stock_known = 0
+        self.out_of_stock = 0
+    
+    def add(self, record):
+        """Fold one record into the statistics"""
+        if 'price_value' not in record:
+            record = add_typed_fields(dict(record))
+        self.count += 1
+        
+        name = record.get('category') or 'Unknown'
+        category = self.categories.get(name)
+        if category is None:
+            category = self.categories[name] = [0, 0, 0.0, math.inf, -math.inf]
+        category[0] += 1
+        
+        price = record.get('price_value')
+        currency = record.get('currency')
+        if price is not None and currency:
+            self.currencies[currency] += 1
+            if self.currency is None:
+                self.currency = currency
+            elif currency != self.currency:
+                self.other_currency += 1
+                price = None
+        if price is not None:
+            price = float(price)
+            self.prices.append(price)
+            category[1] += 1
+            category[2] += price
+            category[3] = min(category[3], price)
+            category[4] = max(category[4], price)
+        
+        self.ratings[record.get('rating_value') or 0] += 1
+        
+        stock = record.get('stock')
+        if stock is not None:
+            self.stock_known += 1
+            self.stock_total += int(stock)
+            self.out_of_stock += int(stock) == 0
+    
+    def add_all(self, records):
+        for record in records:
+            self.add(record)
+        return self
+    
+    def snapshot(self):
+        """Current statistics as a dict"""
+        prices = sorted(self.prices)
+        snapshot = {
+            'count': self.count,
+            'currency': self.currency,
+            'other_currency': self.other_currency,
+            'currencies': dict(self.currencies),
+            'price': None,
+            'histogram': [],
+            'ratings': {stars: self.ratings[stars] for stars in range(1, 6)},
+            'unrated': self.ratings[0],
+            'categories': {
+                name: {
+                    'count': records,
+                    'mean_price': total / priced if priced else None,
+                    'min_price': low if priced else None,
+                    'max_price': high if priced else None,
+                }
+                for name, (records, priced, total, low, high) in sorted(self.categories.items())
+            },
+            'stock': {'known': self.stock_known, 'units': self.stock_total, 'out_of_stock': self.out_of_stock},
+        }
+        if prices:
+            total = math.fsum(prices)
+            snapshot['price'] = dict({
+                'count': len(prices),
+                'total': total,
+                'mean': total / len(prices),
+                'min': prices[0],
+                'max': prices[-1],
+            }, **{f'p{round(q * 100)}': _nearest_rank(prices, q) for q in self.PERCENTILES})
+            snapshot['histogram'] = self._histogram(prices)
+        return snapshot
+    
+    def _histogram(self, prices):
+        """[(low, high, count)] over equal-width bins from the lowest to the highest price"""
+        low, high = prices[0], prices[-1]
+        width = (high - low) / self.bins or 1.0
+        counts = [0] * self.bins
+        for price in prices:
+            counts[min(int((price - low) / width), self.bins - 1)] += 1
+        return [(low + i * width, low + (i + 1) * width, count) for i, count in enumerate(counts)]
+
+
+class RecordSink:
+    """Base class for exporters that write records as they are produced
+    
+    Output is flushed every flush_every records and every flush_interval
+    seconds, so a crash mid-crawl only loses the last unflushed batch.
+    """
+    
+    def __init__(self, filename, flush_every=100, flush_interval=5.0, fsync=False):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.count = 0
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._file = None
+    
+    def write(self, record):
+        """Write one record (a dict or a Product), flushing when a batch or interval is due"""
+        if isinstance(record, Product):
+            record = record.to_dict()
+        self._write(record)
+        self.count += 1
+        self._unflushed += 1
+        if (self._unflushed >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+    
+    def write_all(self, records):
+        """Write every record from an iterable and return how many were written"""
+        for record in records:
+            self.write(record)
+        return self.count
+    
+    def flush(self):
+        """Push buffered output to disk"""
+        if self._file and not self._file.closed:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+    
+    def close(self):
+        """Flush and close the output"""
+        self.flush()
+        if self._file:
+            self._file.close()
+    
+    def _write(self, record):
+        raise NotImplementedError
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NDJSONSink(RecordSink):
+    """One JSON object per line"""
+    
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._file = open(filename, 'w', encoding='utf-8')
+    
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+
+
+class JSONSink(RecordSink):
+    """A JSON array written element by element"""
+    
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._file = open(filename, 'w', encoding='utf-8')
+        self._file.write('[')
+    
+    def _write(self, record):
+        separator = ',\n' if self.count else '\n'
+        item = json.dumps(record, indent=2, ensure_ascii=False, default=_json_default)
+        self._file.write(separator + '  ' + item.replace('\n', '\n  '))
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.write('\n]' if self.count else ']')
+        super().close()
+
+
+class TXTSink(RecordSink):
+    """Human-readable item blocks"""
+    
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._file = open(filename, 'w', encoding='utf-8')
+    
+    def _write(self, record):
+        self._file.write(f"Item {self.count + 1}:\n")
+        self._file.write("-" * 40 + "\n")
+        for key, value in record.items():
+            self._file.write(f"{key}: {value}\n")
+        self._file.write("\n")
+
+
+class CSVSink(RecordSink):
+    """CSV rows written as they arrive
+    
+    The header is the declared fieldnames, or the sorted keys of the first
+    record. Fields outside the header are spooled next to the file and merged
+    in by a header-rewrite pass on close, giving the sorted union of all keys.
+    """
+    
+    def __init__(self, filename, fieldnames=None, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self._declared = bool(fieldnames)
+        self._extra_fields = set()
+        self._spool_path = filename + '.extra.ndjson'
+        self._spool = None
+        self._writer = None
+        self._file = open(filename, 'w', newline='', encoding='utf-8')
+    
+    def _write(self, record):
+        if self._writer is None:
+            if self.fieldnames is None:
+                self.fieldnames = sorted(record.keys())
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+            self._writer.writeheader()
+        
+        extras = {key: value for key, value in record.items() if key not in self._writer.fieldnames}
+        if extras:
+            if self._spool is None:
+                self._spool = open(self._spool_path, 'w', encoding='utf-8')
+            self._spool.write(json.dumps({'row': self.count, 'fields': extras}, ensure_ascii=False, default=_json_default) + '\n')
+            self._extra_fields.update(extras)
+        self._writer.writerow(record)
+    
+    def flush(self):
+        if self._spool:
+            self._spool.flush()
+        super().flush()
+    
+    def close(self):
+        super().close()
+        if self._spool:
+            self._spool.close()
+            self._rewrite_with_extras()
+    
+    def _rewrite_with_extras(self):
+        """Second pass: widen the header and fill in the spooled fields"""
+        extras = {}
+        with open(self._spool_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                extras[entry['row']] = entry['fields']
+        
+        if self._declared:
+            fieldnames = self.fieldnames + sorted(self._extra_fields)
+        else:
+            fieldnames = sorted(set(self.fieldnames) | self._extra_fields)
+        
+        tmp_path = self.filename + '.tmp'
+        with open(self.filename, 'r', newline='', encoding='utf-8') as src, \
+                open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+            writer = csv.DictWriter(dst, fieldnames=fieldnames)
+            writer.writeheader()
+            for row_number, row in enumerate(csv.DictReader(src)):
+                row.update(extras.get(row_number, {}))
+                writer.writerow(row)
+        os.replace(tmp_path, self.filename)
+        os.remove(self._spool_path)
+
+
+class ParquetSink(RecordSink):
+    """Columnar Parquet output written in row groups (needs pyarrow)
+    
+    Columns are the declared fieldnames, or the keys of the first batch; any
+    other fields are kept as JSON in a reserved '_extra' column. The typed
+    fields from add_typed_fields are stored as a decimal price and integer
+    rating and stock; every other column is a string. Each flush writes the
+    buffered records as one row group.
+    """
+    
+    EXTRA_COLUMN = '_extra'
+    # Prices are stored as decimal128(18, PRICE_SCALE), rounded to that many places
+    PRICE_SCALE = 4
+    
+    def __init__(self, filename, fieldnames=None, row_group_size=1000, **kwargs):
+        # pyarrow is heavy and optional, so it is only imported when needed
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        kwargs.setdefault('flush_every', row_group_size)
+        super().__init__(filename, **kwargs)
+        if fieldnames and self.EXTRA_COLUMN in fieldnames:
+            raise ValueError(f"'{self.EXTRA_COLUMN}' is reserved for fields outside the Parquet schema")
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self._rows = []
+        self._writer = None
+        self._converters = None
+    
+    def _write(self, record):
+        self._rows.append(record)
+    
+    def _open_writer(self):
+        """Create the file with a column per field plus the overflow column"""
+        if self.fieldnames is None:
+            self.fieldnames = [key for key in dict.fromkeys(key for row in self._rows for key in row)
+                               if key != self.EXTRA_COLUMN]
+        pa = self._pa
+        quantum = Decimal(1).scaleb(-self.PRICE_SCALE)
+        typed = {
+            'price_value': (pa.decimal128(18, self.PRICE_SCALE), lambda value: Decimal(str(value)).quantize(quantum)),
+            'rating_value': (pa.int32(), int),
+            'stock': (pa.int32(), int),
+        }
+        columns = [(name,) + typed.get(name, (pa.string(), str)) for name in self.fieldnames]
+        self._converters = [(name, convert) for name, _, convert in columns]
+        schema = pa.schema([(name, arrow_type) for name, arrow_type, _ in columns]
+                           + [(self.EXTRA_COLUMN, pa.string())])
+        self._writer = self._pq.ParquetWriter(self.filename, schema)
+    
+    def flush(self):
+        if self._rows:
+            if self._writer is None:
+                self._open_writer()
+            
+            columns = {name: [] for name in self.fieldnames}
+            extras = []
+            for row in self._rows:
+                for name, convert in self._converters:
+                    value = row.get(name)
+                    columns[name].append(None if value is None else convert(value))
+                extra = {key: value for key, value in row.items() if key not in columns}
+                extras.append(json.dumps(extra, ensure_ascii=False, default=_json_default) if extra else None)
+            columns[self.EXTRA_COLUMN] = extras
+            self._writer.write_table(self._pa.table(columns, schema=self._writer.schema))
+            self._rows = []
+        super().flush()
+    
+    def close(self):
+        self.flush()
+        # A run that produced nothing still leaves a readable file with the schema
+        if self._writer is None:
+            self._open_writer()
+        self._writer.close()
+
+
+SINKS = {
+    '.ndjson': NDJSONSink,
+    '.jsonl': NDJSONSink,
+    '.json': JSONSink,
+    '.csv': CSVSink,
+    '.parquet': ParquetSink,
+}
+
+
+def open_sink(filename, **kwargs):
+    """Open the streaming sink matching filename's extension (TXT otherwise)"""
+    extension = os.path.splitext(filename)[1].lower()
+    return SINKS.get(extension, TXTSink)(filename, **kwargs)
+
+_DNS_CACHE = {}
+_DNS_LOCK = threading.Lock()
+_DNS_TTL = None
+_DNS_USERS = 0
+_DNS_RESOLVE = socket.getaddrinfo
+
+
+def install_dns_cache(ttl=300):
+    """Cache socket.getaddrinfo results process-wide for ttl seconds
+    
+    Every new connection otherwise pays a resolver round trip. The cache is
+    shared by all transports; installing it again only changes the TTL.
+    Returns a function that undoes this install; the original getaddrinfo is
+    restored once every install has been undone.
+    """
+    global _DNS_TTL, _DNS_USERS, _DNS_RESOLVE
+    with _DNS_LOCK:
+        _DNS_TTL = ttl
+        _DNS_USERS += 1
+        if _DNS_USERS == 1:
+            _DNS_RESOLVE = socket.getaddrinfo
+            socket.getaddrinfo = _cached_getaddrinfo
+    
+    installed = True
+    
+    def uninstall():
+        global _DNS_TTL, _DNS_USERS
+        nonlocal installed
+        with _DNS_LOCK:
+            if not installed:
+                return
+            installed = False
+            _DNS_USERS -= 1
+            if _DNS_USERS == 0:
+                # Someone else may have wrapped it since; leave theirs in place
+                if socket.getaddrinfo is _cached_getaddrinfo:
+                    socket.getaddrinfo = _DNS_RESOLVE
+                _DNS_TTL = None
+                _DNS_CACHE.clear()
+    
+    return uninstall
+
+
+def _cached_getaddrinfo(*args, **kwargs):
+    key = (args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _DNS_LOCK:
+        entry = _DNS_CACHE.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        resolve = _DNS_RESOLVE
+    result = resolve(*args, **kwargs)
+    with _DNS_LOCK:
+        if _DNS_TTL is not None:
+            _DNS_CACHE[key] = (now + _DNS_TTL, result)
+    return result
+
+
+def _accept_encoding():
+    """Content codings urllib3 can decode here; br needs brotli installed"""
+    encodings = ['gzip', 'deflate']
+    try:
+        import brotli  # noqa: F401
+        encodings.append('br')
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.append('br')
+        except ImportError:
+            pass
+    return ', '.join(encodings)
+
+
+class RunProfiler:
+    """Timing spans per crawl stage, summarised into an end-of-run report
+    
+    Stages are fetch (split into connect, ttfb and download for network
+    fetches), parse, extract and export. Durations are kept per stage for
+    p50/p95/p99, and the most recent spans are also kept per URL.
+    """
+    
+    QUANTILES = (0.5, 0.95, 0.99)
+    
+    def __init__(self, url_spans=100000):
+        self.url_spans = url_spans
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Start a new run"""
+        with self._lock:
+            self.started = time.time()
+            self._start = time.perf_counter()
+            self._finish = None
+            self._durations = {}
+            self._spans = deque(maxlen=self.url_spans)
+            self.bytes_downloaded = 0
+            self.pages = 0
+    
+    def finish(self):
+        """Freeze the run's wall-clock time"""
+        with self._lock:
+            self._finish = time.perf_counter()
+    
+    def record(self, stage, seconds, url=None):
+        """Add one span"""
+        with self._lock:
+            durations = self._durations.get(stage)
+            if durations is None:
+                durations = self._durations[stage] = array('d')
+            durations.append(seconds)
+            if url:
+                self._spans.append((url, stage, seconds))
+    
+    @contextmanager
+    def span(self, stage, url=None):
+        """Time the body of a with block as one span"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, url)
+    
+    def page_fetched(self, size):
+        """Count a fetched page and its bytes on the wire"""
+        with self._lock:
+            self.pages += 1
+            self.bytes_downloaded += size
+    
+    def report(self, include_urls=False):
+        """The run's report as a JSON-serialisable dict; latencies in milliseconds"""
+        with self._lock:
+            elapsed = (self._finish or time.perf_counter()) - self._start
+            durations = {stage: sorted(values) for stage, values in self._durations.items()}
+            spans = list(self._spans) if include_urls else None
+            report = {
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'elapsed_seconds': round(elapsed, 3),
+                'pages': self.pages,
+                'pages_per_second': round(self.pages / elapsed, 2) if elapsed else 0.0,
+                'bytes_downloaded': self.bytes_downloaded,
+                'stages': {}
+            }
+        
+        for stage, ordered in durations.items():
+            stats = {'count': len(ordered), 'total_ms': round(sum(ordered) * 1000, 2)}
+            for q in self.QUANTILES:
+                stats[f'p{int(q * 100)}_ms'] = round(_nearest_rank(ordered, q) * 1000, 3)
+            stats['max_ms'] = round(ordered[-1] * 1000, 3)
+            report['stages'][stage] = stats
+        if spans is not None:
+            report['urls'] = [
+                {'url': url, 'stage': stage, 'ms': round(seconds * 1000, 3)} for url, stage, seconds in spans
+            ]
+        return report
+    
+    def summary(self):
+        """One-line summary for logs"""
+        report = self.report()
+        stages = ', '.join(
+            f"{stage} p50 {stats['p50_ms']:.1f}/p95 {stats['p95_ms']:.1f} ms"
+            for stage, stats in report['stages'].items()
+        )
+        return (f"{report['pages']} pages in {report['elapsed_seconds']:.1f}s "
+                f"({report['pages_per_second']:.1f}/s, {report['bytes_downloaded'] / 1024:.0f} KiB); {stages}")
+    
+    def format_report(self):
+        """Multi-line report table"""
+        report = self.report()
+        lines = [
+            f"Run started {report['started']}, {report['elapsed_seconds']:.2f}s",
+            f"Pages fetched: {report['pages']} ({report['pages_per_second']:.1f}/s)",
+            f"Bytes downloaded: {report['bytes_downloaded'] / 1024:.1f} KiB",
+            "",
+            f"{'stage':<10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'total s':>9}",
+        ]
+        for stage, stats in report['stages'].items():
+            lines.append(
+                f"{stage:<10} {stats['count']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                f"{stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f} {stats['total_ms'] / 1000:>9.2f}"
+            )
+        return '\n'.join(lines)
+    
+    def save_json(self, filename, include_urls=True):
+        """Write the report, with per-URL spans, as JSON"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.report(include_urls), f, indent=2)
+    
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        report = self.report()
+        lines = [
+            '# HELP scraper_stage_seconds Crawl stage latency.',
+            '# TYPE scraper_stage_seconds summary',
+        ]
+        with self._lock:
+            durations = {stage: sorted(values) for stage, values in self._durations.items()}
+        for stage, ordered in durations.items():
+            for q in self.QUANTILES:
+                lines.append(f'scraper_stage_seconds{{stage="{stage}",quantile="{q}"}} {_nearest_rank(ordered, q):.6f}')
+            lines.append(f'scraper_stage_seconds_sum{{stage="{stage}"}} {sum(ordered):.6f}')
+            lines.append(f'scraper_stage_seconds_count{{stage="{stage}"}} {len(ordered)}')
+        lines += [
+            '# HELP scraper_pages_total Pages fetched in the current run.',
+            '# TYPE scraper_pages_total counter',
+            f'scraper_pages_total {report["pages"]}',
+            '# HELP scraper_bytes_downloaded_total Bytes received on the wire in the current run.',
+            '# TYPE scraper_bytes_downloaded_total counter',
+            f'scraper_bytes_downloaded_total {report["bytes_downloaded"]}',
+            '# HELP scraper_pages_per_second Pages fetched per second in the current run.',
+            '# TYPE scraper_pages_per_second gauge',
+            f'scraper_pages_per_second {report["pages_per_second"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+    
+    def serve_prometheus(self, port=9108, host='127.0.0.1'):
+        """Serve prometheus() at http://host:port/metrics from a daemon thread"""
+        profiler = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = profiler.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Connection setup time of the request in flight on this thread
+_FETCH_PHASES = threading.local()
+
+
+class HttpTransport:
+    """Pooled HTTP client shared by every sync fetch path
+    
+    Wraps a requests.Session with a sized connection pool per host, keep-alive
+    reuse, gzip/brotli negotiation and a urllib3 retry policy with jittered
+    exponential backoff for connection errors and 500/502/504 (429/503 are
+    left to HostRateLimiter). With http2=True requests go through an httpx
+    client that multiplexes over one connection per host (needs httpx[http2]).
+    
+    stats() reports requests, new connections, the connection reuse ratio and
+    bytes on the wire against bytes after decoding. Each response carries
+    wire_bytes and, over HTTP/1.1, phases: seconds spent in connect (DNS,
+    TCP and TLS; zero on a reused connection), ttfb and download.
+    """
+    
+    RETRY_STATUSES = (500, 502, 504)
+    
+    def __init__(self, pool_connections=10, pool_maxsize=10, retries=2, backoff_factor=0.3,
+                 backoff_jitter=0.3, http2=False, dns_cache_ttl=None, user_agent=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.http2 = http2
+        self.dns_cache_ttl = dns_cache_ttl
+        self._lock = threading.Lock()
+        self.reset_stats()
+        
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': user_agent or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept-Encoding': _accept_encoding()
+        })
+        self._mount()
+        
+        self._client = None
+        if http2:
+            self._client = self._open_http2_client()
+        self._uninstall_dns_cache = install_dns_cache(dns_cache_ttl) if dns_cache_ttl else None
+    
+    def _retry_policy(self):
+        return Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_jitter,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=['GET', 'HEAD'],
+            raise_on_status=False
+        )
+    
+    def _mount(self):
+        adapter = _CountingAdapter(
+            self,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self._retry_policy()
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def _open_http2_client(self):
+        # httpx is optional, so it is only imported when HTTP/2 is requested
+        try:
+            import httpx
+            import h2  # noqa: F401
+        except ImportError:
+            raise RuntimeError("HTTP/2 needs httpx with h2 (pip install 'httpx[http2]')")
+        return httpx.Client(
+            http2=True,
+            headers=dict(self.session.headers),
+            limits=httpx.Limits(max_connections=self.pool_connections * self.pool_maxsize,
+                                max_keepalive_connections=self.pool_maxsize),
+            transport=httpx.HTTPTransport(http2=True, retries=self.retries),
+            follow_redirects=True
+        )
+    
+    def resize(self, pool_maxsize):
+        """Resize the per-host pool, e.g. when the crawl concurrency changes"""
+        if pool_maxsize != self.pool_maxsize:
+            self.pool_maxsize = pool_maxsize
+            self._mount()
+    
+    def get(self, url, timeout=15, headers=None):
+        """GET url; the body is read before returning so it can be counted"""
+        if self._client is not None:
+            response = self._client.get(url, timeout=timeout, headers=headers)
+            wire_bytes = response.num_bytes_downloaded
+            response.phases = {}
+        else:
+            # Streaming splits time to the headers from the body download
+            _FETCH_PHASES.connect = 0.0
+            start = time.perf_counter()
+            response = self.session.get(url, timeout=timeout, headers=headers, stream=True)
+            headers_received = time.perf_counter()
+            response.content
+            connect = _FETCH_PHASES.connect
+            response.phases = {
+                'connect': connect,
+                'ttfb': headers_received - start - connect,
+                'download': time.perf_counter() - headers_received
+            }
+            wire_bytes = response.raw.tell()
+        response.wire_bytes = wire_bytes
+        
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['wire_bytes'] += wire_bytes
+            self._stats['decoded_bytes'] += len(response.content)
+        return response
+    
+    def _count_connection(self):
+        with self._lock:
+            self._stats['connections'] += 1
+    
+    def reset_stats(self):
+        """Zero the counters, e.g. at the start of a crawl"""
+        with self._lock:
+            self._stats = {'requests': 0, 'connections': 0, 'wire_bytes': 0, 'decoded_bytes': 0}
+    
+    def stats(self):
+        """Counters since the last reset plus the connection reuse ratio"""
+        with self._lock:
+            stats = dict(self._stats)
+        if self._client is None and stats['requests']:
+            stats['reuse_ratio'] = max(0.0, 1 - stats['connections'] / stats['requests'])
+        else:
+            # httpx does not expose connection setup; HTTP/2 multiplexes anyway
+            stats['reuse_ratio'] = None
+        return stats
+    
+    def summary(self):
+        """One-line stats summary for logs"""
+        stats = self.stats()
+        reuse = f"{stats['reuse_ratio']:.0%}" if stats['reuse_ratio'] is not None else 'n/a'
+        protocol = 'HTTP/2' if self._client is not None else 'HTTP/1.1'
+        return (f"{stats['requests']} {protocol} requests over {stats['connections']} connections "
+                f"(reuse {reuse}), {stats['wire_bytes'] / 1024:.0f} KiB on the wire, "
+                f"{stats['decoded_bytes'] / 1024:.0f} KiB decoded")
+    
+    def close(self):
+        self.session.close()
+        if self._client is not None:
+            self._client.close()
+        if self._uninstall_dns_cache is not None:
+            self._uninstall_dns_cache()
+            self._uninstall_dns_cache = None
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report each new connection to a transport
+    
+    Connections also time their setup into _FETCH_PHASES for the request's phases.
+    """
+    
+    def __init__(self, transport, **kwargs):
+        self._transport = transport
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        transport = self._transport
+        pool_classes = self.poolmanager.pool_classes_by_scheme
+        
+        def counting(pool_class):
+            class TimedConnection(pool_class.ConnectionCls):
+                def connect(self):
+                    start = time.perf_counter()
+                    try:
+                        super().connect()
+                    finally:
+                        _FETCH_PHASES.connect = getattr(_FETCH_PHASES, 'connect', 0.0) + time.perf_counter() - start
+            
+            class CountingPool(pool_class):
+                ConnectionCls = TimedConnection
+                
+                def _new_conn(self):
+                    transport._count_connection()
+                    return super()._new_conn()
+            return CountingPool
+        
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counting(pool_class) for scheme, pool_class in pool_classes.items()
+        }
+
+
+class EcommerceScraper:
+    def __init__(self, concurrency=8, requests_per_second=4.0, burst=4, max_retries=2, cache=None,
+                 parser=None, templates=None, transport=None, store=None, dedupe=None):
+        self.transport = transport or HttpTransport(pool_maxsize=max(concurrency, 10))
+        self.session = self.transport.session
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.cache = cache
+        self.parser = parser or DEFAULT_PARSER
+        self.product_index = None
+        self.templates = templates if templates is not None else TemplateStore()
+        self.store = store
+        self.dedupe = dedupe
+        self.profiler = RunProfiler()
+        self._change_counts = {}
+        self._in_shard = False
+        self._fetch_status = threading.local()
+        self.set_rate_limit(requests_per_second, burst)
+        self.set_concurrency(concurrency)
+        self.data = []
+        self.running = False
+        
+    def set_concurrency(self, concurrency):
+        """Set the detail-page worker count and grow the connection pool to match"""
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter.max_in_flight = self.concurrency
+        # Every worker needs a pooled connection, or connections churn
+        if self.transport.pool_maxsize < self.concurrency:
+            self.transport.resize(self.concurrency)
+    
+    def set_rate_limit(self, requests_per_second, burst=4):
+        """Replace the per-host limiter shared by every fetch path"""
+        self.rate_limiter = HostRateLimiter(
+            requests_per_second=requests_per_second,
+            burst=burst,
+            max_in_flight=self.concurrency
+        )
+    
+    def close(self):
+        """Close the transport and any cache or store the scraper was given"""
+        self.transport.close()
+        if self.cache:
+            self.cache.close()
+        if self.store:
+            self.store.close()
+    
+    def iter_products(self, url="books.toscrape.com", **kwargs):
+        """Yield products as soon as they are extracted, without keeping them
+        
+        url is "books.toscrape.com" or a custom site URL; kwargs are passed to
+        iter_books_toscrape or iter_custom_site.
+        """
+        if url == "books.toscrape.com":
+            return self.iter_books_toscrape(**kwargs)
+        return self.iter_custom_site(url, **kwargs)
+    
+    def scrape_books_toscrape(self, max_pages=1, max_products=None, callback=None,
+                              base_url="https://books.toscrape.com/", incremental=False,
+                              checkpoint=None, resume=True, compact=False):
+        """Scrape books.toscrape.com
+        
+        With incremental=True only new, changed and removed books are returned,
+        each tagged with a 'change' key, and unchanged books skip their detail page.
+        With a CrawlCheckpoint, progress is journaled and an interrupted crawl
+        resumes where it stopped. compact=True returns Product records, which
+        take a fraction of the memory of dicts on large crawls.
+        """
+        self.data = []
+        for record in self.iter_books_toscrape(max_pages, max_products, callback, base_url, incremental,
+                                               checkpoint, resume):
+            self.data.append(Product.from_dict(record) if compact else record)
+        return self.data
+    
+    def scrape_custom_site(self, url, max_pages=1, max_products=None, callback=None, incremental=False,
+                           checkpoint=None, resume=True, compact=False):
+        """Scrape custom e-commerce site
+        
+        With incremental=True only new, changed and removed products are returned.
+        compact=True returns Product records.
+        """
+        self.data = []
+        for record in self.iter_custom_site(url, max_pages, max_products, callback, incremental,
+                                            checkpoint, resume):
+            self.data.append(Product.from_dict(record) if compact else record)
+        return self.data
+    
+    def iter_books_toscrape(self, max_pages=1, max_products=None, callback=None,
+                            base_url="https://books.toscrape.com/", incremental=False,
+                            checkpoint=None, resume=True):
+        """Yield books.toscrape.com records page by page"""
+        # A shard starts the run once, so a stop mid-shard holds for its remaining URLs
+        if not self._in_shard:
+            self.running = True
+        self._reset_stats(base_url)
+        run_started = self._start_incremental(incremental)
+        current_url = base_url
+        page_count = 0
+        product_count = 0
+        complete = False
+        failed = False
+        
+        state = checkpoint.begin(base_url, resume) if checkpoint else None
+        if state:
+            current_url, page_count, product_count = self._resume_from(state, checkpoint, callback)
+            yield from self._replay(checkpoint)
+        
+        try:
+            while current_url and page_count < max_pages and self.running:
+                if callback:
+                    callback(f"📄 Fetching page {page_count + 1}: {current_url}")
+                
+                html = self._fetch_page(current_url)
+                if not html:
+                    break
+                
+                soup = self._make_soup(html, BOOKS_LISTING_STRAINER, current_url)
+                
+                # Find all book articles
+                books = BOOKS_LISTING_RULES.select_containers(soup)
+                
+                page_data = []
+                for book in books:
+                    if max_products and product_count >= max_products:
+                        break
+                    
+                    book_data = self._extract_book_data(book, current_url, fetch_details=False)
+                    if book_data and not self._is_duplicate(book_data):
+                        page_data.append(book_data)
+                        product_count += 1
+                
+                if incremental:
+                    page_data = self._filter_unchanged(page_data, base_url)
+                
+                # Detail pages are independent, so fetch them concurrently
+                page_records = []
+                for book_data in self._fetch_book_details_concurrently(page_data):
+                    page_records.append(book_data)
+                    yield self._emit_record(book_data, base_url, incremental, callback)
+                
+                # Find next page
+                next_url = None
+                next_link = soup.find('li', class_='next')
+                if next_link and next_link.find('a'):
+                    next_url = urljoin(current_url, next_link.find('a')['href'])
+                else:
+                    complete = not (max_products and product_count >= max_products)
+                
+                # A page cut short by Stop is fetched again on resume
+                if checkpoint and self.running:
+                    checkpoint.page_done(current_url, next_url, page_count + (1 if next_url else 0),
+                                         product_count, page_records)
+                
+                current_url = next_url
+                if next_url:
+                    page_count += 1
+        
+        except Exception as e:
+            failed = True
+            if callback:
+                callback(f"❌ Error: {str(e)}")
+        
+        if checkpoint:
+            checkpoint.finish(not failed and self.running)
+        if incremental:
+            yield from self._finish_incremental(base_url, run_started, complete and self.running, callback)
+        self._report_stats(callback)
+    
+    def iter_custom_site(self, url, max_pages=1, max_products=None, callback=None, incremental=False,
+                         checkpoint=None, resume=True):
+        """Yield custom-site records page by page"""
+        if not self._in_shard:
+            self.running = True
+        self._reset_stats(url)
+        run_started = self._start_incremental(incremental)
+        current_url = url
+        page_count = 0
+        product_count = 0
+        complete = False
+        failed = False
+        
+        state = checkpoint.begin(url, resume) if checkpoint else None
+        if state:
+            current_url, page_count, product_count = self._resume_from(state, checkpoint, callback)
+            yield from self._replay(checkpoint)
+        
+        try:
+            while current_url and page_count < max_pages and self.running:
+                if callback:
+                    callback(f"📄 Fetching page {page_count + 1}: {current_url}")
+                
+                html = self._fetch_page(current_url)
+                if not html:
+                    break
+                
+                soup = self._make_soup(html, url=current_url)
+                
+                page_data = self._drop_duplicates(
+                    self._extract_custom_products(soup, current_url),
+                    max(0, max_products - product_count) if max_products else None
+                )
+                product_count += len(page_data)
+                
+                if incremental:
+                    page_data = self._filter_unchanged(page_data, url)
+                
+                for product_data in page_data:
+                    yield self._emit_record(product_data, url, incremental, callback)
+                
+                # Try to find next page
+                next_url = self._find_next_page_general(soup, current_url)
+                if checkpoint and self.running:
+                    checkpoint.page_done(current_url, next_url, page_count + 1, product_count, page_data)
+                current_url = next_url
+                page_count += 1
+                if not next_url:
+                    complete = not (max_products and product_count >= max_products)
+        
+        except Exception as e:
+            failed = True
+            if callback:
+                callback(f"❌ Error: {str(e)}")
+        
+        if checkpoint:
+            checkpoint.finish(not failed and self.running)
+        if incremental:
+            yield from self._finish_incremental(url, run_started, complete and self.running, callback)
+        self._report_stats(callback)
+    
+    def _resume_from(self, state, checkpoint, callback):
+        """Crawl position (url, page_count, product_count) saved by a checkpoint"""
+        current_url = state['frontier'][0] if state['frontier'] else None
+        if callback:
+            callback(f"⏯ Resuming after {len(state['completed'])} completed pages "
+                     f"({state['records_written']} records restored)")
+        return current_url, state['page_count'], state['product_count']
+    
+    def iter_shard(self, shard, callback=None):
+        """Yield the records of one ShardedCrawl shard, crawled as a single run"""
+        self.running = True
+        self._reset_stats(shard['urls'][0] if shard['urls'] else None)
+        # The per-URL crawls below share this run's stats, dedupe state and store run
+        self._in_shard = True
+        try:
+            for url in shard['urls']:
+                if not self.running:
+                    break
+                found = False
+                if shard['kind'] == 'books':
+                    # Each URL is a single listing page; the shard owns the pagination
+                    records = self.iter_books_toscrape(max_pages=1, callback=callback, base_url=url)
+                else:
+                    records = self.iter_custom_site(url, shard.get('max_pages', 1), callback=callback)
+                for record in records:
+                    found = True
+                    yield record
+                if not self.running:
+                    break
+                
+                status = self.last_fetch_status()
+                # Page ranges are planned blind, so a 404 is the end of the catalogue
+                if status == 404 and shard['kind'] == 'books' and not found:
+                    break
+                # Anything else that failed would leave the shard silently short
+                if status is None or (status >= 400 and status != 404):
+                    raise RuntimeError(f"Fetching {url} failed ({status or 'no response'})")
+        finally:
+            self._in_shard = False
+        self._report_stats(callback)
+        if not self.running:
+            raise RuntimeError(f"Shard {shard['id']} was stopped before it finished")
+    
+    def last_fetch_status(self):
+        """HTTP status of this thread's last _fetch_page, or None if it got no response"""
+        return getattr(self._fetch_status, 'value', None)
+    
+    def _fetch_page(self, url):
+        """Fetch webpage with error handling"""
+        self._fetch_status.value = None
+        try:
+            entry = self.cache.lookup(url) if self.cache else None
+            if entry and entry['fresh']:
+                self.profiler.page_fetched(0)
+                self._fetch_status.value = 200
+                return self.cache.hit(url, entry)
+            
+            for attempt in range(self.max_retries + 1):
+                waited = time.perf_counter()
+                if not self.rate_limiter.acquire(url, cancelled=lambda: not self.running):
+                    return None
+                self.profiler.record('throttle', time.perf_counter() - waited, url)
+                
+                status = None
+                retry_after = None
+                start = time.monotonic()
+                try:
+                    response = self.transport.get(url, timeout=15, headers=self._conditional_headers(entry))
+                    status = self._fetch_status.value = response.status_code
+                    retry_after = response.headers.get('Retry-After')
+                finally:
+                    self.rate_limiter.release(url, status, time.monotonic() - start, retry_after)
+                self._profile_fetch(url, time.monotonic() - start, response.wire_bytes, response.phases)
+                
+                # Throttled: the limiter has backed off, so try again under the new rate
+                if status in HostRateLimiter.RETRY_STATUSES and attempt < self.max_retries:
+                    continue
+                
+                if status == 304:
+                    if entry:
+                        return self.cache.hit(url, entry, revalidated=True)
+                    # raise_for_status() lets a 304 through, and its empty body is not the page
+                    self._fetch_status.value = None
+                    raise RuntimeError("304 Not Modified without a cached copy to revalidate")
+                
+                response.raise_for_status()
+                self._cache_response(url, response.text, response.headers)
+                return response.text
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+    
+    def _make_soup(self, html, strainer=None, url=None):
+        """Parse html with the configured backend, optionally only the strained subtrees"""
+        with self.profiler.span('parse', url):
+            return BeautifulSoup(html, self.parser, parse_only=strainer)
+    
+    def _profile_fetch(self, url, elapsed, wire_bytes, phases):
+        """Record a network fetch and its phases in the run profile"""
+        self.profiler.record('fetch', elapsed, url)
+        for phase, seconds in phases.items():
+            self.profiler.record(phase, seconds, url)
+        self.profiler.page_fetched(wire_bytes)
+    
+    def _start_incremental(self, incremental):
+        """Load the product index for an incremental run and return the run start time"""
+        if incremental and self.product_index is None:
+            self.product_index = ProductIndex()
+        self._change_counts = {'new': 0, 'changed': 0, 'removed': 0}
+        return time.time()
+    
+    def _filter_unchanged(self, records, scope):
+        """Tag new/changed listing records and drop the unchanged ones"""
+        delta = []
+        for record in records:
+            change = self.product_index.classify(record, scope)
+            if change:
+                record['change'] = change
+                delta.append(record)
+        return delta
+    
+    def _replay(self, checkpoint):
+        """Yield a resumed crawl's journaled records, storing them like fresh ones"""
+        for record in checkpoint.replay():
+            if self.dedupe is not None:
+                self.dedupe.check(record)
+            if self.store:
+                self.store.add(record)
+            yield record
+    
+    def _is_duplicate(self, record):
+        """True if the dedupe stage has already seen this product, exactly or nearly"""
+        return self.dedupe is not None and self.dedupe.check(record) is not None
+    
+    def _drop_duplicates(self, records, limit=None):
+        """Up to limit records the dedupe stage has not seen before"""
+        if self.dedupe is None:
+            return records if limit is None else records[:limit]
+        # Records past the limit are never checked, so they are not remembered as seen
+        unique = []
+        for record in records:
+            if limit is not None and len(unique) >= limit:
+                break
+            if not self._is_duplicate(record):
+                unique.append(record)
+        return unique
+    
+    def _emit_record(self, record, scope, incremental, callback):
+        """Type, log and store a finished record and remember it for the next incremental run"""
+        add_typed_fields(record)
+        if self.store:
+            self.store.add(record)
+        if incremental:
+            self.product_index.remember(record, scope)
+            self._change_counts[record['change']] += 1
+        if callback:
+            callback(_scraped_message(record))
+        return record
+    
+    def _finish_incremental(self, scope, run_started, complete, callback):
+        """Return removed products and persist the index after an incremental run"""
+        removed = []
+        # Products can only be declared removed after a full walk of the catalogue
+        if complete:
+            for record in self.product_index.pop_missing(scope, run_started):
+                record['change'] = 'removed'
+                removed.append(add_typed_fields(record))
+        self._change_counts['removed'] = len(removed)
+        
+        self.product_index.save()
+        if callback:
+            counts = self._change_counts
+            callback(f"🔁 Incremental: {counts['new']} new, {counts['changed']} changed, "
+                     f"{counts['removed']} removed")
+        return removed
+    
+    def _conditional_headers(self, entry):
+        """Revalidation headers for a stale cache entry"""
+        return self.cache.conditional_headers(entry) if self.cache else {}
+    
+    def _cache_response(self, url, html, headers):
+        """Store a downloaded page in the response cache"""
+        if self.cache:
+            self.cache.store(url, html, headers.get('ETag'), headers.get('Last-Modified'))
+    
+    def _reset_stats(self, scope=None):
+        """Start this run's cache, transport and profile counters from zero and open a store run"""
+        if self._in_shard:
+            return
+        if self.store:
+            self.store.begin_run(scope)
+        if self.dedupe is not None:
+            self.dedupe.reset()
+        if self.cache:
+            self.cache.reset_stats()
+        self.transport.reset_stats()
+        self.profiler.reset()
+    
+    def _report_stats(self, callback):
+        """Close the store run and log this run's cache, transport and profile counters"""
+        if self._in_shard:
+            return
+        self.profiler.finish()
+        if self.store:
+            self.store.end_run()
+        if not callback:
+            return
+        if self.cache:
+            callback(f"💾 Cache: {self.cache.summary()}")
+        if self.transport.stats()['requests']:
+            callback(f"🔌 Transport: {self.transport.summary()}")
+        if self.profiler.pages:
+            callback(f"⏱️ Profile: {self.profiler.summary()}")
+        if self.store:
+            callback(f"🗄️ Store: {self.store.summary()}")
+        if self.dedupe is not None:
+            callback(f"🧹 Dedupe: {self.dedupe.summary()}")
+    
+    def _fetch_book_details_concurrently(self, books):
+        """Fetch detail pages for a listing with a bounded worker pool"""
+        def fetch(book_data):
+            # Queued work is skipped once the user hits Stop
+            if not self.running:
+                return False
+            self._get_book_details(book_data)
+            return True
+        
+        completed = []
+        executor = ThreadPoolExecutor(max_workers=max(1, self.concurrency))
+        try:
+            futures = [
+                executor.submit(fetch, book_data) if book_data['url'] != 'N/A' else None
+                for book_data in books
+            ]
+            
+            # Collect in submission order so records keep the listing order
+            for book_data, future in zip(books, futures):
+                if future is not None and not future.result():
+                    break
+                completed.append(book_data)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        return completed
+    
+    def _extract_book_data(self, book_element, base_url, fetch_details=True):
+        """Extract data from book element"""
+        try:
+            with self.profiler.span('extract', base_url):
+                data = BOOKS_LISTING_RULES.extract(book_element, base_url)
+            
+            # Try to get more details from individual book page
+            if fetch_details and data['url'] != 'N/A':
+                self._get_book_details(data)
+            
+            return data
+        
+        except Exception as e:
+            print(f"Error extracting book data: {e}")
+            return None
+    
+    def _get_book_details(self, book_data):
+        """Get additional details from book page"""
+        html = self._fetch_page(book_data['url'])
+        if html:
+            self._parse_book_details(html, book_data)
+    
+    def _parse_book_details(self, html, book_data):
+        """Parse a book page into book_data"""
+        try:
+            soup = self._make_soup(html, BOOKS_DETAIL_STRAINER, book_data['url'])
+            with self.profiler.span('extract', book_data['url']):
+                BOOKS_DETAIL_RULES.extract(soup, book_data['url'], record=book_data)
+        
+        except Exception as e:
+            print(f"Error getting book details: {e}")
+    
+    def _find_category_pages(self, html, current_url):
+        """Category listing URLs from the books.toscrape.com sidebar"""
+        soup = self._make_soup(html, BOOKS_CATEGORY_STRAINER, current_url)
+        # The top-level "Books" link lists everything; its children are the categories
+        return [urljoin(current_url, link['href']) for link in soup.select('.side_categories ul ul a[href]')]
+    
+    def _parse_custom_page(self, html, current_url):
+        """Parse a custom-site listing into (products, next page URL)"""
+        soup = self._make_soup(html, url=current_url)
+        return self._extract_custom_products(soup, current_url), self._find_next_page_general(soup, current_url)
+    
+    def _extract_custom_products(self, soup, current_url):
+        """Extract a custom-site page's products using the domain's template"""
+        domain = urlparse(current_url).netloc
+        choices = self.templates.get(domain).get('fields')
+        page_data = []
+        votes = {}
+        with self.profiler.span('extract', current_url):
+            for product in self._find_products(soup, current_url):
+                used = {}
+                product_data = self._extract_general_product_data(product, current_url, choices, used)
+                if product_data:
+                    page_data.append(product_data)
+                    for name, index in used.items():
+                        votes.setdefault(name, Counter())[index] += 1
+        
+        # Remember the fallback that matched most often for each field
+        if votes:
+            self.templates.learn(domain, 'fields', {
+                name: counts.most_common(1)[0][0] for name, counts in votes.items()
+            })
+        return page_data
+    
+    def _find_products(self, soup, page_url=None):
+        """Find the product elements on a listing page
+        
+        The selector in the domain's template is tried first; otherwise
+        PRODUCT_DETECTOR finds the repeated product cards and its selector is
+        stored so the domain's later pages and runs skip detection.
+        """
+        domain = urlparse(page_url).netloc if page_url else None
+        selector = self.templates.get(domain).get('products') if domain else None
+        if selector:
+            products = soup.select(selector)
+            if products:
+                return products
+        
+        products, selector = PRODUCT_DETECTOR.detect(soup)
+        if domain and selector:
+            self.templates.learn(domain, 'products', selector)
+        return products
+    
+    def _extract_general_product_data(self, element, base_url, choices=None, used=None):
+        """Extract data from general product element"""
+        try:
+            return GENERAL_PRODUCT_RULES.extract(element, base_url, choices=choices, used=used)
+        
+        except Exception as e:
+            print(f"Error extracting product data: {e}")
+            return None
+    
+    def _find_next_page_general(self, soup, current_url):
+        """Find next page URL for general sites
+        
+        The selector that worked before on this domain is tried first. When it
+        finds nothing the full cascade runs again and any hit is learned.
+        """
+        domain = urlparse(current_url).netloc
+        learned = self.templates.get(domain).get('next')
+        if learned in NEXT_PAGE_SELECTORS:
+            next_link = NEXT_PAGE_SELECTORS[learned].select_one(soup)
+            if next_link:
+                return urljoin(current_url, next_link['href'])
+        
+        for selector, compiled in NEXT_PAGE_SELECTORS.items():
+            if selector == learned:
+                continue
+            next_link = compiled.select_one(soup)
+            if next_link:
+                self.templates.learn(domain, 'next', selector)
+                return urljoin(current_url, next_link['href'])
+        
+        # Look for next button
+        for link in soup.find_all('a', href=True):
+            if link.text and 'next' in link.text.lower():
+                return urljoin(current_url, link['href'])
+        
+        return None
+
+class AsyncEcommerceScraper(EcommerceScraper):
+    """Asyncio crawl engine that returns the same records as EcommerceScraper
+    
+    Runs headless under any event loop, e.g.
+    asyncio.run(AsyncEcommerceScraper().scrape_books_toscrape(max_pages=5))
+    or streams records with `async for record in scraper.aiter_products(...)`.
+    Uses a pooled aiohttp client when aiohttp is installed and falls back to
+    the shared requests.Session on worker threads otherwise.
+    """
+    
+    def __init__(self, concurrency=8, requests_per_second=4.0, burst=4, max_retries=2, cache=None,
+                 parser=None, templates=None, transport=None, store=None, dedupe=None):
+        super().__init__(concurrency=concurrency, requests_per_second=requests_per_second,
+                         burst=burst, max_retries=max_retries, cache=cache, parser=parser,
+                         templates=templates, transport=transport, store=store, dedupe=dedupe)
+        self._client = None
+    
+    @asynccontextmanager
+    async def _open_client(self):
+        """Open the pooled async HTTP client for the duration of a crawl"""
+        # aiohttp is optional and slow to import, so it is only loaded for async crawls
+        try:
+            import aiohttp
+        except ImportError:
+            yield
+            return
+        
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency * 2,
+            limit_per_host=self.concurrency,
+            ttl_dns_cache=self.transport.dns_cache_ttl or 10
+        )
+        self._client = aiohttp.ClientSession(
+            headers=dict(self.session.headers),
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=15),
+            trace_configs=[self._phase_trace(aiohttp)]
+        )
+        try:
+            yield
+        finally:
+            await self._client.close()
+            self._client = None
+    
+    @staticmethod
+    def _phase_trace(aiohttp):
+        """aiohttp trace hooks timing DNS and connection setup into the request's phases dict"""
+        def mark(key):
+            async def hook(session, context, params):
+                phases = context.trace_request_ctx
+                if phases is not None:
+                    phases[key] = phases.get(key, 0.0) - time.perf_counter()
+            return hook
+        
+        def close(key):
+            async def hook(session, context, params):
+                phases = context.trace_request_ctx
+                if phases is not None:
+                    phases[key] = phases.get(key, 0.0) + time.perf_counter()
+            return hook
+        
+        trace = aiohttp.TraceConfig()
+        trace.on_dns_resolvehost_start.append(mark('dns'))
+        trace.on_dns_resolvehost_end.append(close('dns'))
+        trace.on_connection_create_start.append(mark('connect'))
+        trace.on_connection_create_end.append(close('connect'))
+        return trace
+    
+    def aiter_products(self, url="books.toscrape.com", **kwargs):
+        """Async-iterate products as soon as they are extracted, without keeping them"""
+        if url == "books.toscrape.com":
+            return self.aiter_books_toscrape(**kwargs)
+        return self.aiter_custom_site(url, **kwargs)
+    
+    async def scrape_books_toscrape(self, max_pages=1, max_products=None, callback=None,
+                                    base_url="https://books.toscrape.com/", incremental=False,
+                                    checkpoint=None, resume=True, compact=False):
+        """Scrape books.toscrape.com"""
+        self.data = []
+        async for record in self.aiter_books_toscrape(max_pages, max_products, callback, base_url, incremental,
+                                                      checkpoint, resume):
+            self.data.append(Product.from_dict(record) if compact else record)
+        return self.data
+    
+    async def scrape_custom_site(self, url, max_pages=1, max_products=None, callback=None, incremental=False,
+                                 checkpoint=None, resume=True, compact=False):
+        """Scrape custom e-commerce site"""
+        self.data = []
+        async for record in self.aiter_custom_site(url, max_pages, max_products, callback, incremental,
+                                                   checkpoint, resume):
+            self.data.append(Product.from_dict(record) if compact else record)
+        return self.data
+    
+    async def aiter_books_toscrape(self, max_pages=1, max_products=None, callback=None,
+                                   base_url="https://books.toscrape.com/", incremental=False,
+                                   checkpoint=None, resume=True):
+        """Yield books.toscrape.com records, overlapping pagination with detail fetches"""
+        self.running = True
+        self._reset_stats(base_url)
+        run_started = self._start_incremental(incremental)
+        current_url = base_url
+        page_count = 0
+        collected = 0
+        complete = False
+        failed = False
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = deque()  # (page_data, detail tasks, checkpoint position) per listing page, in order
+        
+        state = checkpoint.begin(base_url, resume) if checkpoint else None
+        if state:
+            current_url, page_count, collected = self._resume_from(state, checkpoint, callback)
+            for record in self._replay(checkpoint):
+                yield record
+        
+        try:
+            async with self._open_client():
+                while current_url and page_count < max_pages and self.running:
+                    if callback:
+                        callback(f"📄 Fetching page {page_count + 1}: {current_url}")
+                    
+                    html = await self._fetch_page_async(current_url)
+                    if not html:
+                        break
+                    
+                    soup = await asyncio.to_thread(self._make_soup, html, BOOKS_LISTING_STRAINER, current_url)
+                    
+                    page_data = []
+                    for book in BOOKS_LISTING_RULES.select_containers(soup):
+                        if max_products and collected >= max_products:
+                            break
+                        
+                        book_data = self._extract_book_data(book, current_url, fetch_details=False)
+                        if book_data and not self._is_duplicate(book_data):
+                            page_data.append(book_data)
+                            collected += 1
+                    
+                    if incremental:
+                        page_data = self._filter_unchanged(page_data, base_url)
+                    
+                    listing_url = current_url
+                    next_link = soup.find('li', class_='next')
+                    if next_link and next_link.find('a') and not (max_products and collected >= max_products):
+                        current_url = urljoin(current_url, next_link.find('a')['href'])
+                        page_count += 1
+                    else:
+                        current_url = None
+                        complete = not next_link and not (max_products and collected >= max_products)
+                    
+                    # Detail fetches run in the background while the next listing page loads
+                    tasks = [
+                        asyncio.create_task(self._get_book_details_async(book_data, semaphore))
+                        if book_data['url'] != 'N/A' else None
+                        for book_data in page_data
+                    ]
+                    position = (listing_url, current_url, page_count, collected)
+                    pending.append((page_data, tasks, position))
+                    
+                    while pending and all(task is None or task.done() for task in pending[0][1]):
+                        records, finished = await self._collect_page(pending.popleft(), base_url, incremental,
+                                                                     callback, checkpoint)
+                        for record in records:
+                            yield record
+                        if not finished:
+                            break
+                
+                while pending:
+                    records, finished = await self._collect_page(pending.popleft(), base_url, incremental,
+                                                                 callback, checkpoint)
+                    for record in records:
+                        yield record
+                    if not finished:
+                        break
+        
+        except Exception as e:
+            failed = True
+            if callback:
+                callback(f"❌ Error: {str(e)}")
+        
+        finally:
+            for _, tasks, _ in pending:
+                for task in tasks:
+                    if task is not None:
+                        task.cancel()
+        
+        if checkpoint:
+            checkpoint.finish(not failed and self.running)
+        if incremental:
+            for record in self._finish_incremental(base_url, run_started, complete and self.running, callback):
+                yield record
+        self._report_stats(callback)
+    
+    async def aiter_custom_site(self, url, max_pages=1, max_products=None, callback=None, incremental=False,
+                                checkpoint=None, resume=True):
+        """Yield custom-site records page by page"""
+        self.running = True
+        self._reset_stats(url)
+        run_started = self._start_incremental(incremental)
+        current_url = url
+        page_count = 0
+        product_count = 0
+        complete = False
+        failed = False
+        
+        state = checkpoint.begin(url, resume) if checkpoint else None
+        if state:
+            current_url, page_count, product_count = self._resume_from(state, checkpoint, callback)
+            for record in self._replay(checkpoint):
+                yield record
+        
+        try:
+            async with self._open_client():
+                while current_url and page_count < max_pages and self.running:
+                    if callback:
+                        callback(f"📄 Fetching page {page_count + 1}: {current_url}")
+                    
+                    html = await self._fetch_page_async(current_url)
+                    if not html:
+                        break
+                    
+                    # Parsing is CPU-bound, keep it off the event loop
+                    page_data, next_url = await asyncio.to_thread(
+                        self._parse_custom_page, html, current_url
+                    )
+                    page_data = self._drop_duplicates(
+                        page_data,
+                        max(0, max_products - product_count) if max_products else None
+                    )
+                    product_count += len(page_data)
+                    
+                    if incremental:
+                        page_data = self._filter_unchanged(page_data, url)
+                    
+                    for product_data in page_data:
+                        yield self._emit_record(product_data, url, incremental, callback)
+                    
+                    if checkpoint and self.running:
+                        checkpoint.page_done(current_url, next_url, page_count + 1, product_count, page_data)
+                    current_url = next_url
+                    page_count += 1
+                    if not next_url:
+                        complete = not (max_products and product_count >= max_products)
+        
+        except Exception as e:
+            failed = True
+            if callback:
+                callback(f"❌ Error: {str(e)}")
+        
+        if checkpoint:
+            checkpoint.finish(not failed and self.running)
+        if incremental:
+            for record in self._finish_incremental(url, run_started, complete and self.running, callback):
+                yield record
+        self._report_stats(callback)
+    
+    async def _collect_page(self, page, scope, incremental, callback, checkpoint=None):
+        """Finish a listing page's records once their detail fetches complete
+        
+        Returns (records, finished); finished is False when Stop cut the page short.
+        """
+        page_data, tasks, position = page
+        records = []
+        for book_data, task in zip(page_data, tasks):
+            if task is not None and not await task:
+                return records, False
+            records.append(self._emit_record(book_data, scope, incremental, callback))
+        if checkpoint and self.running:
+            checkpoint.page_done(*position, records)
+        return records, True
+    
+    async def _get_book_details_async(self, book_data, semaphore):
+        """Fetch and parse a book page, bounded by the crawl's semaphore"""
+        async with semaphore:
+            if not self.running:
+                return False
+            html = await self._fetch_page_async(book_data['url'])
+        if html:
+            await asyncio.to_thread(self._parse_book_details, html, book_data)
+        return True
+    
+    async def _fetch_page_async(self, url):
+        """Fetch webpage asynchronously with error handling"""
+        if self._client is None:
+            return await asyncio.to_thread(self._fetch_page, url)
+        
+        try:
+            entry = self.cache.lookup(url) if self.cache else None
+            if entry and entry['fresh']:
+                self.profiler.page_fetched(0)
+                return self.cache.hit(url, entry)
+            
+            for attempt in range(self.max_retries + 1):
+                waited = time.perf_counter()
+                if not await self.rate_limiter.acquire_async(url, cancelled=lambda: not self.running):
+                    return None
+                self.profiler.record('throttle', time.perf_counter() - waited, url)
+                
+                status = None
+                retry_after = None
+                start = time.monotonic()
+                phases = {}
+                try:
+                    async with self._client.get(url, headers=self._conditional_headers(entry),
+                                                trace_request_ctx=phases) as response:
+                        headers_received = time.monotonic()
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
+                        body = await response.read()
+                        # Connection setup includes the DNS lookup; report them apart
+                        phases['connect'] = phases.get('connect', 0.0) - phases.get('dns', 0.0)
+                        phases['ttfb'] = headers_received - start - phases['connect'] - phases.get('dns', 0.0)
+                        phases['download'] = time.monotonic() - headers_received
+                        wire_bytes = int(response.headers.get('Content-Length') or len(body))
+                        self._profile_fetch(url, time.monotonic() - start, wire_bytes, phases)
+                        if status in HostRateLimiter.RETRY_STATUSES and attempt < self.max_retries:
+                            continue
+                        if status == 304:
+                            if entry:
+                                return self.cache.hit(url, entry, revalidated=True)
+                            raise RuntimeError("304 Not Modified without a cached copy to revalidate")
+                        response.raise_for_status()
+                        html = body.decode(response.get_encoding())
+                        self._cache_response(url, html, response.headers)
+                        return html
+                finally:
+                    self.rate_limiter.release(url, status, time.monotonic() - start, retry_after)
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """Normalize a URL so trivially different spellings dedupe to one key
+    
+    Lowercases scheme and host, drops default ports, fragments and utm_*
+    parameters, resolves dot segments and sorts the query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and DEFAULT_PORTS.get(scheme) != parts.port:
+        host = f'{host}:{parts.port}'
+    
+    path = posixpath.normpath(parts.path) if parts.path else '/'
+    if path.startswith('//'):
+        path = '/' + path.lstrip('/')
+    if parts.path.endswith('/') and not path.endswith('/'):
+        path += '/'
+    
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.startswith('utm_')
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class SeenSet:
+    """Exact seen-set holding 64-bit digests instead of URL strings"""
+    
+    def __init__(self):
+        self._digests = set()
+    
+    @staticmethod
+    def _digest(key):
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+    
+    def add(self, key):
+        """Add key; returns False if it was already present"""
+        digest = self._digest(key)
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+    
+    def __contains__(self, key):
+        return self._digest(key) in self._digests
+    
+    def __len__(self):
+        return len(self._digests)
+
+
+class BloomFilter:
+    """Probabilistic seen-set for millions of URLs in a few megabytes
+    
+    Never reports a new URL as seen twice, but may report an unseen URL as
+    seen with probability error_rate once capacity keys have been added.
+    """
+    
+    def __init__(self, capacity=1_000_000, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(self.size // 8 + 1)
+        self._count = 0
+    
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+    
+    def add(self, key):
+        """Add key; returns False if it was (probably) already present"""
+        new = False
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self._count += 1
+        return new
+    
+    def __contains__(self, key):
+        return all(self._bits[position // 8] & (1 << (position % 8)) for position in self._positions(key))
+    
+    def __len__(self):
+        return self._count
+
+
+class ProductDeduplicator:
+    """Streaming duplicate filter: canonical URLs first, then MinHash LSH on titles
+    
+    check() is called once per record as it is scraped. A record whose
+    canonical URL was already seen is an exact duplicate. Otherwise the
+    record's title is shingled into character 3-grams and MinHashed, and the
+    signature's bands are looked up in an LSH index, so only records sharing
+    a band are compared and the cost per record stays flat as the index
+    grows. The signature uses one permutation hashing: each shingle is hashed
+    once into one of num_perm bins, and an empty bin borrows the value of a
+    filled bin picked by its own fixed random probe order. A candidate is a fuzzy duplicate when its estimated title
+    similarity reaches threshold, its price is equal and its image is the
+    same; a missing price or image on either side does not count against it.
+    """
+    
+    _EMPTY = (1 << 64) - 1
+    _TRUNCATION = re.compile(r'(\.\.\.|…)$')
+    _NON_WORD = re.compile(r'\W+')
+    
+    def __init__(self, threshold=0.8, num_perm=32, bands=8):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(num_perm)
+        self._probes = [rng.sample(range(num_perm), num_perm) for _ in range(num_perm)]
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Forget every record, e.g. at the start of a new crawl"""
+        with self._lock:
+            self._urls = {}
+            self._entries = []  # (signature, price, image, label) per indexed record
+            self._buckets = [{} for _ in range(self.bands)]
+            self.exact = 0
+            self.fuzzy = 0
+    
+    @staticmethod
+    def _label(record):
+        url = record.get('url', 'N/A')
+        return url if url != 'N/A' else record.get('title', 'N/A')
+    
+    def _shingles(self, title):
+        title = self._NON_WORD.sub(' ', self._TRUNCATION.sub('', title.strip()).lower()).strip()
+        if not title:
+            return ()
+        padded = f' {title} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    def signature(self, title):
+        """MinHash signature of a title, or None for an empty one"""
+        bins_count = self.num_perm
+        empty = self._EMPTY
+        bins = [empty] * bins_count
+        # blake2b rather than hash(), which is salted per process for str
+        for shingle in self._shingles(title):
+            value, index = divmod(SeenSet._digest(shingle), bins_count)
+            if value < bins[index]:
+                bins[index] = value
+        
+        filled = [index for index, value in enumerate(bins) if value != empty]
+        if not filled:
+            return None
+        if len(filled) < bins_count:
+            signature = array('Q', bins)
+            for index, value in enumerate(bins):
+                if value == empty:
+                    signature[index] = next(bins[probe] for probe in self._probes[index] if bins[probe] != empty)
+            return signature
+        return array('Q', bins)
+    
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hashlib.blake2b(signature[i * rows:(i + 1) * rows].tobytes(), digest_size=8).digest()
+                for i in range(self.bands)]
+    
+    def check(self, record):
+        """Index a record; returns the URL (or title) of the earlier record it duplicates, else None"""
+        url = record.get('url', 'N/A')
+        key = canonicalize_url(url) if url and url != 'N/A' else None
+        title = record.get('title')
+        signature = self.signature(title) if title and title != 'N/A' else None
+        price = parse_price(record.get('price'))[0]
+        image = record.get('image_url')
+        image = image.strip() if image and image != 'N/A' else None
+        band_keys = self._band_keys(signature) if signature is not None else ()
+        
+        with self._lock:
+            if key is not None:
+                if key in self._urls:
+                    self.exact += 1
+                    return self._urls[key]
+                self._urls[key] = self._label(record)
+            
+            if signature is None:
+                return None
+            checked = set()
+            for band, band_key in enumerate(band_keys):
+                for index in self._buckets[band].get(band_key, ()):
+                    if index in checked:
+                        continue
+                    checked.add(index)
+                    other, other_price, other_image, label = self._entries[index]
+                    if price is not None and other_price is not None and price != other_price:
+                        continue
+                    if image and other_image and image != other_image:
+                        continue
+                    agree = sum(1 for x, y in zip(signature, other) if x == y)
+                    if agree >= self.threshold * self.num_perm:
+                        self.fuzzy += 1
+                        return label
+            
+            index = len(self._entries)
+            self._entries.append((signature, price, image, self._label(record)))
+            for band, band_key in enumerate(band_keys):
+                self._buckets[band].setdefault(band_key, []).append(index)
+            return None
+    
+    def summary(self):
+        """One-line description of what was dropped"""
+        return f"{self.exact} exact and {self.fuzzy} near-duplicate products dropped, {len(self._entries)} indexed"
+
+
+class UrlFrontier:
+    """Thread-safe priority queue that hands out each canonical URL only once
+    
+    Lower priorities come out first and ties keep insertion order. get()
+    blocks until a URL is available or the frontier is closed.
+    """
+    
+    def __init__(self, seen=None):
+        self.seen = seen if seen is not None else SeenSet()
+        self.added = 0
+        self.duplicates = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+    
+    def add(self, url, priority=0, item=None):
+        """Queue url (with an optional payload); returns False for a duplicate"""
+        key = canonicalize_url(url)
+        with self._condition:
+            if self._closed:
+                return False
+            if not self.seen.add(key):
+                self.duplicates += 1
+                return False
+            heapq.heappush(self._heap, (priority, next(self._counter), url, item))
+            self.added += 1
+            self._condition.notify()
+            return True
+    
+    def get(self, timeout=None):
+        """Next (url, item), or None once the frontier is closed"""
+        with self._condition:
+            while not self._heap and not self._closed:
+                if not self._condition.wait(timeout):
+                    return None
+            if self._closed:
+                return None
+            _, _, url, item = heapq.heappop(self._heap)
+            return url, item
+    
+    def close(self):
+        """Wake every waiting get(); queued URLs are abandoned"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+    
+    def qsize(self):
+        with self._condition:
+            return len(self._heap)
+    
+    def __len__(self):
+        return self.qsize()
+
+
+class StageMetrics:
+    """Counters for one pipeline stage: work done, busy time and queue depth"""
+    
+    def __init__(self, name, workers, queue):
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+    
+    def record(self, elapsed, error=False):
+        with self._lock:
+            self.processed += 1
+            self.busy += elapsed
+            if error:
+                self.errors += 1
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+    
+    def snapshot(self, wall_time):
+        """Metrics as a dict; utilization is busy time over the workers' wall time"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'processed': self.processed,
+                'errors': self.errors,
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.max_depth,
+                'per_second': self.processed / wall_time if wall_time else 0.0,
+                'utilization': self.busy / (wall_time * self.workers) if wall_time else 0.0
+            }
+
+
+class CrawlPipeline:
+    """Staged crawl: URL frontier -> fetchers -> raw-HTML queue -> parsers -> record queue -> sink
+    
+    Fetching and parsing run in separate worker pools so network waits and
+    parsing overlap. The HTML and record queues are bounded, so a slow parser
+    or sink holds the fetchers back instead of buffering pages in memory. The
+    UrlFrontier feeding the fetchers is unbounded, because parsers add to it
+    and a bounded frontier could deadlock against a full HTML queue; it drops
+    URLs already seen, so a product listed twice is fetched once.
+    
+    With categories=True the sidebar's category listings are crawled in
+    parallel instead of following one chain of next links.
+    
+    Records come out in completion order, not listing order.
+    """
+    
+    _DONE = object()
+    
+    def __init__(self, scraper, fetch_workers=None, parse_workers=2, html_queue_size=32,
+                 record_queue_size=256):
+        self.scraper = scraper
+        self.fetch_workers = max(1, fetch_workers or scraper.concurrency)
+        self.parse_workers = max(1, parse_workers)
+        self.html_queue_size = html_queue_size
+        self.record_queue_size = record_queue_size
+        self._lock = threading.Lock()
+        self._reset()
+    
+    # Listings come out of the frontier first: they fan out into more work
+    PRIORITIES = {'categories': 0, 'listing': 1, 'detail': 2}
+    
+    def _reset(self, seen=None):
+        """Fresh queues and counters for a run"""
+        self.frontier = UrlFrontier(seen)
+        self.html_queue = queue.Queue(maxsize=self.html_queue_size)
+        self.record_queue = queue.Queue(maxsize=self.record_queue_size)
+        self.stages = {
+            'fetch': StageMetrics('fetch', self.fetch_workers, self.frontier),
+            'parse': StageMetrics('parse', self.parse_workers, self.html_queue),
+            'sink': StageMetrics('sink', 1, self.record_queue)
+        }
+        self._outstanding = 0
+        self._products = 0
+        self._fetchers_left = self.fetch_workers
+        self._parsers_left = self.parse_workers
+        self._started = None
+        self._finished = None
+    
+    def run(self, sink, url="books.toscrape.com", **kwargs):
+        """Crawl into sink; returns the number of records written"""
+        count = 0
+        for record in self.iter_products(url, **kwargs):
+            with self.scraper.profiler.span('export'):
+                sink.write(record)
+            count += 1
+        return count
+    
+    def iter_products(self, url="books.toscrape.com", max_pages=1, max_products=None, callback=None,
+                      base_url="https://books.toscrape.com/", categories=False, seen=None):
+        """Yield records from the pipeline as parsers produce them
+        
+        max_pages applies to each chain of next links, i.e. per category with
+        categories=True. seen is the frontier's seen-set: a SeenSet by default,
+        or a BloomFilter for crawls of millions of URLs.
+        """
+        books = url == "books.toscrape.com"
+        if categories and not books:
+            raise ValueError("Category discovery is only supported for books.toscrape.com")
+        self._reset(seen)
+        self.scraper._reset_stats(base_url if books else url)
+        self.scraper.running = True
+        self._books = books
+        self._scope = base_url if books else url
+        self._max_pages = max_pages
+        self._max_products = max_products
+        self._callback = callback
+        self._started = time.monotonic()
+        
+        self._schedule('categories' if categories else 'listing', base_url if books else url, None)
+        workers = (
+            [threading.Thread(target=self._fetch_worker, daemon=True) for _ in range(self.fetch_workers)] +
+            [threading.Thread(target=self._parse_worker, daemon=True) for _ in range(self.parse_workers)]
+        )
+        for worker in workers:
+            worker.start()
+        
+        try:
+            while True:
+                record = self.record_queue.get()
+                if record is self._DONE:
+                    break
+                # The consumer (usually a sink) is the last stage
+                start = time.monotonic()
+                yield record
+                self.stages['sink'].record(time.monotonic() - start)
+        finally:
+            # Also reached when the consumer stops early: wind the workers down.
+            # Parsers keep draining the HTML queue; only records are discarded here.
+            self.scraper.running = False
+            self.frontier.close()
+            for worker in workers:
+                while worker.is_alive():
+                    self._drain(self.record_queue)
+                    worker.join(0.05)
+            self._finished = time.monotonic()
+            if callback:
+                callback(f"🏭 {self.format_metrics()}")
+            self.scraper._report_stats(callback)
+    
+    def metrics(self):
+        """Per-stage queue depth, throughput and utilization"""
+        if self._started is None:
+            return {}
+        wall_time = (self._finished or time.monotonic()) - self._started
+        metrics = {name: stage.snapshot(wall_time) for name, stage in self.stages.items()}
+        metrics['fetch']['urls_queued'] = self.frontier.added
+        metrics['fetch']['duplicates_skipped'] = self.frontier.duplicates
+        return metrics
+    
+    def format_metrics(self):
+        """One-line metrics summary for logs"""
+        metrics = self.metrics()
+        return ' | '.join(
+            f"{name}: {m['processed']} done, {m['per_second']:.1f}/s, "
+            f"{m['utilization']:.0%} busy, queue max {m['max_queue_depth']}"
+            for name, m in metrics.items()
+        ) + f" | {metrics['fetch']['duplicates_skipped']} duplicate URLs skipped"
+    
+    @staticmethod
+    def _drain(work_queue):
+        try:
+            while True:
+                work_queue.get_nowait()
+        except queue.Empty:
+            pass
+    
+    def _schedule(self, kind, url, context):
+        """Add a fetch job unless its URL was seen; the crawl ends when no job is outstanding"""
+        with self._lock:
+            self._outstanding += 1
+        if self.frontier.add(url, self.PRIORITIES[kind], (kind, context)):
+            return True
+        self._job_done()
+        return False
+    
+    def _job_done(self):
+        with self._lock:
+            self._outstanding -= 1
+            finished = self._outstanding == 0
+        if finished:
+            self.frontier.close()
+    
+    def _fetch_worker(self):
+        while True:
+            job = self.frontier.get()
+            if job is None:
+                break
+            
+            url, (kind, context) = job
+            if not self.scraper.running:
+                self._job_done()
+                continue
+            if kind == 'listing' and self._callback:
+                self._callback(f"📄 Fetching page {context or 1}: {url}")
+            
+            start = time.monotonic()
+            html = self.scraper._fetch_page(url)
+            self.stages['fetch'].record(time.monotonic() - start, error=html is None)
+            
+            if html is None:
+                self._job_done()
+            else:
+                self.html_queue.put((kind, url, context, html))
+        
+        # The last fetcher out tells the parsers to stop
+        with self._lock:
+            self._fetchers_left -= 1
+            last = self._fetchers_left == 0
+        if last:
+            for _ in range(self.parse_workers):
+                self.html_queue.put(self._DONE)
+    
+    def _parse_worker(self):
+        while True:
+            item = self.html_queue.get()
+            if item is self._DONE:
+                break
+            
+            kind, url, context, html = item
+            if not self.scraper.running:
+                self._job_done()
+                continue
+            
+            start = time.monotonic()
+            error = False
+            try:
+                if kind == 'detail':
+                    self.scraper._parse_book_details(html, context)
+                    self._emit(context)
+                elif kind == 'categories':
+                    self._parse_categories(url, html)
+                elif self._books:
+                    self._parse_books_listing(url, context or 1, html)
+                else:
+                    self._parse_custom_listing(url, context or 1, html)
+            except Exception as e:
+                error = True
+                print(f"Error parsing {url}: {e}")
+            finally:
+                self.stages['parse'].record(time.monotonic() - start, error)
+                self._job_done()
+        
+        # The last parser out closes the record stream
+        with self._lock:
+            self._parsers_left -= 1
+            last = self._parsers_left == 0
+        if last:
+            self.record_queue.put(self._DONE)
+    
+    def _emit(self, record):
+        if self.scraper.running:
+            add_typed_fields(record)
+            if self.scraper.store:
+                self.scraper.store.add(record)
+            self.record_queue.put(record)
+            if self._callback:
+                self._callback(_scraped_message(record))
+    
+    def _claim_products(self, wanted):
+        """How many of wanted products still fit under max_products"""
+        with self._lock:
+            if self._max_products:
+                wanted = max(0, min(wanted, self._max_products - self._products))
+            self._products += wanted
+            return wanted
+    
+    def _release_products(self, count):
+        """Hand back claimed products that were not emitted"""
+        if count:
+            with self._lock:
+                self._products -= count
+    
+    def _schedule_next(self, next_url, page):
+        if next_url and page < self._max_pages and self.scraper.running:
+            with self._lock:
+                full = self._max_products and self._products >= self._max_products
+            if not full:
+                self._schedule('listing', next_url, page + 1)
+    
+    def _parse_categories(self, url, html):
+        category_urls = self.scraper._find_category_pages(html, url)
+        if self._callback:
+            self._callback(f"🗂️ Found {len(category_urls)} categories")
+        for category_url in category_urls:
+            self._schedule('listing', category_url, 1)
+    
+    def _parse_books_listing(self, url, page, html):
+        soup = self.scraper._make_soup(html, BOOKS_LISTING_STRAINER, url)
+        for element in BOOKS_LISTING_RULES.select_containers(soup):
+            book_data = self.scraper._extract_book_data(element, url, fetch_details=False)
+            if not book_data:
+                continue
+            if not self._claim_products(1):
+                break
+            # Only claimed records are checked, so the cut never marks a product as seen
+            if self.scraper._is_duplicate(book_data):
+                self._release_products(1)
+                continue
+            if book_data['url'] == 'N/A':
+                self._emit(book_data)
+                continue
+            
+            # A product already reached through another listing is fetched once
+            if not self._schedule('detail', book_data['url'], book_data):
+                self._release_products(1)
+        
+        next_link = soup.find('li', class_='next')
+        if next_link and next_link.find('a'):
+            self._schedule_next(urljoin(url, next_link.find('a')['href']), page)
+    
+    def _parse_custom_listing(self, url, page, html):
+        page_data, next_url = self.scraper._parse_custom_page(html, url)
+        claimed = self._claim_products(len(page_data))
+        page_data = self.scraper._drop_duplicates(page_data, claimed)
+        self._release_products(claimed - len(page_data))
+        for product_data in page_data:
+            self._emit(product_data)
+        self._schedule_next(next_url, page)
+
+
+def _make_thumbnail(source, destination, size):
+    """Write a JPEG thumbnail of an image file; runs in an ImageStage worker process"""
+    from PIL import Image
+    tmp_path = destination + '.tmp'
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(tmp_path, 'JPEG', quality=85)
+    os.replace(tmp_path, destination)
+    return destination
+
+
+class ImageStage:
+    """Downloads product images into a content-addressed store, with optional thumbnails
+    
+    process() passes records through in order while their image_url is
+    fetched on a thread pool, with at most per_host downloads in flight per
+    host. Each image is stored once under the SHA-256 of its bytes, so an
+    image shared by several products or URLs is one file, and records gain
+    image_hash and image_path (and thumbnail_path with thumbnail_size;
+    thumbnails are made in a process pool and need Pillow). An image checked
+    within ttl seconds is not requested again and an older one is revalidated
+    with its ETag/Last-Modified, so unchanged images are skipped on re-runs.
+    Throttled downloads (429/503) are retried under the backed-off rate, and
+    downloads still waiting for the rate limiter give up once the stream
+    ends or process()'s cancelled predicate turns true.
+    """
+    
+    EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.svg')
+    
+    def __init__(self, directory=None, transport=None, concurrency=8, per_host=4, requests_per_second=8.0,
+                 thumbnail_size=None, thumbnail_processes=None, ttl=86400, window=None, max_retries=2):
+        if thumbnail_size:
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Thumbnails need Pillow (pip install Pillow)")
+        self.directory = directory or os.path.join(DATA_DIR, 'images')
+        os.makedirs(self.directory, exist_ok=True)
+        self._owns_transport = transport is None
+        self.transport = transport or HttpTransport(pool_maxsize=max(concurrency, 10))
+        self.rate_limiter = HostRateLimiter(requests_per_second=requests_per_second, burst=per_host,
+                                            max_in_flight=per_host)
+        self.concurrency = max(1, concurrency)
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_processes = thumbnail_processes
+        self.ttl = ttl
+        self.window = window or self.concurrency * 4
+        self.max_retries = max_retries
+        self._cancelled = None
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._fetches = {}
+        self._thumbnails = {}
+        self._executor = None
+        self._thumbnailer = None
+        self._unsaved = 0
+        self._closed = False
+        self._conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.reset_stats()
+    
+    def reset_stats(self):
+        """Zero the counters, e.g. at the start of a crawl"""
+        with self._lock:
+            self.stats = {'downloaded': 0, 'stored': 0, 'unchanged': 0, 'failed': 0, 'bytes': 0, 'thumbnails': 0}
+    
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+    
+    def summary(self):
+        """One-line description of this run's image work"""
+        stats = self.stats
+        text = (f"{stats['downloaded']} downloaded ({stats['bytes'] / 1024:.0f} KiB, {stats['stored']} new files), "
+                f"{stats['unchanged']} unchanged, {stats['failed']} failed")
+        if self.thumbnail_size:
+            text += f", {stats['thumbnails']} thumbnails"
+        return text
+    
+    def object_path(self, image_hash, extension):
+        """Where the image with this SHA-256 is stored"""
+        return os.path.join(self.directory, 'objects', image_hash[:2], image_hash + extension)
+    
+    def thumbnail_path(self, image_hash):
+        """Where the thumbnail of the image with this SHA-256 is stored"""
+        return os.path.join(self.directory, 'thumbs', image_hash[:2], f'{image_hash}-{self.thumbnail_size}.jpg')
+    
+    def process(self, records, callback=None, cancelled=None):
+        """Yield records in order with their image fields, downloading up to window images ahead"""
+        self._start_run(cancelled)
+        pending = deque()
+        try:
+            for record in records:
+                pending.append(self._submit(record))
+                if len(pending) >= self.window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            self._finish_run(pending)
+        if callback:
+            callback(f"🖼️ Images: {self.summary()}")
+    
+    async def aprocess(self, records, callback=None, cancelled=None):
+        """Async variant of process() for aiter_products()"""
+        self._start_run(cancelled)
+        pending = deque()
+        try:
+            async for record in records:
+                pending.append(asyncio.wrap_future(self._submit(record)))
+                if len(pending) >= self.window:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            self._finish_run(pending)
+        if callback:
+            callback(f"🖼️ Images: {self.summary()}")
+    
+    def _submit(self, record):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        return self._executor.submit(self.attach, record)
+    
+    def _start_run(self, cancelled):
+        self.reset_stats()
+        self._cancelled = cancelled
+        self._stopping = False
+    
+    def _is_cancelled(self):
+        return self._stopping or bool(self._cancelled and self._cancelled())
+    
+    def _finish_run(self, pending):
+        # Downloads still throttled are not worth waiting for once the stream is gone
+        self._stopping = True
+        for future in pending:
+            future.cancel()
+        with self._lock:
+            # A stream closed after the stage has nothing left to save
+            if self._closed:
+                return
+            self._fetches = {}
+            self._thumbnails = {}
+            self._conn.commit()
+            self._unsaved = 0
+    
+    def attach(self, record):
+        """Fetch a record's image and add image_hash, image_path and thumbnail_path to it"""
+        url = record.get('image_url')
+        image = self.fetch(url) if url and url != 'N/A' else None
+        record['image_hash'] = image['hash'] if image else 'N/A'
+        record['image_path'] = image['path'] if image else 'N/A'
+        if self.thumbnail_size:
+            record['thumbnail_path'] = (image and image.get('thumbnail')) or 'N/A'
+        return record
+    
+    def fetch(self, url):
+        """{'hash', 'path'[, 'thumbnail']} for an image URL, fetched at most once per run; None on failure"""
+        with self._lock:
+            future = self._fetches.get(url)
+            owner = future is None
+            if owner:
+                future = self._fetches[url] = Future()
+        if not owner:
+            return future.result()
+        
+        try:
+            image = self._fetch(url)
+        except Exception as e:
+            print(f"Error downloading image {url}: {e}")
+            image = None
+        if image is None:
+            self._count('failed')
+        future.set_result(image)
+        return image
+    
+    def _fetch(self, url):
+        with self._lock:
+            known = self._conn.execute(
+                "SELECT hash, extension, etag, last_modified, checked_at FROM images WHERE url = ?", (url,)
+            ).fetchone()
+        headers = None
+        if known and os.path.exists(self.object_path(known[0], known[1])):
+            image_hash, extension, etag, last_modified, checked_at = known
+            if time.time() - checked_at < self.ttl:
+                self._count('unchanged')
+                return self._describe(image_hash, extension)
+            headers = {}
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        else:
+            known = None
+        
+        for attempt in range(self.max_retries + 1):
+            if not self.rate_limiter.acquire(url, cancelled=self._is_cancelled):
+                return None
+            status = elapsed = retry_after = None
+            try:
+                start = time.monotonic()
+                response = self.transport.get(url, headers=headers)
+                status = response.status_code
+                elapsed = time.monotonic() - start
+                retry_after = response.headers.get('Retry-After')
+            finally:
+                self.rate_limiter.release(url, status, elapsed, retry_after)
+            
+            # Throttled: the limiter has backed off, so try again under the new rate
+            if status not in HostRateLimiter.RETRY_STATUSES or attempt == self.max_retries:
+                break
+        
+        if status == 304 and known:
+            self._remember(url, image_hash, extension, response.headers.get('ETag') or etag,
+                           response.headers.get('Last-Modified') or last_modified)
+            self._count('unchanged')
+            return self._describe(image_hash, extension)
+        if status != 200:
+            return None
+        
+        content = response.content
+        self._count('downloaded')
+        self._count('bytes', len(content))
+        image_hash = hashlib.sha256(content).hexdigest()
+        extension = self._extension(url, response.headers.get('Content-Type'))
+        path = self.object_path(image_hash, extension)
+        # Identical bytes from another URL (or an unchanged re-download) are already stored
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            self._count('stored')
+        self._remember(url, image_hash, extension, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return self._describe(image_hash, extension)
+    
+    def _remember(self, url, image_hash, extension, etag, last_modified):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (url, hash, extension, etag, last_modified, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, image_hash, extension, etag, last_modified, time.time())
+            )
+            self._unsaved += 1
+            if self._unsaved >= 200:
+                self._conn.commit()
+                self._unsaved = 0
+    
+    def _describe(self, image_hash, extension):
+        image = {'hash': image_hash, 'path': self.object_path(image_hash, extension)}
+        if self.thumbnail_size:
+            image['thumbnail'] = self._thumbnail(image['path'], image_hash)
+        return image
+    
+    def _thumbnail(self, source, image_hash):
+        """Thumbnail path for an image, made in the process pool unless it already exists"""
+        destination = self.thumbnail_path(image_hash)
+        if os.path.exists(destination):
+            return destination
+        with self._lock:
+            future = self._thumbnails.get(image_hash)
+            if future is None:
+                if self._thumbnailer is None:
+                    self._thumbnailer = ProcessPoolExecutor(max_workers=self.thumbnail_processes)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                future = self._thumbnails[image_hash] = self._thumbnailer.submit(
+                    _make_thumbnail, source, destination, self.thumbnail_size)
+                self.stats['thumbnails'] += 1
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Error making thumbnail of {source}: {e}")
+            return None
+    
+    @classmethod
+    def _extension(cls, url, content_type):
+        """File extension from the Content-Type, else from the URL"""
+        if content_type:
+            extension = mimetypes.guess_extension(content_type.split(';')[0].strip())
+            if extension in cls.EXTENSIONS:
+                return extension
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        return extension if extension in cls.EXTENSIONS else '.img'
+    
+    def close(self):
+        """Wait for running work and release the pools and index"""
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        if self._thumbnailer:
+            self._thumbnailer.shutdown()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._conn.commit()
+            self._conn.close()
+        if self._owns_transport:
+            self.transport.close()
+
+
+class ShardQueue:
+    """Directory-backed queue of crawl shards shared by worker processes
+    
+    Shards move pending/ -> claimed/ -> done/ by atomic renames, so workers on
+    any machine that sees the directory (e.g. over a shared filesystem) can
+    take work without a broker. A finished shard leaves its records in
+    done/<id>.ndjson next to a small result file. A shard that fails goes
+    back to pending/, and to failed/ after MAX_ATTEMPTS tries.
+    """
+    
+    MAX_ATTEMPTS = 3
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.pending_dir = os.path.join(directory, 'pending')
+        self.claimed_dir = os.path.join(directory, 'claimed')
+        self.done_dir = os.path.join(directory, 'done')
+        self.failed_dir = os.path.join(directory, 'failed')
+        for path in self._dirs():
+            os.makedirs(path, exist_ok=True)
+    
+    def _dirs(self):
+        return (self.pending_dir, self.claimed_dir, self.done_dir, self.failed_dir)
+    
+    def _write(self, shard, directory):
+        tmp_path = os.path.join(self.directory, f".{shard['id']}.json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(shard, f)
+        os.replace(tmp_path, os.path.join(directory, f"{shard['id']}.json"))
+    
+    def put(self, shard):
+        """Add a shard (a dict with an 'id') to the pending set"""
+        self._write(shard, self.pending_dir)
+    
+    def claim(self):
+        """Take the next pending shard, or None when there is none left"""
+        for name in sorted(os.listdir(self.pending_dir)):
+            claimed_path = os.path.join(self.claimed_dir, name)
+            try:
+                # Only one process wins the rename; the rest move on
+                os.rename(os.path.join(self.pending_dir, name), claimed_path)
+            except FileNotFoundError:
+                continue
+            os.utime(claimed_path)
+            with open(claimed_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+    
+    def records_path(self, shard_id):
+        """Where a finished shard's records are stored"""
+        return os.path.join(self.done_dir, f'{shard_id}.ndjson')
+    
+    def complete(self, shard, count):
+        """Mark a claimed shard done once its records file is in place"""
+        result = dict(shard, records=count, finished=time.time())
+        tmp_path = os.path.join(self.directory, f".{shard['id']}.result.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, os.path.join(self.done_dir, f"{shard['id']}.json"))
+        try:
+            os.remove(os.path.join(self.claimed_dir, f"{shard['id']}.json"))
+        except FileNotFoundError:
+            pass
+    
+    def fail(self, shard, error):
+        """Return a claimed shard that hit an error to pending, or park it in failed/"""
+        shard = dict(shard, attempts=shard.get('attempts', 0) + 1, error=str(error))
+        if shard['attempts'] >= self.MAX_ATTEMPTS:
+            self._write(shard, self.failed_dir)
+            try:
+                os.remove(os.path.join(self.claimed_dir, f"{shard['id']}.json"))
+            except FileNotFoundError:
+                pass
+            return
+        # Rewritten in place, then renamed, so the shard is never missing from the queue
+        self._write(shard, self.claimed_dir)
+        os.rename(os.path.join(self.claimed_dir, f"{shard['id']}.json"),
+                  os.path.join(self.pending_dir, f"{shard['id']}.json"))
+    
+    def requeue_stale(self, max_age=600):
+        """Return shards claimed longer than max_age seconds ago (dead workers) to pending"""
+        requeued = 0
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.claimed_dir):
+            path = os.path.join(self.claimed_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.rename(path, os.path.join(self.pending_dir, name))
+                    requeued += 1
+            except FileNotFoundError:
+                continue
+        return requeued
+    
+    def is_empty(self):
+        """True if no shard or shard output from any run is in the queue"""
+        return not any(os.listdir(path) for path in self._dirs())
+    
+    def clear(self):
+        """Delete every shard and shard output, e.g. left over from an earlier run"""
+        for path in self._dirs():
+            for name in os.listdir(path):
+                try:
+                    os.remove(os.path.join(path, name))
+                except FileNotFoundError:
+                    pass
+    
+    def counts(self):
+        """Number of pending, claimed, done and failed shards"""
+        return {
+            'pending': len(os.listdir(self.pending_dir)),
+            'claimed': len(os.listdir(self.claimed_dir)),
+            'done': sum(1 for name in os.listdir(self.done_dir) if name.endswith('.json')),
+            'failed': len(os.listdir(self.failed_dir))
+        }
+    
+    def results(self):
+        """Finished shard results in shard order"""
+        results = []
+        for name in sorted(os.listdir(self.done_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.done_dir, name), 'r', encoding='utf-8') as f:
+                    results.append(json.load(f))
+        return results
+
+
+def run_shard_worker(queue_dir, options=None, callback=None):
+    """Crawl shards from a ShardQueue until it is empty; returns records written
+    
+    Module-level so ProcessPoolExecutor can pickle it. options are
+    EcommerceScraper keyword arguments.
+    """
+    shard_queue = ShardQueue(queue_dir)
+    scraper = EcommerceScraper(**(options or {}))
+    total = 0
+    try:
+        while True:
+            shard = shard_queue.claim()
+            if shard is None:
+                return total
+            if callback:
+                callback(f"🧩 Shard {shard['id']}: {len(shard['urls'])} URLs")
+            
+            # Records land under a temporary name so a crashed shard is never merged
+            path = shard_queue.records_path(shard['id'])
+            try:
+                with NDJSONSink(path + '.tmp') as sink:
+                    sink.write_all(scraper.iter_shard(shard, callback))
+            except Exception as e:
+                if callback:
+                    callback(f"❌ Shard {shard['id']} failed: {str(e)}")
+                try:
+                    os.remove(path + '.tmp')
+                except FileNotFoundError:
+                    pass
+                shard_queue.fail(shard, e)
+                continue
+            os.replace(path + '.tmp', path)
+            shard_queue.complete(shard, sink.count)
+            total += sink.count
+    finally:
+        scraper.close()
+
+
+class ShardedCrawl:
+    """Split a crawl into shards, run them in worker processes and merge the output
+    
+    books.toscrape.com is split by listing-page range; custom sites are split
+    by hashing seed URLs (e.g. category pages) into buckets. Local workers run
+    in a ProcessPoolExecutor, and more workers on other machines can join by
+    running run_shard_worker against the same queue directory.
+    """
+    
+    def __init__(self, queue_dir, processes=None, scraper_options=None):
+        self.queue = ShardQueue(queue_dir)
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.scraper_options = dict(scraper_options or {})
+    
+    @staticmethod
+    def books_page_url(base_url, page):
+        """URL of a books.toscrape.com listing page"""
+        if page == 1:
+            return base_url
+        return urljoin(base_url, f'catalogue/page-{page}.html')
+    
+    def plan_books(self, base_url, max_pages, shard_count=None):
+        """Shards of contiguous listing-page ranges"""
+        shard_count = max(1, min(shard_count or self.processes * 4, max_pages))
+        pages = list(range(1, max_pages + 1))
+        size = -(-len(pages) // shard_count)
+        return [
+            {
+                'id': f'{number:05d}',
+                'kind': 'books',
+                'urls': [self.books_page_url(base_url, page) for page in pages[start:start + size]]
+            }
+            for number, start in enumerate(range(0, len(pages), size))
+        ]
+    
+    def plan_seeds(self, seed_urls, max_pages=1, shard_count=None):
+        """Shards of seed URLs bucketed by URL hash, each seed crawled for max_pages"""
+        shard_count = max(1, min(shard_count or self.processes * 4, len(seed_urls)))
+        buckets = [[] for _ in range(shard_count)]
+        for url in seed_urls:
+            digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+            buckets[int(digest[:8], 16) % shard_count].append(url)
+        return [
+            {'id': f'{number:05d}', 'kind': 'custom', 'urls': urls, 'max_pages': max_pages}
+            for number, urls in enumerate(buckets) if urls
+        ]
+    
+    def enqueue(self, shards):
+        """Publish shards to an empty queue
+        
+        merge() reads every finished shard in the queue, so shards left from
+        an earlier run would end up in this run's output.
+        """
+        if not self.queue.is_empty():
+            raise ValueError(f"Shard queue {self.queue.directory} is not empty; clear it or use another directory")
+        for shard in shards:
+            self.queue.put(shard)
+    
+    def run(self, callback=None, poll_interval=1.0, stale_after=600, timeout=None):
+        """Drain the queue with local worker processes, then wait for remote ones
+        
+        Pending shards (e.g. requeued from dead workers) are crawled locally.
+        Returns the final counts; after timeout seconds of waiting, shards
+        still claimed by other workers are left out of the merge.
+        """
+        # The per-host rate limit is shared out so N workers stay as polite as one
+        options = dict(self.scraper_options)
+        options['requests_per_second'] = options.get('requests_per_second', 4.0) / self.processes
+        
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            futures = [
+                pool.submit(run_shard_worker, self.queue.directory, options)
+                for _ in range(self.processes)
+            ]
+            written = sum(future.result() for future in futures)
+        if callback:
+            callback(f"🧩 Local workers wrote {written} records")
+        
+        deadline = time.monotonic() + timeout if timeout else None
+        counts = self.queue.counts()
+        while counts['pending'] or counts['claimed']:
+            if counts['pending'] or self.queue.requeue_stale(stale_after):
+                written += run_shard_worker(self.queue.directory, options, callback)
+            elif deadline and time.monotonic() > deadline:
+                if callback:
+                    callback(f"⚠️ Gave up waiting for {counts['claimed']} shards claimed by other workers")
+                break
+            else:
+                time.sleep(poll_interval)
+            counts = self.queue.counts()
+        if counts['failed'] and callback:
+            callback(f"⚠️ {counts['failed']} shards failed {ShardQueue.MAX_ATTEMPTS} times and are left out of the merge")
+        return counts
+    
+    def merge(self, sink, max_products=None, dedupe=None):
+        """Write every shard's records to sink in shard order, dropping duplicates
+        
+        dedupe, a ProductDeduplicator, also drops near-duplicates across
+        shards. Returns (records written, duplicates dropped).
+        """
+        seen = set()
+        duplicates = 0
+        for result in self.queue.results():
+            with open(self.queue.records_path(result['id']), 'r', encoding='utf-8') as f:
+                for line in f:
+                    record = add_typed_fields(json.loads(line))
+                    key = ProductIndex.product_key(record)
+                    if key in seen or (dedupe is not None and dedupe.check(record) is not None):
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                    sink.write(record)
+                    if max_products and len(seen) >= max_products:
+                        return len(seen), duplicates
+        return len(seen), duplicates
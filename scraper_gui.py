@@ -0,0 +1,734 @@
+"""Tkinter front end for the scraping engine in scraper_core"""
+import tkinter as tk
+from tkinter import ttk, scrolledtext, messagebox, filedialog
+import threading
+import queue
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime
+
+from scraper_core import (EcommerceScraper, ResponseCache, CrawlCheckpoint, ImageStage, Product,
+                          ProductDeduplicator, ProductStats, ProductStore, open_sink)
+
+# Longest side of image thumbnails, in pixels
+THUMBNAIL_SIZE = 200
+
+# Lines kept in the log view; older ones are dropped
+LOG_LIMIT = 2000
+# Seconds of main-thread work per after() tick when moving records into the view
+DRAIN_BUDGET = 0.02
+# Seconds between statistics refreshes while scraping
+STATS_INTERVAL = 1.0
+CURRENCY_SYMBOLS = {'GBP': '£', 'USD': '$', 'EUR': '€', 'JPY': '¥', 'INR': '₹'}
+
+
+class VirtualTable:
+    """Treeview that only materializes the rows in view
+    
+    Records stay in a plain list; the Treeview holds one item per visible line
+    and its own scrollbar spans the whole list, so scrolling rewrites the
+    visible items' values instead of keeping an item for every record.
+    """
+    
+    def __init__(self, parent, columns, row_values):
+        self.rows = []
+        self.row_values = row_values
+        self.offset = 0
+        self.visible = 20
+        
+        self.tree = ttk.Treeview(parent, columns=columns, show='headings', height=20)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=100)
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self._on_scrollbar)
+        
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-1 if e.delta > 0 else 1, 'units', 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-1, 'units', 3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(1, 'units', 3))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-1, 'pages'))
+        self.tree.bind('<Next>', lambda e: self.scroll(1, 'pages'))
+    
+    def pack(self):
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    
+    def set_rows(self, rows):
+        """Show rows (kept by reference, so appends appear on the next refresh)"""
+        self.rows = rows
+        self.offset = 0
+        self.refresh()
+    
+    def scroll(self, amount, what='units', step=1):
+        if what == 'pages':
+            step = self.visible
+        self.offset += amount * step
+        self.refresh()
+        return 'break'
+    
+    def _on_scrollbar(self, action, amount, what=None):
+        if action == 'moveto':
+            self.offset = int(float(amount) * len(self.rows))
+            self.refresh()
+        else:
+            self.scroll(int(amount), what)
+    
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        # The heading takes about one row
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.refresh()
+    
+    def refresh(self):
+        """Rewrite the visible items from the rows under the current offset"""
+        total = len(self.rows)
+        self.offset = max(0, min(self.offset, total - self.visible))
+        shown = min(self.visible, total - self.offset)
+        
+        items = self.tree.get_children()
+        if len(items) > shown:
+            self.tree.delete(*items[shown:])
+        for line in range(shown):
+            values = self.row_values(self.offset + line, self.rows[self.offset + line])
+            if line < len(items):
+                self.tree.item(items[line], values=values)
+            else:
+                self.tree.insert('', tk.END, values=values)
+        
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + shown) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+
+class ScraperGUI:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("📚 Book Scraper Pro")
+        self.root.geometry("1000x700")
+        
+        # Colors
+        self.colors = {
+            'primary': '#2c3e50',
+            'secondary': '#3498db',
+            'success': '#27ae60',
+            'danger': '#e74c3c',
+            'warning': '#f39c12',
+            'light': '#ecf0f1',
+            'dark': '#2c3e50'
+        }
+        
+        self.setup_ui()
+        self.scraper = EcommerceScraper()
+        self.images = None
+        self.results = []
+        self.stats = ProductStats()
+        self._stats_shown = 0.0
+        self.log_queue = queue.Queue()
+        self.record_queue = queue.Queue()
+        self.check_log_queue()
+        self.check_record_queue()
+        
+    def setup_ui(self):
+        """Setup the GUI interface"""
+        # Main container
+        main_container = tk.Frame(self.root, bg=self.colors['light'])
+        main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Title
+        title_frame = tk.Frame(main_container, bg=self.colors['primary'])
+        title_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        title_label = tk.Label(title_frame, text="📚 E-COMMERCE WEB SCRAPER", 
+                              font=('Arial', 18, 'bold'), 
+                              fg='white', bg=self.colors['primary'])
+        title_label.pack(pady=15)
+        
+        # Content frame
+        content_frame = tk.Frame(main_container, bg=self.colors['light'])
+        content_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Left panel - Controls
+        left_panel = tk.Frame(content_frame, bg=self.colors['light'], width=300)
+        left_panel.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
+        
+        # Site selection
+        site_frame = tk.LabelFrame(left_panel, text="Website Selection", 
+                                  font=('Arial', 10, 'bold'),
+                                  bg=self.colors['light'], padx=10, pady=10)
+        site_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        self.site_var = tk.StringVar(value="books.toscrape.com")
+        
+        tk.Radiobutton(site_frame, text="📚 Books.toscrape.com", 
+                      variable=self.site_var, value="books.toscrape.com",
+                      bg=self.colors['light'], font=('Arial', 9)).pack(anchor=tk.W, pady=2)
+        
+        tk.Radiobutton(site_frame, text="🌐 Custom Website", 
+                      variable=self.site_var, value="custom",
+                      bg=self.colors['light'], font=('Arial', 9)).pack(anchor=tk.W, pady=2)
+        
+        self.custom_url_entry = tk.Entry(site_frame, font=('Arial', 9))
+        self.custom_url_entry.pack(fill=tk.X, pady=5)
+        self.custom_url_entry.insert(0, "https://")
+        
+        # Settings frame
+        settings_frame = tk.LabelFrame(left_panel, text="Scraping Settings", 
+                                      font=('Arial', 10, 'bold'),
+                                      bg=self.colors['light'], padx=10, pady=10)
+        settings_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        # Max pages
+        tk.Label(settings_frame, text="Max Pages:", 
+                bg=self.colors['light'], font=('Arial', 9)).grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.max_pages = tk.Spinbox(settings_frame, from_=1, to=50, width=10, font=('Arial', 9))
+        self.max_pages.delete(0, tk.END)
+        self.max_pages.insert(0, "3")
+        self.max_pages.grid(row=0, column=1, padx=(10, 0), pady=5)
+        
+        # Max products
+        tk.Label(settings_frame, text="Max Products:", 
+                bg=self.colors['light'], font=('Arial', 9)).grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.max_products = tk.Spinbox(settings_frame, from_=1, to=1000, width=10, font=('Arial', 9))
+        self.max_products.delete(0, tk.END)
+        self.max_products.insert(0, "50")
+        self.max_products.grid(row=1, column=1, padx=(10, 0), pady=5)
+        
+        # Concurrent detail-page fetches
+        tk.Label(settings_frame, text="Concurrency:", 
+                bg=self.colors['light'], font=('Arial', 9)).grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.concurrency = tk.Spinbox(settings_frame, from_=1, to=64, width=10, font=('Arial', 9))
+        self.concurrency.delete(0, tk.END)
+        self.concurrency.insert(0, "8")
+        self.concurrency.grid(row=2, column=1, padx=(10, 0), pady=5)
+        
+        # Per-host request rate
+        tk.Label(settings_frame, text="Requests/sec:", 
+                bg=self.colors['light'], font=('Arial', 9)).grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.requests_per_second = tk.Spinbox(settings_frame, from_=1, to=50, width=10, font=('Arial', 9))
+        self.requests_per_second.delete(0, tk.END)
+        self.requests_per_second.insert(0, "4")
+        self.requests_per_second.grid(row=3, column=1, padx=(10, 0), pady=5)
+        
+        # Persistent HTTP cache
+        self.use_cache_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(settings_frame, text="Use response cache", variable=self.use_cache_var,
+                      bg=self.colors['light'], font=('Arial', 9)).grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Only report products that changed since the previous run
+        self.incremental_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="Incremental (changes only)", variable=self.incremental_var,
+                      bg=self.colors['light'], font=('Arial', 9)).grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Write records to disk while scraping
+        self.stream_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="Stream results to file", variable=self.stream_var,
+                      bg=self.colors['light'], font=('Arial', 9)).grid(row=6, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Resuming is opt-in; otherwise a re-scrape would skip pages an earlier stopped run fetched
+        self.resume_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="Resume interrupted crawl", variable=self.resume_var,
+                      bg=self.colors['light'], font=('Arial', 9)).grid(row=7, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Keep products and their price history across runs
+        self.store_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="Save to product store", variable=self.store_var,
+                      bg=self.colors['light'], font=('Arial', 9)).grid(row=8, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Skip products already scraped under another URL or card
+        self.dedupe_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(settings_frame, text="Drop duplicate products", variable=self.dedupe_var,
+                      bg=self.colors['light'], font=('Arial', 9)).grid(row=9, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Fetch product images (and thumbnails when Pillow is installed)
+        self.images_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_frame, text="Download images", variable=self.images_var,
+                      bg=self.colors['light'], font=('Arial', 9)).grid(row=10, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Buttons frame
+        button_frame = tk.Frame(left_panel, bg=self.colors['light'])
+        button_frame.pack(fill=tk.X, pady=10)
+        
+        self.start_btn = tk.Button(button_frame, text="▶ START SCRAPING", 
+                                  font=('Arial', 10, 'bold'),
+                                  bg=self.colors['secondary'], fg='white',
+                                  relief=tk.RAISED, padx=20, pady=10,
+                                  command=self.start_scraping)
+        self.start_btn.pack(fill=tk.X, pady=(0, 5))
+        
+        self.stop_btn = tk.Button(button_frame, text="⏹ STOP", 
+                                 font=('Arial', 10),
+                                 bg=self.colors['danger'], fg='white',
+                                 relief=tk.RAISED, padx=20, pady=10,
+                                 command=self.stop_scraping, state=tk.DISABLED)
+        self.stop_btn.pack(fill=tk.X, pady=(0, 5))
+        
+        self.export_btn = tk.Button(button_frame, text="💾 EXPORT DATA", 
+                                   font=('Arial', 10),
+                                   bg=self.colors['success'], fg='white',
+                                   relief=tk.RAISED, padx=20, pady=10,
+                                   command=self.export_data, state=tk.DISABLED)
+        self.export_btn.pack(fill=tk.X, pady=(0, 5))
+        
+        # Progress
+        self.progress = ttk.Progressbar(left_panel, mode='indeterminate', length=280)
+        self.progress.pack(pady=(20, 10))
+        
+        # Status
+        self.status_var = tk.StringVar(value="Ready to scrape")
+        status_label = tk.Label(left_panel, textvariable=self.status_var,
+                               font=('Arial', 9, 'italic'),
+                               fg=self.colors['dark'], bg=self.colors['light'])
+        status_label.pack()
+        
+        # Right panel - Output
+        right_panel = tk.Frame(content_frame, bg=self.colors['light'])
+        right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        
+        # Notebook for tabs
+        self.notebook = ttk.Notebook(right_panel)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        
+        # Log tab
+        log_frame = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(log_frame, text="📝 Log")
+        
+        self.log_text = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, 
+                                                 font=('Consolas', 9),
+                                                 bg='#f8f9fa', fg=self.colors['dark'])
+        self.log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Data tab
+        data_frame = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(data_frame, text="📊 Data")
+        
+        # Only the rows in view exist as Treeview items, however many records there are
+        columns = ('#', 'Title', 'Price', 'Rating', 'Category')
+        self.table = VirtualTable(data_frame, columns, self._row_values)
+        self.table.pack()
+        
+        # Preview tab
+        preview_frame = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(preview_frame, text="👁 Preview")
+        
+        self.preview_text = scrolledtext.ScrolledText(preview_frame, wrap=tk.WORD,
+                                                     font=('Consolas', 9),
+                                                     bg='#f8f9fa', fg=self.colors['dark'])
+        self.preview_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Stats tab
+        stats_frame = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(stats_frame, text="📈 Statistics")
+        
+        self.stats_text = scrolledtext.ScrolledText(stats_frame, wrap=tk.WORD,
+                                                   font=('Consolas', 9),
+                                                   bg='#f8f9fa', fg=self.colors['dark'])
+        self.stats_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Performance tab: per-stage latency report for the last run
+        perf_frame = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(perf_frame, text="⏱ Performance")
+        
+        tk.Button(perf_frame, text="💾 Export report (JSON)", font=('Arial', 9),
+                 command=self.export_report).pack(anchor=tk.E, padx=5, pady=(5, 0))
+        
+        self.perf_text = scrolledtext.ScrolledText(perf_frame, wrap=tk.NONE,
+                                                  font=('Consolas', 9),
+                                                  bg='#f8f9fa', fg=self.colors['dark'])
+        self.perf_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+    def log_message(self, message):
+        """Add message to log"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        formatted_message = f"[{timestamp}] {message}\n"
+        self.log_queue.put(formatted_message)
+    
+    def check_log_queue(self):
+        """Append queued log messages in one insert and keep the last LOG_LIMIT lines"""
+        # Only the newest LOG_LIMIT messages of a burst can survive the trim anyway
+        batch = deque(maxlen=LOG_LIMIT)
+        try:
+            while True:
+                batch.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if batch:
+            self.log_text.insert(tk.END, ''.join(batch))
+            excess = int(self.log_text.index('end-1c').split('.')[0]) - 1 - LOG_LIMIT
+            if excess > 0:
+                self.log_text.delete('1.0', f'{excess + 1}.0')
+            self.log_text.see(tk.END)
+        self.root.after(100, self.check_log_queue)
+    
+    def start_scraping(self):
+        """Start scraping in separate thread"""
+        if self.scraper.running:
+            return
+        
+        # Get settings
+        try:
+            max_pages = int(self.max_pages.get())
+            max_products = int(self.max_products.get())
+            concurrency = int(self.concurrency.get())
+            requests_per_second = float(self.requests_per_second.get())
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid numbers for settings")
+            return
+        
+        # Get URL
+        site_choice = self.site_var.get()
+        if site_choice == "custom":
+            url = self.custom_url_entry.get().strip()
+            if not url or url == "https://":
+                messagebox.showwarning("Warning", "Please enter a valid URL")
+                return
+        else:
+            url = site_choice
+        
+        # Open the live output file before the scrape starts
+        sink = None
+        if self.stream_var.get():
+            filename = self._ask_export_filename()
+            if not filename:
+                return
+            try:
+                sink = open_sink(filename)
+            except Exception as e:
+                messagebox.showerror("Error", f"Cannot open output file:\n{str(e)}")
+                return
+        
+        self.scraper.set_concurrency(concurrency)
+        self.scraper.set_rate_limit(requests_per_second)
+        if self.use_cache_var.get():
+            if not self.scraper.cache:
+                try:
+                    self.scraper.cache = ResponseCache()
+                except sqlite3.Error as e:
+                    self.log_message(f"⚠️ Response cache unavailable: {str(e)}")
+        else:
+            self.scraper.cache = None
+        if self.store_var.get():
+            if not self.scraper.store:
+                try:
+                    self.scraper.store = ProductStore()
+                except sqlite3.Error as e:
+                    self.log_message(f"⚠️ Product store unavailable: {str(e)}")
+        elif self.scraper.store:
+            self.scraper.store.close()
+            self.scraper.store = None
+        self.scraper.dedupe = ProductDeduplicator() if self.dedupe_var.get() else None
+        if self.images_var.get():
+            if not self.images:
+                try:
+                    self.images = ImageStage(thumbnail_size=THUMBNAIL_SIZE)
+                except RuntimeError as e:
+                    self.log_message(f"⚠️ {str(e)}; saving images without thumbnails")
+                    self.images = ImageStage()
+        elif self.images:
+            self.images.close()
+            self.images = None
+        
+        # Update UI
+        self.start_btn.config(state=tk.DISABLED)
+        self.stop_btn.config(state=tk.NORMAL)
+        self.export_btn.config(state=tk.DISABLED)
+        self.progress.start(10)
+        self.status_var.set("Scraping...")
+        
+        # Clear previous data
+        self.results = []
+        self.stats = ProductStats()
+        self.table.set_rows(self.results)
+        self.preview_text.delete(1.0, tk.END)
+        self.stats_text.delete(1.0, tk.END)
+        self.perf_text.delete(1.0, tk.END)
+        self.log_text.delete(1.0, tk.END)
+        
+        # Start scraping thread
+        thread = threading.Thread(
+            target=self._scrape_thread,
+            args=(url, max_pages, max_products, site_choice, sink),
+            daemon=True
+        )
+        thread.start()
+    
+    def _scrape_thread(self, url, max_pages, max_products, site_choice, sink=None):
+        """Thread function for scraping"""
+        self.log_message(f"🚀 Starting scrape: {url}")
+        self.log_message(f"⚙️ Settings: {max_pages} pages, {max_products} max products")
+        
+        # Progress is checkpointed per page so a stopped crawl can pick up later
+        start_url = url if site_choice == "custom" else "https://books.toscrape.com/"
+        
+        # Records stream to the UI as they are extracted instead of at the end
+        records = self.scraper.iter_products(
+            url if site_choice == "custom" else "books.toscrape.com",
+            max_pages=max_pages,
+            max_products=max_products,
+            callback=self.log_message,
+            incremental=self.incremental_var.get(),
+            checkpoint=CrawlCheckpoint.for_url(start_url),
+            resume=self.resume_var.get()
+        )
+        if self.images:
+            records = self.images.process(records, self.log_message,
+                                         cancelled=lambda: not self.scraper.running)
+        try:
+            for record in records:
+                # Results are kept as compact Products; the sink gets the dict
+                self.record_queue.put(Product.from_dict(record))
+                if sink:
+                    with self.scraper.profiler.span('export'):
+                        sink.write(record)
+        except Exception as e:
+            self.log_message(f"❌ Writing output failed: {str(e)}")
+        finally:
+            if sink:
+                sink.close()
+                self.log_message(f"💾 Streamed {sink.count} records to: {sink.filename}")
+        
+        # Update UI in main thread
+        self.root.after(0, self._scraping_complete)
+    
+    def check_record_queue(self):
+        """Show newly scraped records while the scrape is running"""
+        # Come back sooner while a backlog remains so the view catches up
+        pending = self._drain_record_queue(DRAIN_BUDGET)
+        self.root.after(10 if pending else 200, self.check_record_queue)
+    
+    def _drain_record_queue(self, budget=None):
+        """Move queued records into the results for up to budget seconds; returns True if some remain"""
+        deadline = time.monotonic() + budget if budget else None
+        added = 0
+        pending = False
+        try:
+            while True:
+                if deadline and added % 100 == 0 and time.monotonic() > deadline:
+                    pending = True
+                    break
+                record = self.record_queue.get_nowait()
+                self.results.append(record)
+                self.stats.add(record)
+                added += 1
+        except queue.Empty:
+            pass
+        
+        if added:
+            self.table.refresh()
+            if self.scraper.running:
+                self.status_var.set(f"Scraping... {len(self.results)} items")
+                if time.monotonic() - self._stats_shown > STATS_INTERVAL:
+                    self._generate_statistics()
+        return pending
+    
+    @staticmethod
+    def _row_values(index, item):
+        """Data table row for a record"""
+        return (
+            str(index + 1),
+            item.get('title', 'N/A')[:40],
+            item.get('price', 'N/A'),
+            item.get('rating', 'N/A'),
+            item.get('category', 'N/A')
+        )
+    
+    def _scraping_complete(self):
+        """Handle scraping completion"""
+        self._drain_record_queue()
+        data = self.results
+        self.progress.stop()
+        self.start_btn.config(state=tk.NORMAL)
+        self.stop_btn.config(state=tk.DISABLED)
+        self._show_performance_report()
+        
+        if data:
+            self.export_btn.config(state=tk.NORMAL)
+            self.status_var.set(f"✅ Scraped {len(data)} items")
+            
+            # Update preview with JSON
+            preview_data = json.dumps([item.to_dict() for item in data[:3]], indent=2, ensure_ascii=False,
+                                      default=str)
+            self.preview_text.insert(1.0, preview_data)
+            
+            # Generate statistics
+            self._generate_statistics()
+            
+            self.log_message(f"✅ Scraping complete! {len(data)} items scraped.")
+        else:
+            self.status_var.set("❌ No data scraped")
+            self.log_message("❌ No data was scraped.")
+    
+    def _generate_statistics(self):
+        """Show the running statistics of the scraped data"""
+        self._stats_shown = time.monotonic()
+        snapshot = self.stats.snapshot()
+        if not snapshot['count']:
+            return
+        
+        lines = ["📊 SCRAPING STATISTICS", "=" * 50, "", f"Total Items: {snapshot['count']}"]
+        symbol = CURRENCY_SYMBOLS.get(snapshot['currency'], '')
+        
+        # Price analysis
+        price = snapshot['price']
+        if price:
+            lines += [
+                "", "💰 PRICE ANALYSIS:",
+                f"  Average Price: {symbol}{price['mean']:.2f}",
+                f"  Highest Price: {symbol}{price['max']:.2f}",
+                f"  Lowest Price: {symbol}{price['min']:.2f}",
+                f"  Total Value: {symbol}{price['total']:.2f}",
+                f"  Median: {symbol}{price['p50']:.2f}  (p25 {price['p25']:.2f}, p75 {price['p75']:.2f}, "
+                f"p90 {price['p90']:.2f}, p99 {price['p99']:.2f})",
+            ]
+            if snapshot['other_currency']:
+                others = ', '.join(f"{code} {count}" for code, count in snapshot['currencies'].items()
+                                   if code != snapshot['currency'])
+                lines.append(f"  Not counted: {snapshot['other_currency']} items priced in other currencies ({others})")
+            lines += ["", "  Price histogram:"]
+            peak = max(count for _, _, count in snapshot['histogram'])
+            for low, high, count in snapshot['histogram']:
+                bar = '█' * round(30 * count / peak) if peak else ''
+                lines.append(f"  {low:>8.2f} - {high:<8.2f} {bar} {count}")
+        
+        # Rating analysis
+        lines += ["", "⭐ RATING DISTRIBUTION:"]
+        for stars, count in snapshot['ratings'].items():
+            if count:
+                lines.append(f"  {'★' * stars:<5} {count} items")
+        if snapshot['unrated']:
+            lines.append(f"  Unrated: {snapshot['unrated']} items")
+        
+        # Category analysis
+        lines += ["", "📚 CATEGORIES:"]
+        for category, figures in snapshot['categories'].items():
+            average = f", avg {symbol}{figures['mean_price']:.2f}" if figures['mean_price'] is not None else ''
+            lines.append(f"  {category}: {figures['count']} items{average}")
+        
+        stock = snapshot['stock']
+        if stock['known']:
+            lines += ["", "📦 STOCK:",
+                      f"  Units Available: {stock['units']} across {stock['known']} items",
+                      f"  Out of Stock: {stock['out_of_stock']} items"]
+        
+        # Cache effectiveness for this run
+        cache = self.scraper.cache
+        if cache:
+            total = cache.stats['hits'] + cache.stats['revalidated'] + cache.stats['misses']
+            lines += ["", "💾 RESPONSE CACHE:",
+                      f"  Fresh Hits: {cache.stats['hits']}",
+                      f"  Revalidated (304): {cache.stats['revalidated']}",
+                      f"  Misses: {cache.stats['misses']}"]
+            if total:
+                lines.append(f"  Hit Rate: {(total - cache.stats['misses']) / total:.0%}")
+            lines.append(f"  Bytes Saved: {cache.stats['bytes_saved'] / 1024:.1f} KB")
+        
+        self.stats_text.delete(1.0, tk.END)
+        self.stats_text.insert(1.0, '\n'.join(lines) + '\n')
+    
+    def _show_performance_report(self):
+        """Show the last run's per-stage timings in the performance tab"""
+        self.perf_text.delete(1.0, tk.END)
+        self.perf_text.insert(1.0, "⏱ PERFORMANCE REPORT\n" + "=" * 50 + "\n\n" +
+                              self.scraper.profiler.format_report())
+    
+    def stop_scraping(self):
+        """Stop the scraping process"""
+        self.scraper.running = False
+        self.log_message("⏹ Scraping stopped by user")
+        self.status_var.set("Stopped")
+    
+    def _ask_export_filename(self):
+        """Ask where to save results; the extension picks the format"""
+        file_types = [
+            ("CSV files", "*.csv"),
+            ("JSON files", "*.json"),
+            ("NDJSON files", "*.ndjson"),
+            ("Parquet files", "*.parquet"),
+            ("Text files", "*.txt"),
+            ("All files", "*.*")
+        ]
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        default_name = f"scraped_data_{timestamp}"
+        
+        return filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=file_types,
+            initialfile=default_name
+        )
+    
+    def export_data(self):
+        """Export scraped data to file"""
+        if not self.results:
+            messagebox.showwarning("Warning", "No data to export")
+            return
+        
+        filename = self._ask_export_filename()
+        if not filename:
+            return
+        
+        try:
+            with self.scraper.profiler.span('export'), open_sink(filename) as sink:
+                sink.write_all(self.results)
+            self._show_performance_report()
+            
+            self.log_message(f"✅ Data exported to: {filename}")
+            messagebox.showinfo("Success", f"Data exported successfully!\n{filename}")
+            
+            # Ask to open folder
+            response = messagebox.askyesno("Open Folder", "Open containing folder?")
+            if response:
+                folder_path = os.path.dirname(os.path.abspath(filename))
+                import webbrowser
+                webbrowser.open(folder_path)
+            
+        except Exception as e:
+            self.log_message(f"❌ Export failed: {str(e)}")
+            messagebox.showerror("Error", f"Export failed:\n{str(e)}")
+    
+    def export_report(self):
+        """Save the last run's performance report, with per-URL timings, as JSON"""
+        if not self.scraper.profiler.pages:
+            messagebox.showwarning("Warning", "No run to report on yet")
+            return
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            initialfile=f"performance_{timestamp}"
+        )
+        if not filename:
+            return
+        
+        try:
+            self.scraper.profiler.save_json(filename)
+            self.log_message(f"⏱ Performance report saved to: {filename}")
+        except Exception as e:
+            self.log_message(f"❌ Report export failed: {str(e)}")
+            messagebox.showerror("Error", f"Report export failed:\n{str(e)}")
+
+def main():
+    """Main function"""
+    root = tk.Tk()
+    app = ScraperGUI(root)
+    
+    # Center window
+    root.update_idletasks()
+    width = root.winfo_width()
+    height = root.winfo_height()
+    x = (root.winfo_screenwidth() // 2) - (width // 2)
+    y = (root.winfo_screenheight() // 2) - (height // 2)
+    root.geometry(f'{width}x{height}+{x}+{y}')
+    
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
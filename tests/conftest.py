@@ -0,0 +1,57 @@
+"""Shared fixtures: a local fixture server and scrapers that keep their state in tmp_path"""
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+
+import scraper_core  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+# Fast enough for a local server; the limiter itself is exercised, just not waited on
+FAST = dict(requests_per_second=500, burst=100)
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Keep checkpoints, indexes and templates out of ~/.web-scraper"""
+    path = tmp_path / 'data'
+    monkeypatch.setattr(scraper_core, 'DATA_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def server():
+    with FixtureServer(total_pages=3) as fixture:
+        yield fixture
+
+
+@pytest.fixture
+def make_scraper(data_dir):
+    """Build scrapers with a fast rate limit; closed after the test"""
+    scrapers = []
+
+    def make(scraper_class=scraper_core.EcommerceScraper, **kwargs):
+        options = dict(FAST)
+        options.setdefault('templates', scraper_core.TemplateStore(str(data_dir / 'templates.json')))
+        options.update(kwargs)
+        scraper = scraper_class(**options)
+        scrapers.append(scraper)
+        return scraper
+
+    yield make
+    for scraper in scrapers:
+        scraper.close()
+
+
+class ListSink(list):
+    """In-memory sink for CrawlPipeline.run and ShardedCrawl.merge"""
+    write = list.append
+
+
+def strip_volatile(record):
+    """A record without the fields that differ between otherwise identical runs"""
+    return {key: value for key, value in record.items() if key not in ('scraped_date', 'scraped_at')}
@@ -0,0 +1,65 @@
+"""Response cache hits, ETag revalidation and bodies that must never be cached"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scraper_core import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+    yield cache
+    cache.close()
+
+
+def test_fresh_hit_then_revalidation(server, make_scraper, cache):
+    url = server.base_url
+    scraper = make_scraper(cache=cache)
+    scraper.running = True
+    body = scraper._fetch_page(url)
+
+    before = server.request_count
+    assert scraper._fetch_page(url) == body
+    assert server.request_count == before
+
+    # A stale entry is revalidated with its ETag and the fixture answers 304
+    cache.ttl = 0
+    assert scraper._fetch_page(url) == body
+    assert server.request_count == before + 1
+    assert cache.stats['revalidated'] == 1
+
+
+class NotModifiedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(304)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_not_modified_without_a_cached_copy_is_a_failure(make_scraper, cache):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), NotModifiedHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = 'http://%s:%d/' % httpd.server_address[:2]
+    try:
+        scraper = make_scraper(cache=cache)
+        scraper.running = True
+
+        assert scraper._fetch_page(url) is None
+        assert scraper.last_fetch_status() is None
+        assert cache.lookup(url) is None
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_empty_bodies_are_not_cached(cache):
+    cache.store('https://shop.example/', '')
+
+    assert cache.lookup('https://shop.example/') is None
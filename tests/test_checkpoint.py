@@ -0,0 +1,40 @@
+"""A stopped crawl resumes from its checkpoint without refetching completed pages"""
+from conftest import strip_volatile
+from scraper_core import CrawlCheckpoint
+
+
+def crawl(scraper, server, checkpoint, stop_after=None):
+    records = []
+    for record in scraper.iter_books_toscrape(max_pages=3, base_url=server.base_url,
+                                              checkpoint=checkpoint, resume=True):
+        records.append(strip_volatile(record))
+        if stop_after and len(records) == stop_after:
+            scraper.running = False
+    return records
+
+
+def test_resume_continues_after_the_last_completed_page(server, make_scraper, tmp_path):
+    expected = crawl(make_scraper(), server, CrawlCheckpoint(str(tmp_path / 'full.json')))
+
+    path = str(tmp_path / 'stopped.json')
+    stopped = crawl(make_scraper(), server, CrawlCheckpoint(path), stop_after=25)
+    assert 25 <= len(stopped) < len(expected)
+
+    before = server.request_count
+    resumed = crawl(make_scraper(), server, CrawlCheckpoint(path))
+
+    # Page 1 is replayed from the journal; the page cut short by the stop is fetched again
+    assert [record['url'] for record in resumed] == [record['url'] for record in expected]
+    assert server.request_count - before == 2 * 21
+    assert CrawlCheckpoint(path).load()['finished']
+
+
+def test_a_finished_crawl_starts_over(server, make_scraper, tmp_path):
+    path = str(tmp_path / 'crawl.json')
+    first = crawl(make_scraper(), server, CrawlCheckpoint(path))
+
+    before = server.request_count
+    second = crawl(make_scraper(), server, CrawlCheckpoint(path))
+
+    assert len(second) == len(first) == 60
+    assert server.request_count - before == 3 * 21
@@ -0,0 +1,76 @@
+"""MinHash LSH deduplication of scraped products"""
+import subprocess
+import sys
+
+from conftest import REPO_ROOT
+from scraper_core import ProductDeduplicator
+
+PRODUCT = {
+    'title': 'Sharp Objects: A Novel of Suspense',
+    'price': '£47.82',
+    'url': 'https://shop.example/p/sharp-objects',
+    'image_url': 'https://shop.example/img/sharp-objects.jpg',
+}
+
+
+def test_exact_duplicate_by_canonical_url():
+    dedupe = ProductDeduplicator()
+    assert dedupe.check(PRODUCT) is None
+
+    tracked = dict(PRODUCT, url=PRODUCT['url'] + '?utm_source=feed')
+
+    assert dedupe.check(tracked) == PRODUCT['url']
+    assert (dedupe.exact, dedupe.fuzzy) == (1, 0)
+
+
+def test_near_duplicate_title_on_another_url():
+    dedupe = ProductDeduplicator()
+    dedupe.check(PRODUCT)
+
+    near = dict(PRODUCT, url='https://shop.example/item/9', image_url='N/A',
+                title='SHARP OBJECTS: A NOVEL OF SUSPENSE...')
+
+    assert dedupe.check(near) == PRODUCT['url']
+    assert (dedupe.exact, dedupe.fuzzy) == (0, 1)
+
+
+def test_similar_titles_with_different_prices_or_images_are_kept():
+    dedupe = ProductDeduplicator()
+    dedupe.check(PRODUCT)
+
+    repriced = dict(PRODUCT, url='https://shop.example/sale/1', price='£0.01')
+    other_image = dict(PRODUCT, url='https://shop.example/sale/2', image_url='https://shop.example/img/other.jpg')
+    different = dict(PRODUCT, url='https://shop.example/p/2', title='The Requiem Red')
+
+    assert dedupe.check(repriced) is None
+    assert dedupe.check(other_image) is None
+    assert dedupe.check(different) is None
+
+
+def test_reset_forgets_everything():
+    dedupe = ProductDeduplicator()
+    dedupe.check(PRODUCT)
+    dedupe.reset()
+
+    assert dedupe.check(PRODUCT) is None
+
+
+def test_signatures_are_stable_across_processes():
+    # str hashes are salted per process; signatures must not depend on them
+    script = ("import sys; sys.path.insert(0, sys.argv[1]); from scraper_core import ProductDeduplicator; "
+              "print(list(ProductDeduplicator().signature(sys.argv[2])))")
+    outputs = {
+        subprocess.run([sys.executable, '-c', script, REPO_ROOT, PRODUCT['title']], capture_output=True,
+                       text=True, check=True, env={'PYTHONHASHSEED': seed}).stdout
+        for seed in ('1', '2')
+    }
+
+    assert len(outputs) == 1
+
+
+def test_records_past_max_products_are_not_marked_seen(server, make_scraper):
+    dedupe = ProductDeduplicator()
+    scraper = make_scraper(dedupe=dedupe)
+
+    assert len(list(scraper.iter_custom_site(server.shop_url, max_pages=1, max_products=5))) == 5
+    assert dedupe.summary() == '0 exact and 0 near-duplicate products dropped, 5 indexed'
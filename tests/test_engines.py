@@ -0,0 +1,57 @@
+"""The sync, async and pipeline engines produce the same records in the same order"""
+import asyncio
+
+import pytest
+
+from conftest import ListSink, strip_volatile
+from scraper_core import AsyncEcommerceScraper, CrawlPipeline
+
+
+def crawl_sync(scraper, url, **kwargs):
+    return [strip_volatile(record) for record in scraper.iter_products(url, **kwargs)]
+
+
+def crawl_async(scraper, url, **kwargs):
+    async def drain():
+        return [strip_volatile(record) async for record in scraper.aiter_products(url, **kwargs)]
+    return asyncio.run(drain())
+
+
+@pytest.mark.parametrize('site', ['books', 'custom'])
+def test_sync_and_async_records_match(server, make_scraper, site):
+    if site == 'books':
+        url, kwargs = 'books.toscrape.com', dict(base_url=server.base_url, max_pages=3)
+    else:
+        url, kwargs = server.shop_url, dict(max_pages=3)
+
+    sync_records = crawl_sync(make_scraper(), url, **kwargs)
+    async_records = crawl_async(make_scraper(AsyncEcommerceScraper), url, **kwargs)
+
+    assert len(sync_records) == 60
+    assert async_records == sync_records
+
+
+def test_pipeline_emits_the_same_products(server, make_scraper):
+    expected = crawl_sync(make_scraper(), 'books.toscrape.com', base_url=server.base_url, max_pages=3)
+
+    sink = ListSink()
+    CrawlPipeline(make_scraper()).run(sink, base_url=server.base_url, max_pages=3)
+
+    # Pages are parsed concurrently, so only the set of products is fixed
+    assert sorted(record['url'] for record in sink) == sorted(record['url'] for record in expected)
+
+
+def test_max_products_is_respected_by_every_engine(server, make_scraper):
+    kwargs = dict(base_url=server.base_url, max_pages=3, max_products=25)
+    sink = ListSink()
+    CrawlPipeline(make_scraper()).run(sink, **kwargs)
+
+    assert len(crawl_sync(make_scraper(), 'books.toscrape.com', **kwargs)) == 25
+    assert len(crawl_async(make_scraper(AsyncEcommerceScraper), 'books.toscrape.com', **kwargs)) == 25
+    assert len(sink) == 25
+
+
+def test_grid_rows_do_not_hide_cards(server, make_scraper):
+    records = crawl_sync(make_scraper(), server.grid_url, max_pages=1)
+
+    assert [record['title'] for record in records] == [f'Product {i}' for i in range(1, 21)]
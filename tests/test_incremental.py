@@ -0,0 +1,41 @@
+"""Incremental runs report only new, changed and removed products"""
+from collections import Counter
+
+
+def incremental_run(scraper, server):
+    messages = []
+    records = list(scraper.iter_books_toscrape(max_pages=5, base_url=server.base_url, incremental=True,
+                                               callback=messages.append))
+    summary = [message for message in messages if message.startswith('🔁 Incremental:')]
+    return Counter(record['change'] for record in records), summary[-1]
+
+
+def test_changed_and_removed_counts(server, make_scraper):
+    changes, summary = incremental_run(make_scraper(), server)
+    assert changes == {'new': 60}
+    assert summary == "🔁 Incremental: 60 new, 0 changed, 0 removed"
+
+    changes, summary = incremental_run(make_scraper(), server)
+    assert changes == {}
+    assert summary == "🔁 Incremental: 0 new, 0 changed, 0 removed"
+
+    # Every 25th book is repriced on each catalogue revision
+    server.revision = 1
+    changes, summary = incremental_run(make_scraper(), server)
+    assert changes == {'changed': 2}
+    assert summary == "🔁 Incremental: 0 new, 2 changed, 0 removed"
+
+    # The last page disappears; its books are reported once the shorter catalogue is fully walked
+    server.total_pages = 2
+    changes, summary = incremental_run(make_scraper(), server)
+    assert changes == {'removed': 20}
+    assert summary == "🔁 Incremental: 0 new, 0 changed, 20 removed"
+
+
+def test_a_partial_walk_removes_nothing(server, make_scraper):
+    incremental_run(make_scraper(), server)
+
+    scraper = make_scraper()
+    records = list(scraper.iter_books_toscrape(max_pages=1, base_url=server.base_url, incremental=True))
+
+    assert records == []
@@ -0,0 +1,57 @@
+"""Sharded crawls merge in shard order and never pass off partial shards as complete"""
+import json
+import os
+
+import pytest
+
+from conftest import FAST, ListSink
+from fixture_server import FixtureServer
+from scraper_core import ShardedCrawl, ShardQueue
+
+
+def sharded_crawl(tmp_path, base_url, max_pages, processes=2, shard_count=None):
+    crawl = ShardedCrawl(str(tmp_path / 'queue'), processes=processes, scraper_options=dict(FAST))
+    crawl.enqueue(crawl.plan_books(base_url, max_pages, shard_count))
+    counts = crawl.run()
+    sink = ListSink()
+    written, duplicates = crawl.merge(sink)
+    return crawl, counts, sink, duplicates
+
+
+def test_merge_keeps_catalogue_order(server, make_scraper, tmp_path):
+    expected = [record['url'] for record in
+                make_scraper().iter_books_toscrape(max_pages=5, base_url=server.base_url)]
+
+    # Pages 4 and 5 are past the end of the 3-page catalogue and answer 404
+    crawl, counts, sink, duplicates = sharded_crawl(tmp_path, server.base_url, 5, shard_count=5)
+
+    assert counts == {'pending': 0, 'claimed': 0, 'done': 5, 'failed': 0}
+    assert [record['url'] for record in sink] == expected
+    assert duplicates == 0
+
+
+def test_merge_drops_products_crawled_by_two_shards(server, tmp_path):
+    crawl = ShardedCrawl(str(tmp_path / 'queue'), processes=1, scraper_options=dict(FAST))
+    crawl.enqueue([{'id': f'{number:05d}', 'kind': 'books', 'urls': [server.base_url]} for number in range(2)])
+    crawl.run()
+    sink = ListSink()
+
+    assert crawl.merge(sink) == (20, 20)
+
+
+def test_a_reused_queue_is_refused(server, tmp_path):
+    crawl, *_ = sharded_crawl(tmp_path, server.base_url, 2, processes=1)
+
+    with pytest.raises(ValueError):
+        crawl.enqueue(crawl.plan_books(server.base_url, 2))
+
+
+def test_shards_that_keep_failing_are_left_out(tmp_path):
+    with FixtureServer(total_pages=2, error_rate=1.0) as failing:
+        crawl, counts, sink, _ = sharded_crawl(tmp_path, failing.base_url, 2, processes=1, shard_count=2)
+
+    assert counts == {'pending': 0, 'claimed': 0, 'done': 0, 'failed': 2}
+    assert sink == []
+    for name in os.listdir(crawl.queue.failed_dir):
+        with open(os.path.join(crawl.queue.failed_dir, name), encoding='utf-8') as f:
+            assert json.load(f)['attempts'] == ShardQueue.MAX_ATTEMPTS
@@ -0,0 +1,116 @@
+"""Streaming sinks write back exactly the records they were given"""
+import csv
+import json
+from decimal import Decimal
+
+import pytest
+
+from scraper_core import CSVSink, JSONSink, NDJSONSink, ParquetSink, Product, add_typed_fields, open_sink
+
+RECORDS = [
+    add_typed_fields({'title': 'A Light in the Attic', 'price': '£51.77', 'rating': 'Three',
+                      'availability': 'In stock (22 available)', 'url': 'https://shop.example/p/1'}),
+    # A later record with a field the first one lacks, and one named like the Parquet overflow
+    add_typed_fields({'title': 'Tipping the Velvet', 'price': '£53.74', 'rating': 'One',
+                      'availability': 'In stock (20 available)', 'url': 'https://shop.example/p/2',
+                      'upc': 'a897fe39b1053632', 'extra': 'kept'}),
+]
+
+
+def as_json(record):
+    """The record as JSON text gives it back: Decimals become strings"""
+    return json.loads(json.dumps(record, default=str))
+
+
+def write(sink, records=RECORDS):
+    with sink:
+        sink.write_all(records)
+    return sink.filename
+
+
+@pytest.mark.parametrize('extension, sink_class', [
+    ('.ndjson', NDJSONSink), ('.jsonl', NDJSONSink), ('.json', JSONSink), ('.csv', CSVSink), ('.parquet', ParquetSink),
+])
+def test_open_sink_picks_the_format_from_the_extension(tmp_path, extension, sink_class):
+    if sink_class is ParquetSink:
+        pytest.importorskip('pyarrow')
+    sink = open_sink(str(tmp_path / f'out{extension}'))
+    sink.close()
+
+    assert type(sink) is sink_class
+
+
+def test_ndjson_round_trip(tmp_path):
+    filename = write(NDJSONSink(str(tmp_path / 'out.ndjson')))
+
+    with open(filename, encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [as_json(record) for record in RECORDS]
+
+
+def test_json_round_trip(tmp_path):
+    filename = write(JSONSink(str(tmp_path / 'out.json')))
+
+    with open(filename, encoding='utf-8') as f:
+        assert json.load(f) == [as_json(record) for record in RECORDS]
+
+
+def test_empty_json_is_an_empty_array(tmp_path):
+    filename = write(JSONSink(str(tmp_path / 'out.json')), [])
+
+    with open(filename, encoding='utf-8') as f:
+        assert json.load(f) == []
+
+
+def test_csv_round_trip_includes_fields_first_seen_later(tmp_path):
+    filename = write(CSVSink(str(tmp_path / 'out.csv')))
+
+    with open(filename, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    expected = [{key: str(value) for key, value in record.items()} for record in RECORDS]
+    header = sorted(set().union(*RECORDS))
+
+    assert list(rows[0]) == header
+    assert rows == [{key: record.get(key, '') for key in header} for record in expected]
+
+
+def test_products_are_written_as_their_dicts(tmp_path):
+    filename = write(NDJSONSink(str(tmp_path / 'out.ndjson')), [Product.from_dict(record) for record in RECORDS])
+
+    with open(filename, encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [as_json(record) for record in RECORDS]
+
+
+def test_parquet_round_trip_keeps_types(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    filename = write(ParquetSink(str(tmp_path / 'out.parquet')))
+
+    table = parquet.read_table(filename)
+    rows = table.to_pylist()
+
+    assert str(table.schema.field('price_value').type) == 'decimal128(18, 4)'
+    assert str(table.schema.field('stock').type) == 'int32'
+    assert rows[0]['price_value'] == Decimal('51.77')
+    assert rows[0]['rating_value'] == 3 and rows[0]['stock'] == 22
+    assert rows[1]['upc'] == 'a897fe39b1053632' and rows[1]['extra'] == 'kept'
+    assert rows[1]['_extra'] is None
+
+
+def test_parquet_fields_outside_the_schema_go_to_extra(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    filename = write(ParquetSink(str(tmp_path / 'out.parquet'), fieldnames=['title', 'price_value']))
+
+    rows = parquet.read_table(filename).to_pylist()
+    extra = json.loads(rows[1].pop('_extra'))
+
+    assert rows[1] == {'title': 'Tipping the Velvet', 'price_value': Decimal('53.74')}
+    assert extra == {key: value for key, value in as_json(RECORDS[1]).items() if key not in rows[1]}
+
+
+def test_empty_parquet_still_has_its_schema(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    filename = write(ParquetSink(str(tmp_path / 'out.parquet'), fieldnames=['title', 'price_value']), [])
+
+    table = parquet.read_table(filename)
+
+    assert table.num_rows == 0
+    assert table.schema.names == ['title', 'price_value', '_extra']